@@ -0,0 +1,216 @@
+"""Score a CSV or Parquet feature file of any size through the hierarchical chain.
+
+The input is read in chunks; each chunk gets its derived features, is scored by the HVAC,
+Lighting and Plug models and the meta model in a worker pool, and is written out in input order.
+At most --max-inflight chunks are held at once, so memory stays bounded for any file size.
+
+    python "Bulk Scoring.py" weather_2030.csv predictions.parquet --workers 4
+    python "Bulk Scoring.py" site_export.parquet out.csv --executor thread --keep Timestamp,Site
+"""
+import argparse
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import joblib
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+MODEL_DIR = r"C:\Users\Laptop World"
+MODEL_FILES = {
+    'model_hvac': "model_hvac_xgb_3y.pkl",
+    'scaler_hvac': "scaler_hvac_3y.pkl",
+    'model_lighting': "model_lighting_xgb_3y.pkl",
+    'scaler_lighting': "scaler_lighting_3y.pkl",
+    'model_plug': "model_plug_xgb_3y_improved.pkl",
+    'scaler_plug': "scaler_plug_3y_improved.pkl",
+    'meta_model': "meta_model_nn_3y_low_noise.keras",
+    'meta_scaler': "meta_scaler_3y_low_noise.pkl"
+}
+CHUNK_ROWS = 50000
+BUILDING_AREA_M2 = 8000
+MAX_OCCUPANCY = 400
+
+hvac_features = [
+    'HVAC_Load_Estimate', 'Temp_Occupancy_Interaction', 'Indoor_Temp_Deviation',
+    'Temp_Deviation', 'Total_Occupancy_Count', 'Indoor_Temp_C',
+    'OutsideWeather_Temp_C', 'Hour', 'Is_Daytime', 'OutsideWeather_Humidity_Pct',
+    'Indoor_Humidity_Pct', 'Pressure_mmHg', 'Indoor_Humidity_Deviation',
+    'Season', 'Humidity_Deviation', 'Is_Weekend'
+]
+
+lighting_features = [
+    'Hour', 'Is_Daytime', 'Total_Occupancy_Count', 'Day_of_Week', 'Is_Weekend',
+    'Season', 'OutsideWeather_Temp_C', 'Temp_Deviation', 'Indoor_Temp_C',
+    'Building_Area_m2', 'Daylight_Hours_Factor', 'Lighting_Occupancy_Ratio',
+    'Solar_Irradiance_Estimate'
+]
+
+plug_features = [
+    'Total_Occupancy_Count', 'Hour', 'Is_Daytime', 'Day_of_Week', 'Is_Weekend',
+    'Season', 'Building_Area_m2', 'Energy_Price_USD_kWh', 'OutsideWeather_Temp_C',
+    'Indoor_Temp_C', 'Plug_Peak_Hour', 'Device_Usage_Factor', 'Remote_Work_Factor',
+    'Price_Sensitivity', 'Temp_Deviation', 'Indoor_Temp_Deviation', 'Solar_Irradiance_Estimate'
+]
+
+# Derived columns with the dataset generator's definitions; each is a function of the frame
+DERIVED_FEATURES = {
+    'Hour': lambda f: f.index.hour,
+    'Day_of_Week': lambda f: f.index.dayofweek,
+    'Is_Weekend': lambda f: (f.index.dayofweek >= 5).astype(int),
+    'Is_Daytime': lambda f: ((f.index.hour >= 7) & (f.index.hour <= 18)).astype(int),
+    'Month': lambda f: f.index.month,
+    'Season': lambda f: ((f.index.month % 12 + 3) // 3).astype(int),
+    'Building_Area_m2': lambda f: BUILDING_AREA_M2,
+    'Temp_Deviation': lambda f: np.abs(f['OutsideWeather_Temp_C'] - 22),
+    'HVAC_Load_Estimate': lambda f: f['Building_Area_m2'] * f['Temp_Deviation'] * 0.01 + f['Total_Occupancy_Count'] * 30,
+    'Temp_Occupancy_Interaction': lambda f: f['Temp_Deviation'] * f['Total_Occupancy_Count'],
+    'Indoor_Temp_Deviation': lambda f: np.abs(f['Indoor_Temp_C'] - 22),
+    'Indoor_Humidity_Deviation': lambda f: np.abs(f['Indoor_Humidity_Pct'] - 50),
+    'Humidity_Deviation': lambda f: np.abs(f['OutsideWeather_Humidity_Pct'] - 50),
+    'Daylight_Hours_Factor': lambda f: f['Is_Daytime'] * (0.4 - f['OutsideWeather_Temp_C'].clip(10, 30) / 100),
+    'Lighting_Occupancy_Ratio': lambda f: f['Total_Occupancy_Count'] / (MAX_OCCUPANCY + 1),
+    'Solar_Irradiance_Estimate': lambda f: np.maximum(0, np.sin(np.pi * (f['Hour'] - 6) / 12)) * (1 - f['Is_Weekend']) * 800,
+    'Plug_Peak_Hour': lambda f: ((f['Hour'] >= 9) & (f['Hour'] <= 17)).astype(int),
+    'Device_Usage_Factor': lambda f: f['Total_Occupancy_Count'] / MAX_OCCUPANCY * (1 + 0.2 * (f['Season'] == 3)),
+    'Remote_Work_Factor': lambda f: np.where(f['Is_Weekend'] == 1, 0.3, 1.0),
+    'Price_Sensitivity': lambda f: np.where(f['Energy_Price_USD_kWh'] > 0.15, 0.9, 1.0)
+}
+
+OUTPUT_COLUMNS = ['Pred_HVAC_Wh', 'Pred_Lighting_Wh', 'Pred_Plug_Wh', 'Pred_Total_Wh']
+
+# Models of this process, loaded once by load_models (pool initializer or main thread)
+models = None
+
+def load_models(model_dir):
+    global models
+    import tensorflow as tf
+    models = {}
+    for key, name in MODEL_FILES.items():
+        path = os.path.join(model_dir, name)
+        models[key] = tf.keras.models.load_model(path) if name.endswith('.keras') else joblib.load(path)
+
+def derive_features(frame, recompute):
+    """Fill derived columns that are missing (or all of them with recompute=True), in dependency order"""
+    for column, compute in DERIVED_FEATURES.items():
+        if recompute or column not in frame.columns:
+            frame[column] = compute(frame)
+    return frame
+
+def score_chunk(frame, recompute):
+    if 'Energy_Other_Wh' not in frame.columns:
+        raise ValueError("Input needs Energy_Other_Wh (an input of the meta model)")
+    frame = derive_features(frame, recompute)
+    pred_hvac = models['model_hvac'].predict(models['scaler_hvac'].transform(frame[hvac_features]))
+    pred_lighting = models['model_lighting'].predict(models['scaler_lighting'].transform(frame[lighting_features]))
+    pred_plug = models['model_plug'].predict(models['scaler_plug'].transform(frame[plug_features]))
+    meta_input = np.column_stack([pred_hvac, pred_lighting, pred_plug, frame['Energy_Other_Wh'].values])
+    pred_total = models['meta_model'].predict(models['meta_scaler'].transform(meta_input), verbose=0).flatten()
+    return np.column_stack([pred_hvac, pred_lighting, pred_plug, pred_total])
+
+def read_chunks(path, chunk_rows):
+    """(chunk indexed by Timestamp, total rows if known up front)"""
+    if path.lower().endswith('.parquet'):
+        if pq is None:
+            raise ImportError("Parquet input requires pyarrow")
+        parquet = pq.ParquetFile(path)
+        total = parquet.metadata.num_rows
+        for batch in parquet.iter_batches(batch_size=chunk_rows):
+            yield batch.to_pandas().set_index('Timestamp'), total
+        return
+    for chunk in pd.read_csv(path, parse_dates=['Timestamp'], index_col='Timestamp', chunksize=chunk_rows):
+        yield chunk, None
+
+class OutputWriter:
+    """Appends scored chunks to CSV (header once) or to a single Parquet file, one row group per chunk"""
+    def __init__(self, path):
+        self.path = path
+        self.parquet = path.lower().endswith('.parquet')
+        if self.parquet and pq is None:
+            raise ImportError("Parquet output requires pyarrow")
+        self.writer = None
+        self.first = True
+
+    def write(self, frame):
+        if self.parquet:
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if self.writer is None:
+                self.writer = pq.ParquetWriter(self.path, table.schema, compression='zstd')
+            self.writer.write_table(table)
+        else:
+            frame.to_csv(self.path, mode='w' if self.first else 'a', header=self.first, index=False)
+        self.first = False
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Score a feature file through the hierarchical chain")
+    parser.add_argument('input', help="CSV or Parquet file with a Timestamp column")
+    parser.add_argument('output', help="CSV or Parquet output path")
+    parser.add_argument('--model-dir', default=MODEL_DIR)
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS)
+    parser.add_argument('--workers', type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    parser.add_argument('--executor', choices=['process', 'thread'], default='process',
+                        help="process: one model copy per worker; thread: shared models (XGBoost/TF release the GIL)")
+    parser.add_argument('--max-inflight', type=int, default=None, help="chunks read ahead (default 2 x workers)")
+    parser.add_argument('--keep', default='Timestamp', help="comma-separated input columns copied to the output")
+    parser.add_argument('--recompute', action='store_true', help="recompute derived features even when present")
+    args = parser.parse_args()
+
+    keep = [c for c in args.keep.split(',') if c]
+    max_inflight = args.max_inflight or 2 * args.workers
+    if args.executor == 'process':
+        pool = ProcessPoolExecutor(max_workers=args.workers, mp_context=multiprocessing.get_context('spawn'),
+                                   initializer=load_models, initargs=(args.model_dir,))
+    else:
+        load_models(args.model_dir)
+        pool = ThreadPoolExecutor(max_workers=args.workers)
+
+    writer = OutputWriter(args.output)
+    pending = deque()
+    rows_done = 0
+    start = last_report = time.perf_counter()
+
+    def drain_one():
+        nonlocal rows_done, last_report
+        passthrough, future = pending.popleft()
+        scored = pd.DataFrame(future.result(), columns=OUTPUT_COLUMNS)
+        writer.write(pd.concat([passthrough.reset_index(drop=True), scored], axis=1))
+        rows_done += len(scored)
+        now = time.perf_counter()
+        if now - last_report >= 2 or not pending:
+            rate = rows_done / (now - start)
+            share = f" ({rows_done / total_rows:.1%})" if total_rows else ""
+            print(f"{rows_done:,} rows{share}  {rate:,.0f} rows/s")
+            last_report = now
+
+    total_rows = None
+    try:
+        for chunk, total_rows in read_chunks(args.input, args.chunk_rows):
+            passthrough = chunk.reset_index()[[c for c in keep if c in chunk.columns or c == 'Timestamp']]
+            pending.append((passthrough, pool.submit(score_chunk, chunk, args.recompute)))
+            # Results are written strictly in submission order; wait for the oldest before reading further
+            while len(pending) >= max_inflight:
+                drain_one()
+        while pending:
+            drain_one()
+    finally:
+        writer.close()
+        pool.shutdown(cancel_futures=True)
+
+    elapsed = time.perf_counter() - start
+    print(f"Scored {rows_done:,} rows in {elapsed:.1f}s ({rows_done / max(elapsed, 1e-9):,.0f} rows/s) -> {args.output}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+import time
+import pandas as pd
+import numpy as np
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import StandardScaler
+from sklearn.neural_network import MLPRegressor
+from sklearn.pipeline import make_pipeline
+from sklearn.metrics import r2_score, mean_absolute_error, mean_squared_error
+import joblib
+import tensorflow as tf
+
+df = pd.read_csv(r"C:\Users\Laptop World\Building_Energy_Twin_Sequential_3Years.csv", parse_dates=['Timestamp'], index_col='Timestamp')
+
+model_hvac = joblib.load(r"C:\Users\Laptop World\model_hvac_xgb_3y.pkl")
+scaler_hvac = joblib.load(r"C:\Users\Laptop World\scaler_hvac_3y.pkl")
+
+hvac_features = [
+    'HVAC_Load_Estimate', 'Temp_Occupancy_Interaction', 'Indoor_Temp_Deviation',
+    'Temp_Deviation', 'Total_Occupancy_Count', 'Indoor_Temp_C',
+    'OutsideWeather_Temp_C', 'Hour', 'Is_Daytime', 'OutsideWeather_Humidity_Pct',
+    'Indoor_Humidity_Pct', 'Pressure_mmHg', 'Indoor_Humidity_Deviation',
+    'Season', 'Humidity_Deviation', 'Is_Weekend'
+]
+
+model_lighting = joblib.load(r"C:\Users\Laptop World\model_lighting_xgb_3y.pkl")
+scaler_lighting = joblib.load(r"C:\Users\Laptop World\scaler_lighting_3y.pkl")
+
+lighting_features = [
+    'Hour', 'Is_Daytime', 'Total_Occupancy_Count', 'Day_of_Week', 'Is_Weekend',
+    'Season', 'OutsideWeather_Temp_C', 'Temp_Deviation', 'Indoor_Temp_C',
+    'Building_Area_m2', 'Daylight_Hours_Factor', 'Lighting_Occupancy_Ratio',
+    'Solar_Irradiance_Estimate'
+]
+
+model_plug = joblib.load(r"C:\Users\Laptop World\model_plug_xgb_3y_improved.pkl")
+scaler_plug = joblib.load(r"C:\Users\Laptop World\scaler_plug_3y_improved.pkl")
+
+plug_features = [
+    'Total_Occupancy_Count', 'Hour', 'Is_Daytime', 'Day_of_Week', 'Is_Weekend',
+    'Season', 'Building_Area_m2', 'Energy_Price_USD_kWh', 'OutsideWeather_Temp_C',
+    'Indoor_Temp_C', 'Plug_Peak_Hour', 'Device_Usage_Factor', 'Remote_Work_Factor',
+    'Price_Sensitivity', 'Temp_Deviation', 'Indoor_Temp_Deviation', 'Solar_Irradiance_Estimate'
+]
+
+meta_model = tf.keras.models.load_model(r"C:\Users\Laptop World\meta_model_nn_3y_low_noise.keras")
+meta_scaler = joblib.load(r"C:\Users\Laptop World\meta_scaler_3y_low_noise.pkl")
+
+# The student sees the union of the sub-model inputs plus the meta model's extra input
+student_features = list(dict.fromkeys(hvac_features + lighting_features + plug_features + ['Energy_Other_Wh']))
+student_targets = ['Energy_HVAC_Wh', 'Energy_Lighting_Wh', 'Energy_Plug_Wh', 'Total_Energy_Wh']
+
+def predict_total(df_input):
+    X_hvac = df_input[hvac_features]
+    X_hvac_scaled = scaler_hvac.transform(X_hvac)
+    pred_hvac = model_hvac.predict(X_hvac_scaled)
+
+    X_lighting = df_input[lighting_features]
+    X_lighting_scaled = scaler_lighting.transform(X_lighting)
+    pred_lighting = model_lighting.predict(X_lighting_scaled)
+
+    X_plug = df_input[plug_features]
+    X_plug_scaled = scaler_plug.transform(X_plug)
+    pred_plug = model_plug.predict(X_plug_scaled)
+
+    meta_input = np.column_stack([pred_hvac, pred_lighting, pred_plug, df_input['Energy_Other_Wh'].values])
+    meta_input_scaled = meta_scaler.transform(meta_input)
+    pred_total = meta_model.predict(meta_input_scaled, verbose=0).flatten()
+    return pred_hvac, pred_lighting, pred_plug, pred_total
+
+# Synthetic domain: the recorded hours plus perturbed copies using the generator's noise levels
+# (sigma 3 C outdoor temperature, sigma 50 occupants), with derived features recomputed
+rng = np.random.default_rng(42)
+augmented = []
+for _ in range(2):
+    sc = df.copy()
+    sc['OutsideWeather_Temp_C'] = (sc['OutsideWeather_Temp_C'] + rng.normal(0, 3, len(sc))).clip(5, 40)
+    sc['Total_Occupancy_Count'] = np.round(sc['Total_Occupancy_Count'] + rng.normal(0, 50, len(sc))).clip(0, 400)
+    sc['Temp_Deviation'] = np.abs(sc['OutsideWeather_Temp_C'] - 22)
+    sc['HVAC_Load_Estimate'] = sc['Building_Area_m2'] * sc['Temp_Deviation'] * 0.01 + sc['Total_Occupancy_Count'] * 30
+    sc['Temp_Occupancy_Interaction'] = sc['Temp_Deviation'] * sc['Total_Occupancy_Count']
+    sc['Lighting_Occupancy_Ratio'] = sc['Total_Occupancy_Count'] / 401
+    sc['Device_Usage_Factor'] = sc['Total_Occupancy_Count'] / 400 * (1 + 0.2 * (sc['Season'] == 3))
+    augmented.append(sc)
+domain = pd.concat([df] + augmented)
+
+teacher = np.column_stack(predict_total(domain))
+
+X_train, X_test, y_train, y_test = train_test_split(domain[student_features].values, teacher, test_size=0.2, random_state=42)
+
+student = make_pipeline(
+    StandardScaler(),
+    MLPRegressor(hidden_layer_sizes=(64, 32), activation='relu', learning_rate_init=0.001,
+                 max_iter=300, early_stopping=True, n_iter_no_change=15, random_state=42)
+)
+
+# Targets span very different ranges, so the student learns them in standardized units
+y_scaler = StandardScaler()
+student.fit(X_train, y_scaler.fit_transform(y_train))
+
+pred = y_scaler.inverse_transform(student.predict(X_test))
+
+print("Distilled Student - Fast Path (vs full chain)")
+metrics = {}
+for i, target in enumerate(student_targets):
+    r2 = r2_score(y_test[:, i], pred[:, i])
+    mae = mean_absolute_error(y_test[:, i], pred[:, i])
+    rmse = np.sqrt(mean_squared_error(y_test[:, i], pred[:, i]))
+    mape = np.mean(np.abs(pred[:, i] - y_test[:, i]) / np.abs(y_test[:, i]).clip(1)) * 100
+    metrics[target] = {'r2': float(r2), 'mae_wh': float(mae), 'rmse_wh': float(rmse), 'mape_pct': float(mape)}
+    print(f"{target}")
+    print(f"  R²:   {r2:.4f}")
+    print(f"  MAE:  {mae:.4f} Wh")
+    print(f"  RMSE: {rmse:.4f} Wh")
+    print(f"  MAPE: {mape:.2f} %")
+
+# Error against the recorded target on the original hours, for both paths
+_, _, _, full_total = predict_total(df)
+fast_total = y_scaler.inverse_transform(student.predict(df[student_features].values))[:, 3]
+print("Total_Energy_Wh vs actual")
+print(f"  Full chain MAE: {mean_absolute_error(df['Total_Energy_Wh'], full_total):.4f} Wh")
+print(f"  Student MAE:    {mean_absolute_error(df['Total_Energy_Wh'], fast_total):.4f} Wh")
+
+sample = df.iloc[:10000]
+start = time.perf_counter()
+predict_total(sample)
+full_time = time.perf_counter() - start
+start = time.perf_counter()
+student.predict(sample[student_features].values)
+fast_time = time.perf_counter() - start
+metrics['speedup'] = float(full_time / fast_time)
+print(f"Speed-up on {len(sample)} rows: {metrics['speedup']:.1f}x ({full_time:.3f}s -> {fast_time:.3f}s)")
+
+joblib.dump({
+    'model': student,
+    'target_scaler': y_scaler,
+    'features': student_features,
+    'targets': student_targets,
+    'metrics': metrics
+}, r"C:\Users\Laptop World\student_total_mlp_3y.pkl")
@@ -0,0 +1,517 @@
+"""Single-pass EDA report for the building energy dataset(s).
+
+Each file is read once, in chunks, and folded into mergeable accumulators: moments (count, mean,
+variance, skew, kurtosis, min, max), adaptive histograms, co-moments for the correlation matrix,
+calendar group means and monthly means. Accumulators from different chunks, files or worker
+processes merge exactly, so datasets larger than memory (or one file per building) are supported.
+
+    python "EDA Report.py" Building_Energy_Twin_Sequential_3Years.csv --output eda_report
+    python "EDA Report.py" site_*.csv --building-column Building_ID --workers 4
+"""
+import argparse
+import base64
+import glob
+import io
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+try:
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+except ImportError:
+    plt = None
+try:
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
+
+DATASET_PATH = r"C:\Users\Laptop World\Building_Energy_Twin_Sequential_3Years.csv"
+CHUNK_ROWS = 200000
+HISTOGRAM_BINS = 100
+
+END_USES = ['Energy_HVAC_Wh', 'Energy_Lighting_Wh', 'Energy_Plug_Wh', 'Energy_Other_Wh']
+TARGET = 'Total_Energy_Wh'
+HISTOGRAM_COLUMNS = [TARGET] + END_USES  # charted; every numeric column gets a histogram for its quartiles
+QUANTILES = [0.25, 0.5, 0.75]
+
+# Calendar groupings, derived from the timestamp: key -> (function of the index, number of groups, first label)
+CALENDAR_GROUPS = {
+    'Hour': (lambda idx: idx.hour, 24, 0),
+    'Day_of_Week': (lambda idx: idx.dayofweek, 7, 0),
+    'Month': (lambda idx: idx.month - 1, 12, 1),
+    'Season': (lambda idx: (idx.month % 12 + 3) // 3 - 1, 4, 1),
+    'Is_Weekend': (lambda idx: (idx.dayofweek >= 5).astype(int), 2, 0)
+}
+
+class Moments:
+    """Per-column count, mean, central moments M2..M4, min and max; NaNs are counted as missing"""
+    def __init__(self, n_columns):
+        self.n = np.zeros(n_columns)
+        self.mean = np.zeros(n_columns)
+        self.m2 = np.zeros(n_columns)
+        self.m3 = np.zeros(n_columns)
+        self.m4 = np.zeros(n_columns)
+        self.min = np.full(n_columns, np.inf)
+        self.max = np.full(n_columns, -np.inf)
+        self.missing = np.zeros(n_columns, dtype=np.int64)
+
+    def update(self, X):
+        valid = ~np.isnan(X)
+        other = Moments(X.shape[1])
+        other.n = valid.sum(axis=0).astype(float)
+        other.missing = (~valid).sum(axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            other.mean = np.where(other.n > 0, np.nansum(X, axis=0) / np.maximum(other.n, 1), 0.0)
+            d = np.where(valid, X - other.mean, 0.0)
+        d2 = d * d
+        other.m2, other.m3, other.m4 = d2.sum(axis=0), (d2 * d).sum(axis=0), (d2 * d2).sum(axis=0)
+        if valid.any():
+            other.min = np.where(other.n > 0, np.nanmin(np.where(valid, X, np.inf), axis=0), np.inf)
+            other.max = np.where(other.n > 0, np.nanmax(np.where(valid, X, -np.inf), axis=0), -np.inf)
+        self.merge(other)
+
+    def merge(self, other):
+        """Pairwise update of the central moments (Chan et al. / Pébay)"""
+        na, nb = self.n, other.n
+        n = na + nb
+        safe_n = np.maximum(n, 1)
+        delta = other.mean - self.mean
+        mean = self.mean + delta * nb / safe_n
+        m2 = self.m2 + other.m2 + delta ** 2 * na * nb / safe_n
+        m3 = (self.m3 + other.m3 + delta ** 3 * na * nb * (na - nb) / safe_n ** 2
+              + 3 * delta * (na * other.m2 - nb * self.m2) / safe_n)
+        m4 = (self.m4 + other.m4 + delta ** 4 * na * nb * (na * na - na * nb + nb * nb) / safe_n ** 3
+              + 6 * delta ** 2 * (na * na * other.m2 + nb * nb * self.m2) / safe_n ** 2
+              + 4 * delta * (na * other.m3 - nb * self.m3) / safe_n)
+        self.n, self.mean, self.m2, self.m3, self.m4 = n, mean, m2, m3, m4
+        self.min = np.minimum(self.min, other.min)
+        self.max = np.maximum(self.max, other.max)
+        self.missing = self.missing + other.missing
+
+    def summary(self):
+        """Sample std, skew and excess kurtosis with the same bias adjustments as pandas (.std/.skew/.kurt)"""
+        n = self.n
+        with np.errstate(invalid='ignore', divide='ignore'):
+            std = np.sqrt(self.m2 / (n - 1))
+            g1 = np.sqrt(n) * self.m3 / self.m2 ** 1.5
+            g2 = n * self.m4 / self.m2 ** 2 - 3
+            skew = np.where(n > 2, g1 * np.sqrt(n * (n - 1)) / (n - 2), np.nan)
+            kurtosis = np.where(n > 3, ((n + 1) * g2 + 6) * (n - 1) / ((n - 2) * (n - 3)), np.nan)
+        # pandas reports 0 rather than NaN for a constant column
+        constant = (self.m2 == 0) & (n > 0)
+        skew = np.where(constant & (n > 2), 0.0, skew)
+        kurtosis = np.where(constant & (n > 3), 0.0, kurtosis)
+        mean = np.where(n > 0, self.mean, np.nan)
+        std = np.where(n > 1, std, np.nan)
+        return {'count': self.n, 'mean': mean, 'std': std, 'min': self.min, 'max': self.max,
+                'skew': skew, 'kurtosis': kurtosis, 'missing': self.missing}
+
+class Histogram:
+    """Fixed-width bins of width 2**k anchored at zero; any two histograms merge by coarsening to the wider bins"""
+    def __init__(self, bins=HISTOGRAM_BINS):
+        self.bins = bins
+        self.k = None
+        self.offset = 0
+        self.counts = np.zeros(0)
+
+    def _coarsen(self, k):
+        while self.k < k:
+            idx = np.floor_divide(self.offset + np.arange(len(self.counts)), 2)
+            self.offset = int(idx[0]) if len(idx) else 0
+            self.counts = np.bincount(idx - self.offset, weights=self.counts) if len(idx) else self.counts
+            self.k += 1
+
+    def update(self, values):
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return
+        other = Histogram(self.bins)
+        span = values.max() - values.min()
+        other.k = int(np.floor(np.log2(span / self.bins))) if span > 0 else int(np.floor(np.log2(max(abs(values[0]), 1.0) / self.bins)))
+        while True:
+            idx = np.floor(values / 2.0 ** other.k).astype(np.int64)
+            if idx.max() - idx.min() < 4 * self.bins:
+                break
+            other.k += 1
+        other.offset = int(idx.min())
+        other.counts = np.bincount(idx - other.offset).astype(float)
+        self.merge(other)
+
+    def merge(self, other):
+        if other.k is None:
+            return
+        if self.k is None:
+            self.k, self.offset, self.counts = other.k, other.offset, other.counts.copy()
+            return
+        other = Histogram.copy(other)
+        k = max(self.k, other.k)
+        self._coarsen(k)
+        other._coarsen(k)
+        lo = min(self.offset, other.offset)
+        hi = max(self.offset + len(self.counts), other.offset + len(other.counts))
+        counts = np.zeros(hi - lo)
+        counts[self.offset - lo:self.offset - lo + len(self.counts)] += self.counts
+        counts[other.offset - lo:other.offset - lo + len(other.counts)] += other.counts
+        self.offset, self.counts = lo, counts
+        # Keep the bin count bounded as the observed range grows
+        while len(self.counts) > 4 * self.bins:
+            self._coarsen(self.k + 1)
+
+    def copy(self):
+        clone = Histogram(self.bins)
+        clone.k, clone.offset, clone.counts = self.k, self.offset, self.counts.copy()
+        return clone
+
+    def edges(self):
+        return (self.offset + np.arange(len(self.counts) + 1)) * 2.0 ** self.k
+
+    def bin_width(self):
+        """Upper bound on the error of quantiles(): the exact value lies in the same bin"""
+        return 2.0 ** self.k if self.k is not None else np.nan
+
+    def quantiles(self, qs):
+        """Linear interpolation inside the bin holding each quantile (approximate, see bin_width)"""
+        if self.k is None or self.counts.sum() == 0:
+            return [np.nan] * len(qs)
+        edges = self.edges()
+        cumulative = np.concatenate([[0], np.cumsum(self.counts)]) / self.counts.sum()
+        return [float(np.interp(q, cumulative, edges)) for q in qs]
+
+class CoMoments:
+    """Mean vector and centered cross-product matrix over rows without missing values"""
+    def __init__(self, n_columns):
+        self.n = 0
+        self.mean = np.zeros(n_columns)
+        self.c = np.zeros((n_columns, n_columns))
+
+    def update(self, X):
+        X = X[~np.isnan(X).any(axis=1)]
+        if len(X):
+            other = CoMoments(X.shape[1])
+            other.n = len(X)
+            other.mean = X.mean(axis=0)
+            centered = X - other.mean
+            other.c = centered.T @ centered
+            self.merge(other)
+
+    def merge(self, other):
+        n = self.n + other.n
+        if n == 0:
+            return
+        delta = other.mean - self.mean
+        self.c = self.c + other.c + np.outer(delta, delta) * self.n * other.n / n
+        self.mean = self.mean + delta * other.n / n
+        self.n = n
+
+    def correlation(self):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            std = np.sqrt(np.diag(self.c))
+            return self.c / np.outer(std, std)
+
+def numeric_matrix(chunk, columns):
+    """Float matrix of one chunk; values that do not parse as numbers are NaN.
+
+    Types are decided per chunk, not from the first one: a column that is empty (or null-typed) in one
+    chunk and numeric in the next is still read as numbers. Returns the matrix and, per column, how many
+    non-null values did not parse.
+    """
+    X = np.full((len(chunk), len(columns)), np.nan)
+    unparsed = np.zeros(len(columns), dtype=np.int64)
+    for j, column in enumerate(columns):
+        if column not in chunk.columns:
+            continue
+        values = chunk[column]
+        if pd.api.types.is_bool_dtype(values):
+            unparsed[j] = values.notna().sum()
+            continue
+        if not pd.api.types.is_numeric_dtype(values):
+            parsed = pd.to_numeric(values, errors='coerce')
+            unparsed[j] = (values.notna() & parsed.isna()).sum()
+            values = parsed
+        X[:, j] = values.to_numpy(dtype=float, na_value=np.nan)
+    return X, unparsed
+
+class EDAAccumulator:
+    """Every statistic of the report for one dataset (or one building), mergeable across chunks and files"""
+    def __init__(self, columns, bins=HISTOGRAM_BINS):
+        self.columns = list(columns)
+        self.bins = bins
+        self.rows = 0
+        self.unparsed = np.zeros(len(self.columns), dtype=np.int64)
+        self.first = self.last = None
+        self.moments = Moments(len(self.columns))
+        self.comoments = CoMoments(len(self.columns))
+        self.histograms = {c: Histogram(bins) for c in self.columns}
+        # Total_Energy_Wh split by weekday / weekend (the notebook's box plot)
+        self.weekend_histograms = [Histogram(bins), Histogram(bins)]
+        self.group_sums = {key: np.zeros((size, len(self.columns))) for key, (_, size, _) in CALENDAR_GROUPS.items()}
+        self.group_counts = {key: np.zeros((size, len(self.columns))) for key, (_, size, _) in CALENDAR_GROUPS.items()}
+        self.monthly = {}
+
+    def update(self, chunk):
+        X, unparsed = numeric_matrix(chunk, self.columns)
+        index = chunk.index
+        self.rows += len(chunk)
+        self.unparsed += unparsed
+        self.first = index.min() if self.first is None else min(self.first, index.min())
+        self.last = index.max() if self.last is None else max(self.last, index.max())
+        self.moments.update(X)
+        self.comoments.update(X)
+        for i, column in enumerate(self.columns):
+            self.histograms[column].update(X[:, i])
+        if TARGET in self.columns:
+            total = X[:, self.columns.index(TARGET)]
+            weekend = index.dayofweek >= 5
+            self.weekend_histograms[0].update(total[~weekend])
+            self.weekend_histograms[1].update(total[weekend])
+
+        valid = ~np.isnan(X)
+        filled = np.where(valid, X, 0.0)
+        for key, (group_of, size, _) in CALENDAR_GROUPS.items():
+            groups = np.asarray(group_of(index))
+            one_hot = np.zeros((len(groups), size))
+            one_hot[np.arange(len(groups)), groups] = 1.0
+            self.group_sums[key] += one_hot.T @ filled
+            self.group_counts[key] += one_hot.T @ valid
+
+        months = index.to_period('M')
+        for month, positions in pd.Series(np.arange(len(index)), index=months).groupby(level=0):
+            rows = positions.values
+            sums, counts = filled[rows].sum(axis=0), valid[rows].sum(axis=0)
+            if month in self.monthly:
+                self.monthly[month][0] += sums
+                self.monthly[month][1] += counts
+            else:
+                self.monthly[month] = [sums, counts]
+
+    def merge(self, other):
+        self.rows += other.rows
+        self.unparsed = self.unparsed + other.unparsed
+        for attr, pick in [('first', min), ('last', max)]:
+            mine, theirs = getattr(self, attr), getattr(other, attr)
+            setattr(self, attr, theirs if mine is None else mine if theirs is None else pick(mine, theirs))
+        self.moments.merge(other.moments)
+        self.comoments.merge(other.comoments)
+        for column, histogram in self.histograms.items():
+            histogram.merge(other.histograms[column])
+        for mine, theirs in zip(self.weekend_histograms, other.weekend_histograms):
+            mine.merge(theirs)
+        for key in CALENDAR_GROUPS:
+            self.group_sums[key] += other.group_sums[key]
+            self.group_counts[key] += other.group_counts[key]
+        for month, (sums, counts) in other.monthly.items():
+            if month in self.monthly:
+                self.monthly[month][0] += sums
+                self.monthly[month][1] += counts
+            else:
+                self.monthly[month] = [sums.copy(), counts.copy()]
+        return self
+
+    def numeric_columns(self):
+        """Columns with at least one number, or with no values at all (text-only columns are not reported)"""
+        return [c for i, c in enumerate(self.columns) if self.moments.n[i] > 0 or self.unparsed[i] == 0]
+
+    def subset(self, columns):
+        """The same statistics restricted to columns (a subset of self.columns)"""
+        keep = [self.columns.index(c) for c in columns]
+        out = EDAAccumulator(columns, self.bins)
+        out.rows, out.first, out.last = self.rows, self.first, self.last
+        out.unparsed = self.unparsed[keep]
+        for attr in ['n', 'mean', 'm2', 'm3', 'm4', 'min', 'max', 'missing']:
+            setattr(out.moments, attr, getattr(self.moments, attr)[keep])
+        out.comoments.n = self.comoments.n
+        out.comoments.mean = self.comoments.mean[keep]
+        out.comoments.c = self.comoments.c[np.ix_(keep, keep)]
+        out.histograms = {c: self.histograms[c] for c in columns}
+        out.weekend_histograms = self.weekend_histograms
+        out.group_sums = {key: sums[:, keep] for key, sums in self.group_sums.items()}
+        out.group_counts = {key: counts[:, keep] for key, counts in self.group_counts.items()}
+        out.monthly = {month: [sums[keep], counts[keep]] for month, (sums, counts) in self.monthly.items()}
+        return out
+
+    def results(self):
+        summary = self.moments.summary()
+        describe = pd.DataFrame(summary, index=self.columns)
+        # Quartiles come from the mergeable histograms: within quantile_error (the bin width) of the value at that rank
+        quartiles = np.array([self.histograms[c].quantiles(QUANTILES) for c in self.columns]).reshape(len(self.columns), len(QUANTILES))
+        quartiles = np.clip(quartiles, summary['min'][:, None], summary['max'][:, None])
+        for j, label in enumerate(['25%', '50%', '75%']):
+            describe[label] = quartiles[:, j]
+        describe['quantile_error'] = [self.histograms[c].bin_width() for c in self.columns]
+        correlation = pd.DataFrame(self.comoments.correlation(), index=self.columns, columns=self.columns)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            groups = {
+                key: pd.DataFrame(self.group_sums[key] / self.group_counts[key], columns=self.columns,
+                                  index=pd.Index(np.arange(size) + first, name=key))
+                for key, (_, size, first) in CALENDAR_GROUPS.items()
+            }
+            months = sorted(self.monthly)
+            monthly = pd.DataFrame([self.monthly[m][0] / self.monthly[m][1] for m in months],
+                                   index=pd.PeriodIndex(months, name='Month'), columns=self.columns)
+        return {'describe': describe, 'correlation': correlation, 'groups': groups, 'monthly': monthly}
+
+def read_chunks(path, chunk_rows):
+    if path.lower().endswith('.parquet'):
+        if pq is None:
+            raise ImportError("Reading Parquet requires pyarrow")
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows):
+            yield batch.to_pandas().set_index('Timestamp')
+        return
+    for chunk in pd.read_csv(path, parse_dates=['Timestamp'], index_col='Timestamp', chunksize=chunk_rows):
+        yield chunk
+
+def scan_file(path, chunk_rows, bins, building_column):
+    """One pass over one file; returns (overall accumulator, {building: accumulator}, rows/s)"""
+    start = time.perf_counter()
+    overall, buildings = None, {}
+    for chunk in read_chunks(path, chunk_rows):
+        if overall is None:
+            overall = EDAAccumulator([c for c in chunk.columns if c != building_column], bins)
+        overall.update(chunk)
+        if building_column and building_column in chunk.columns:
+            for building, part in chunk.groupby(building_column):
+                buildings.setdefault(building, EDAAccumulator(overall.columns, bins)).update(part)
+    rows = overall.rows if overall is not None else 0
+    return overall, buildings, rows / max(time.perf_counter() - start, 1e-9)
+
+def figure_html(fig):
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png', dpi=90, bbox_inches='tight')
+    plt.close(fig)
+    return f'<img src="data:image/png;base64,{base64.b64encode(buffer.getvalue()).decode()}">'
+
+def charts(acc, results):
+    if plt is None:
+        return ['<p>matplotlib not installed: charts skipped.</p>']
+    out = []
+    if TARGET in acc.columns:
+        fig, ax = plt.subplots(figsize=(12, 4))
+        results['monthly'][TARGET].plot(ax=ax, title='Monthly Average Total Energy', ylabel='Wh')
+        out.append(figure_html(fig))
+        for key, title in [('Hour', 'Hour of Day'), ('Day_of_Week', 'Day of Week (0=Monday)'), ('Season', 'Season')]:
+            fig, ax = plt.subplots(figsize=(10, 4))
+            results['groups'][key][TARGET].plot(kind='bar', ax=ax, title=f'Average Total Energy by {title}', ylabel='Wh')
+            out.append(figure_html(fig))
+    end_uses = [c for c in END_USES if c in acc.columns]
+    if end_uses:
+        fig, ax = plt.subplots(figsize=(8, 4))
+        results['describe'].loc[end_uses, 'mean'].plot(kind='bar', ax=ax, title='Average End-Use Consumption', ylabel='Wh')
+        out.append(figure_html(fig))
+        fig, ax = plt.subplots(figsize=(10, 4))
+        results['groups']['Hour'][end_uses].plot(ax=ax, title='Average End-Use Load by Hour', ylabel='Wh')
+        out.append(figure_html(fig))
+    for column in [c for c in HISTOGRAM_COLUMNS if c in acc.columns]:
+        histogram = acc.histograms[column]
+        if histogram.k is None:
+            continue
+        edges = histogram.edges()
+        fig, ax = plt.subplots(figsize=(10, 3.5))
+        ax.bar(edges[:-1], histogram.counts, width=np.diff(edges), align='edge')
+        ax.set_title(f'{column} Distribution')
+        out.append(figure_html(fig))
+    fig, ax = plt.subplots(figsize=(14, 12))
+    image = ax.imshow(results['correlation'].values, cmap='coolwarm', vmin=-1, vmax=1)
+    ax.set_xticks(range(len(acc.columns)), acc.columns, rotation=90, fontsize=7)
+    ax.set_yticks(range(len(acc.columns)), acc.columns, fontsize=7)
+    fig.colorbar(image)
+    ax.set_title('Full Correlation Matrix')
+    out.append(figure_html(fig))
+    return out
+
+def section_html(title, acc):
+    results = acc.results()
+    parts = [f'<h2>{title}</h2>',
+             f'<p>{acc.rows:,} rows, {acc.first} to {acc.last}, {len(acc.columns)} numeric columns</p>',
+             '<h3>Summary statistics</h3>',
+             '<p>25%, 50% and 75% are approximate: they are interpolated inside histogram bins and lie within '
+             '<code>quantile_error</code> (the bin width) of an observed value at that rank. For discrete columns '
+             '(hour, flags) pandas interpolates between neighbouring values instead, so it can differ by up to that gap.</p>',
+             results['describe'].to_html(float_format='{:.4g}'.format)]
+    if TARGET in acc.columns:
+        parts += ['<h3>Correlation with Total_Energy_Wh</h3>',
+                  results['correlation'][TARGET].sort_values(ascending=False).to_frame().to_html(float_format='{:.3f}'.format)]
+        weekday, weekend = (h.quantiles(QUANTILES) for h in acc.weekend_histograms)
+        parts += ['<h3>Total energy: weekday vs weekend (approximate quartiles)</h3>',
+                  pd.DataFrame([weekday, weekend], index=['Weekday', 'Weekend'], columns=['25%', '50%', '75%']).to_html(float_format='{:.1f}'.format)]
+    parts += charts(acc, results)
+    return '\n'.join(parts), results
+
+def json_safe(value):
+    """Plain JSON values: NaN and infinities become null (strict parsers reject bare NaN)"""
+    if isinstance(value, dict):
+        return {str(k): json_safe(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [json_safe(v) for v in value]
+    if isinstance(value, (bool, np.bool_)):
+        return bool(value)
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    if isinstance(value, (float, np.floating)):
+        return float(value) if np.isfinite(value) else None
+    return value
+
+def main():
+    parser = argparse.ArgumentParser(description="Single-pass EDA report for one or more dataset files")
+    parser.add_argument('paths', nargs='*', default=[DATASET_PATH], help="CSV or Parquet files (globs allowed)")
+    parser.add_argument('--output', default='eda_report', help="output directory")
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS)
+    parser.add_argument('--bins', type=int, default=HISTOGRAM_BINS)
+    parser.add_argument('--building-column', default='Building_ID', help="per-building sections when this column exists")
+    parser.add_argument('--workers', type=int, default=1, help="files scanned in parallel")
+    args = parser.parse_args()
+
+    paths = [p for pattern in args.paths for p in sorted(glob.glob(pattern))] or args.paths
+    start = time.perf_counter()
+    overall, buildings = None, {}
+    scan = lambda pool_map: pool_map(scan_file, paths, [args.chunk_rows] * len(paths), [args.bins] * len(paths), [args.building_column] * len(paths))
+    if args.workers > 1 and len(paths) > 1:
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            scanned = list(scan(pool.map))
+    else:
+        scanned = list(scan(map))
+    for path, (acc, per_building, rate) in zip(paths, scanned):
+        print(f"{path}: {acc.rows if acc else 0:,} rows ({rate:,.0f} rows/s)")
+        if acc is None:
+            continue
+        overall = acc if overall is None else overall.merge(acc)
+        for building, b_acc in per_building.items():
+            buildings[building] = b_acc if building not in buildings else buildings[building].merge(b_acc)
+    if overall is None:
+        raise SystemExit("No rows read")
+    numeric = overall.numeric_columns()
+    overall = overall.subset(numeric)
+    buildings = {building: acc.subset(numeric) for building, acc in buildings.items()}
+
+    os.makedirs(args.output, exist_ok=True)
+    body, results = section_html('All data', overall)
+    sections = [body]
+    for building in sorted(buildings):
+        sections.append(section_html(f'Building {building}', buildings[building])[0])
+    html = ('<!DOCTYPE html><html><head><meta charset="utf-8"><title>Building Energy EDA</title>'
+            '<style>body{font-family:sans-serif;margin:2em}table{border-collapse:collapse;font-size:12px}'
+            'td,th{border:1px solid #ccc;padding:2px 6px;text-align:right}img{display:block;margin:1em 0}</style>'
+            f'</head><body><h1>Building Energy EDA</h1><p>Files: {", ".join(map(os.path.basename, paths))}</p>'
+            + '\n'.join(sections) + '</body></html>')
+    with open(os.path.join(args.output, 'report.html'), 'w', encoding='utf-8') as f:
+        f.write(html)
+
+    stats = {
+        'rows': overall.rows,
+        'describe': results['describe'].to_dict(orient='index'),
+        'correlation_with_total': results['correlation'][TARGET].to_dict() if TARGET in overall.columns else None,
+        'group_means': {key: frame.to_dict(orient='index') for key, frame in results['groups'].items()},
+        'monthly_means': {str(month): row for month, row in results['monthly'].to_dict(orient='index').items()},
+        'buildings': sorted(map(str, buildings))
+    }
+    with open(os.path.join(args.output, 'stats.json'), 'w') as f:
+        json.dump(json_safe(stats), f, indent=2, allow_nan=False)
+    print(f"Report written to {os.path.join(args.output, 'report.html')} in {time.perf_counter() - start:.1f}s")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+import pandas as pd
+import numpy as np
+from sklearn.metrics import r2_score, mean_absolute_error, mean_squared_error
+import joblib
+from xgboost import XGBRegressor
+
+df = pd.read_csv(r"C:\Users\Laptop World\Building_Energy_Twin_Sequential_3Years.csv", parse_dates=['Timestamp'], index_col='Timestamp')
+
+# Only inputs that are known ahead of time (calendar, weather forecast, tariff) plus past consumption
+exogenous_features = [
+    'Hour', 'Day_of_Week', 'Is_Weekend', 'Is_Daytime', 'Month', 'Season',
+    'OutsideWeather_Temp_C', 'OutsideWeather_Humidity_Pct', 'Solar_Irradiance_Estimate',
+    'Energy_Price_USD_kWh'
+]
+
+history_features = ['Lag_1', 'Lag_24', 'Lag_168', 'Roll_Mean_24', 'Roll_Std_24', 'Roll_Mean_168']
+
+features = exogenous_features + history_features
+
+targets = ['Energy_HVAC_Wh', 'Energy_Lighting_Wh', 'Energy_Plug_Wh', 'Energy_Other_Wh']
+
+def history_frame(series):
+    # Windows end at the previous hour, matching the incremental state used by the backend
+    past = series.shift(1)
+    return pd.DataFrame({
+        'Lag_1': past,
+        'Lag_24': series.shift(24),
+        'Lag_168': series.shift(168),
+        'Roll_Mean_24': past.rolling(24).mean(),
+        'Roll_Std_24': past.rolling(24).std(ddof=0),
+        'Roll_Mean_168': past.rolling(168).mean()
+    }, index=series.index)
+
+bundle = {'features': features, 'exogenous_features': exogenous_features, 'history_features': history_features, 'models': {}, 'metrics': {}}
+
+for target in targets:
+    data = pd.concat([df[exogenous_features], history_frame(df[target]), df[target]], axis=1).dropna()
+
+    # Chronological split: the test block is strictly after the training block
+    split = int(len(data) * 0.8)
+    X_train, X_test = data[features].iloc[:split], data[features].iloc[split:]
+    y_train, y_test = data[target].iloc[:split], data[target].iloc[split:]
+
+    model = XGBRegressor(
+        n_estimators=800,
+        learning_rate=0.05,
+        max_depth=6,
+        subsample=0.9,
+        colsample_bytree=0.9,
+        random_state=42,
+        n_jobs=-1,
+        tree_method='hist',
+        eval_metric='rmse',
+        early_stopping_rounds=50
+    )
+
+    model.fit(
+        X_train, y_train,
+        eval_set=[(X_test, y_test)],
+        verbose=False
+    )
+
+    pred = model.predict(X_test)
+
+    r2 = r2_score(y_test, pred)
+    mae = mean_absolute_error(y_test, pred)
+    rmse = np.sqrt(mean_squared_error(y_test, pred))
+
+    print(f"Forecast - {target} (one step ahead)")
+    print(f"R²:   {r2:.4f}")
+    print(f"MAE:  {mae:.4f} Wh")
+    print(f"RMSE: {rmse:.4f} Wh")
+
+    bundle['models'][target] = model
+    bundle['metrics'][target] = {'r2': float(r2), 'mae_wh': float(mae), 'rmse_wh': float(rmse)}
+
+joblib.dump(bundle, r"C:\Users\Laptop World\forecast_models_3y.pkl")
@@ -1,8 +1,14 @@
+import os
+import sys
 import joblib
 import numpy as np
 import pandas as pd
 import tensorflow as tf
 
+# Copy-on-write scenario overlays are shared with the backend
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Backend&Optimization'))
+from scenario_frame import ScenarioFrame
+
 df = pd.read_csv(r"C:\Users\Laptop World\Building_Energy_Twin_Sequential_3Years.csv", parse_dates=['Timestamp'], index_col='Timestamp')
 
 model_hvac = joblib.load(r"C:\Users\Laptop World\model_hvac_xgb_3y.pkl")
@@ -39,7 +45,16 @@ plug_features = [
 meta_model = tf.keras.models.load_model(r"C:\Users\Laptop World\meta_model_nn_3y_low_noise.keras")
 meta_scaler = joblib.load(r"C:\Users\Laptop World\meta_scaler_3y_low_noise.pkl")
 
+# 'full' runs the hierarchical chain, 'fast' the distilled student from "Distill Model.py"
+PREDICTION_MODE = os.environ.get('TWIN_PREDICTION_MODE', 'full')
+student_bundle = joblib.load(r"C:\Users\Laptop World\student_total_mlp_3y.pkl") if PREDICTION_MODE == 'fast' else None
+
 def predict_total(df_input):
+    if student_bundle is not None:
+        X = df_input[student_bundle['features']].values
+        pred = student_bundle['target_scaler'].inverse_transform(student_bundle['model'].predict(X))
+        return pred[:, 3]
+
     X_hvac = df_input[hvac_features]
     X_hvac_scaled = scaler_hvac.transform(X_hvac)
     pred_hvac = model_hvac.predict(X_hvac_scaled)
@@ -57,11 +72,16 @@ def predict_total(df_input):
     pred_total = meta_model.predict(meta_input_scaled, verbose=0).flatten()
     return pred_total
 
-baseline_df = df.copy()
-baseline_df['Predicted_Total_Wh'] = predict_total(baseline_df)
-
 hours_per_year = 8760
-baseline_annual_kwh = baseline_df['Predicted_Total_Wh'].mean() * hours_per_year / 1000  # kWh
+# Calendar span of the record (first to last hour inclusive), so missing hours do not inflate the annual rate
+record_years = ((df.index[-1] - df.index[0]) / pd.Timedelta(hours=1) + 1) / hours_per_year
+price = df['Energy_Price_USD_kWh'].values
+
+def annual_totals(pred_total_wh):
+    """(kWh, USD) per year: exact sums over the whole record divided by its length in years"""
+    return pred_total_wh.sum() / 1000 / record_years, (pred_total_wh / 1000 * price).sum() / record_years
+
+baseline_annual_kwh, baseline_annual_cost = annual_totals(predict_total(df))
 
 results = []
 results.append({
@@ -69,19 +89,17 @@ results.append({
     'Annual_kWh': int(round(baseline_annual_kwh)),
     'Savings_kWh': 0,
     'Savings_%': 0.0,
-    'Annual_Cost_USD': int(round((baseline_df['Predicted_Total_Wh'] / 1000 * baseline_df['Energy_Price_USD_kWh']).mean() * hours_per_year))
+    'Annual_Cost_USD': int(round(baseline_annual_cost))
 })
 
 # HVAC Setpoint Optimization
-sc = df.copy()
+sc = ScenarioFrame(df)
 sc['Indoor_Temp_C'] = np.where(sc['Season'] == 3, sc['Indoor_Temp_C'] + 2, sc['Indoor_Temp_C'] - 2)
 sc['Indoor_Temp_C'] = sc['Indoor_Temp_C'].clip(18, 28)
 sc['Indoor_Temp_Deviation'] = np.abs(sc['Indoor_Temp_C'] - 22)
 sc['Temp_Deviation'] = np.abs(sc['OutsideWeather_Temp_C'] - sc['Indoor_Temp_C'] + 2)
 sc['HVAC_Load_Estimate'] = sc['Building_Area_m2'] * sc['Temp_Deviation'] * 0.01 + sc['Total_Occupancy_Count'] * 30
-sc['Predicted_Total_Wh'] = predict_total(sc)
-annual_kwh = sc['Predicted_Total_Wh'].mean() * hours_per_year / 1000
-annual_cost = (sc['Predicted_Total_Wh'] / 1000 * sc['Energy_Price_USD_kWh']).mean() * hours_per_year
+annual_kwh, annual_cost = annual_totals(predict_total(sc))
 results.append({
     'Scenario': 'HVAC Setpoint Optimization',
     'Annual_kWh': int(round(annual_kwh)),
@@ -91,12 +109,10 @@ results.append({
 })
 
 # Occupancy-Based HVAC
-sc = df.copy()
+sc = ScenarioFrame(df)
 low_occupancy = sc['Total_Occupancy_Count'] < 80
-sc.loc[low_occupancy, 'HVAC_Load_Estimate'] *= 0.4
-sc['Predicted_Total_Wh'] = predict_total(sc)
-annual_kwh = sc['Predicted_Total_Wh'].mean() * hours_per_year / 1000
-annual_cost = (sc['Predicted_Total_Wh'] / 1000 * sc['Energy_Price_USD_kWh']).mean() * hours_per_year
+sc['HVAC_Load_Estimate'] = np.where(low_occupancy, sc['HVAC_Load_Estimate'] * 0.4, sc['HVAC_Load_Estimate'])
+annual_kwh, annual_cost = annual_totals(predict_total(sc))
 results.append({
     'Scenario': 'Occupancy-Based HVAC',
     'Annual_kWh': int(round(annual_kwh)),
@@ -106,12 +122,10 @@ results.append({
 })
 
 # Natural Ventilation
-sc = df.copy()
+sc = ScenarioFrame(df)
 comfort_temp = (sc['OutsideWeather_Temp_C'] >= 18) & (sc['OutsideWeather_Temp_C'] <= 26)
-sc.loc[comfort_temp, 'HVAC_Load_Estimate'] *= 0.5
-sc['Predicted_Total_Wh'] = predict_total(sc)
-annual_kwh = sc['Predicted_Total_Wh'].mean() * hours_per_year / 1000
-annual_cost = (sc['Predicted_Total_Wh'] / 1000 * sc['Energy_Price_USD_kWh']).mean() * hours_per_year
+sc['HVAC_Load_Estimate'] = np.where(comfort_temp, sc['HVAC_Load_Estimate'] * 0.5, sc['HVAC_Load_Estimate'])
+annual_kwh, annual_cost = annual_totals(predict_total(sc))
 results.append({
     'Scenario': 'Natural Ventilation',
     'Annual_kWh': int(round(annual_kwh)),
@@ -121,17 +135,15 @@ results.append({
 })
 
 # Combined Moderate
-sc = df.copy()
+sc = ScenarioFrame(df)
 sc['Indoor_Temp_C'] = np.where(sc['Season'] == 3, sc['Indoor_Temp_C'] + 1.5, sc['Indoor_Temp_C'] - 1.5)
 sc['Indoor_Temp_C'] = sc['Indoor_Temp_C'].clip(18, 28)
 sc['Indoor_Temp_Deviation'] = np.abs(sc['Indoor_Temp_C'] - 22)
 low_occupancy = sc['Total_Occupancy_Count'] < 80
-sc.loc[low_occupancy, 'HVAC_Load_Estimate'] *= 0.5
+sc['HVAC_Load_Estimate'] = np.where(low_occupancy, sc['HVAC_Load_Estimate'] * 0.5, sc['HVAC_Load_Estimate'])
 non_working = (sc['Hour'] < 8) | (sc['Hour'] > 17) | (sc['Is_Weekend'] == 1)
-sc.loc[non_working, 'Energy_Plug_Wh'] *= 0.75
-sc['Predicted_Total_Wh'] = predict_total(sc)
-annual_kwh = sc['Predicted_Total_Wh'].mean() * hours_per_year / 1000
-annual_cost = (sc['Predicted_Total_Wh'] / 1000 * sc['Energy_Price_USD_kWh']).mean() * hours_per_year
+sc['Energy_Plug_Wh'] = np.where(non_working, sc['Energy_Plug_Wh'] * 0.75, sc['Energy_Plug_Wh'])
+annual_kwh, annual_cost = annual_totals(predict_total(sc))
 results.append({
     'Scenario': 'Combined Moderate',
     'Annual_kWh': int(round(annual_kwh)),
@@ -141,21 +153,19 @@ results.append({
 })
 
 # Combined Aggressive
-df.copy()
+sc = ScenarioFrame(df)
 sc['Indoor_Temp_C'] = np.where(sc['Season'] == 3, sc['Indoor_Temp_C'] + 3, sc['Indoor_Temp_C'] - 3)
 sc['Indoor_Temp_C'] = sc['Indoor_Temp_C'].clip(18, 30)
 sc['Indoor_Temp_Deviation'] = np.abs(sc['Indoor_Temp_C'] - 22)
 low_occupancy = sc['Total_Occupancy_Count'] < 100
-sc.loc[low_occupancy, 'HVAC_Load_Estimate'] *= 0.3
+sc['HVAC_Load_Estimate'] = np.where(low_occupancy, sc['HVAC_Load_Estimate'] * 0.3, sc['HVAC_Load_Estimate'])
 comfort_temp = (sc['OutsideWeather_Temp_C'] >= 18) & (sc['OutsideWeather_Temp_C'] <= 26)
-sc.loc[comfort_temp, 'HVAC_Load_Estimate'] *= 0.4
+sc['HVAC_Load_Estimate'] = np.where(comfort_temp, sc['HVAC_Load_Estimate'] * 0.4, sc['HVAC_Load_Estimate'])
 non_working = (sc['Hour'] < 8) | (sc['Hour'] > 17) | (sc['Is_Weekend'] == 1)
-sc.loc[non_working, 'Energy_Plug_Wh'] *= 0.5
+sc['Energy_Plug_Wh'] = np.where(non_working, sc['Energy_Plug_Wh'] * 0.5, sc['Energy_Plug_Wh'])
 high_price = sc['Energy_Price_USD_kWh'] > 0.15
-sc.loc[high_price, 'Energy_Plug_Wh'] *= 0.7
-sc['Predicted_Total_Wh'] = predict_total(sc)
-annual_kwh = sc['Predicted_Total_Wh'].mean() * hours_per_year / 1000
-annual_cost = (sc['Predicted_Total_Wh'] / 1000 * sc['Energy_Price_USD_kWh']).mean() * hours_per_year
+sc['Energy_Plug_Wh'] = np.where(high_price, sc['Energy_Plug_Wh'] * 0.7, sc['Energy_Plug_Wh'])
+annual_kwh, annual_cost = annual_totals(predict_total(sc))
 results.append({
     'Scenario': 'Combined Aggressive',
     'Annual_kWh': int(round(annual_kwh)),
@@ -165,15 +175,13 @@ results.append({
 })
 
 # Aggressive HVAC + Natural Ventilation
-sc = df.copy()
+sc = ScenarioFrame(df)
 sc['Indoor_Temp_C'] = np.where(sc['Season'] == 3, sc['Indoor_Temp_C'] + 3, sc['Indoor_Temp_C'] - 2)
 sc['Indoor_Temp_C'] = sc['Indoor_Temp_C'].clip(18, 30)
 sc['Indoor_Temp_Deviation'] = np.abs(sc['Indoor_Temp_C'] - 22)
 comfort_temp = (sc['OutsideWeather_Temp_C'] >= 18) & (sc['OutsideWeather_Temp_C'] <= 27)
-sc.loc[comfort_temp, 'HVAC_Load_Estimate'] *= 0.3
-sc['Predicted_Total_Wh'] = predict_total(sc)
-annual_kwh = sc['Predicted_Total_Wh'].mean() * hours_per_year / 1000
-annual_cost = (sc['Predicted_Total_Wh'] / 1000 * sc['Energy_Price_USD_kWh']).mean() * hours_per_year
+sc['HVAC_Load_Estimate'] = np.where(comfort_temp, sc['HVAC_Load_Estimate'] * 0.3, sc['HVAC_Load_Estimate'])
+annual_kwh, annual_cost = annual_totals(predict_total(sc))
 results.append({
     'Scenario': 'Aggressive HVAC + Natural Ventilation',
     'Annual_kWh': int(round(annual_kwh)),
@@ -183,21 +191,19 @@ results.append({
 })
 
 # Ultimate Combined (All Aggressive)
-sc = df.copy()
+sc = ScenarioFrame(df)
 sc['Indoor_Temp_C'] = np.where(sc['Season'] == 3, sc['Indoor_Temp_C'] + 3, sc['Indoor_Temp_C'] - 3)
 sc['Indoor_Temp_C'] = sc['Indoor_Temp_C'].clip(18, 30)
 sc['Indoor_Temp_Deviation'] = np.abs(sc['Indoor_Temp_C'] - 22)
 low_occupancy = sc['Total_Occupancy_Count'] < 100
-sc.loc[low_occupancy, 'HVAC_Load_Estimate'] *= 0.2
+sc['HVAC_Load_Estimate'] = np.where(low_occupancy, sc['HVAC_Load_Estimate'] * 0.2, sc['HVAC_Load_Estimate'])
 comfort_temp = (sc['OutsideWeather_Temp_C'] >= 18) & (sc['OutsideWeather_Temp_C'] <= 27)
-sc.loc[comfort_temp, 'HVAC_Load_Estimate'] *= 0.2
+sc['HVAC_Load_Estimate'] = np.where(comfort_temp, sc['HVAC_Load_Estimate'] * 0.2, sc['HVAC_Load_Estimate'])
 non_working = (sc['Hour'] < 7) | (sc['Hour'] > 18) | (sc['Is_Weekend'] == 1)
-sc.loc[non_working, 'Energy_Plug_Wh'] *= 0.3
+sc['Energy_Plug_Wh'] = np.where(non_working, sc['Energy_Plug_Wh'] * 0.3, sc['Energy_Plug_Wh'])
 high_price = sc['Energy_Price_USD_kWh'] > 0.14
-sc.loc[high_price, 'Energy_Plug_Wh'] *= 0.6
-sc['Predicted_Total_Wh'] = predict_total(sc)
-annual_kwh = sc['Predicted_Total_Wh'].mean() * hours_per_year / 1000
-annual_cost = (sc['Predicted_Total_Wh'] / 1000 * sc['Energy_Price_USD_kWh']).mean() * hours_per_year
+sc['Energy_Plug_Wh'] = np.where(high_price, sc['Energy_Plug_Wh'] * 0.6, sc['Energy_Plug_Wh'])
+annual_kwh, annual_cost = annual_totals(predict_total(sc))
 results.append({
     'Scenario': 'Ultimate Combined (All Aggressive)',
     'Annual_kWh': int(round(annual_kwh)),
@@ -0,0 +1,229 @@
+"""Time-series-aware hyperparameter search for the HVAC, Lighting and Plug sub-models.
+
+Validation uses expanding-window folds (train on the past, validate on the next block), so no future
+hours leak into training. Random configurations are trained in parallel across cores and pruned by
+successive halving on intermediate boosting rounds; every surviving (configuration, rounds) pair is
+timed for inference, and the report lists the accuracy-versus-cost frontier per model. Workers return
+only scores; the recommended configuration is refit on the full dataset in the parent and written as
+a complete model set (backend MODEL_FILES layout) that /api/models/shadow or /api/models/reload accept.
+
+    python "Tune Models.py" --model all --trials 27 --workers 8
+"""
+import argparse
+import json
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import joblib
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from xgboost import XGBRegressor
+from sklearn.model_selection import TimeSeriesSplit
+from sklearn.preprocessing import StandardScaler
+
+DATASET_PATH = r"C:\Users\Laptop World\Building_Energy_Twin_Sequential_3Years_LowNoise.csv"
+MODEL_DIR = r"C:\Users\Laptop World"
+MODEL_FILES = {
+    'model_hvac': "model_hvac_xgb_3y.pkl",
+    'scaler_hvac': "scaler_hvac_3y.pkl",
+    'model_lighting': "model_lighting_xgb_3y.pkl",
+    'scaler_lighting': "scaler_lighting_3y.pkl",
+    'model_plug': "model_plug_xgb_3y_improved.pkl",
+    'scaler_plug': "scaler_plug_3y_improved.pkl",
+    'meta_model': "meta_model_nn_3y_low_noise.keras",
+    'meta_scaler': "meta_scaler_3y_low_noise.pkl"
+}
+
+MODELS = {
+    'hvac': ('Energy_HVAC_Wh', [
+        'HVAC_Load_Estimate', 'Temp_Occupancy_Interaction', 'Indoor_Temp_Deviation',
+        'Temp_Deviation', 'Total_Occupancy_Count', 'Indoor_Temp_C',
+        'OutsideWeather_Temp_C', 'Hour', 'Is_Daytime', 'OutsideWeather_Humidity_Pct',
+        'Indoor_Humidity_Pct', 'Pressure_mmHg', 'Indoor_Humidity_Deviation',
+        'Season', 'Humidity_Deviation', 'Is_Weekend'
+    ]),
+    'lighting': ('Energy_Lighting_Wh', [
+        'Hour', 'Is_Daytime', 'Total_Occupancy_Count', 'Day_of_Week', 'Is_Weekend',
+        'Season', 'OutsideWeather_Temp_C', 'Temp_Deviation', 'Indoor_Temp_C',
+        'Building_Area_m2', 'Daylight_Hours_Factor', 'Lighting_Occupancy_Ratio',
+        'Solar_Irradiance_Estimate'
+    ]),
+    'plug': ('Energy_Plug_Wh', [
+        'Total_Occupancy_Count', 'Hour', 'Is_Daytime', 'Day_of_Week', 'Is_Weekend',
+        'Season', 'Building_Area_m2', 'Energy_Price_USD_kWh', 'OutsideWeather_Temp_C',
+        'Indoor_Temp_C', 'Plug_Peak_Hour', 'Device_Usage_Factor', 'Remote_Work_Factor',
+        'Price_Sensitivity', 'Temp_Deviation', 'Indoor_Temp_Deviation', 'Solar_Irradiance_Estimate'
+    ])
+}
+
+# Hand-picked settings from the training scripts, always included as a reference trial
+CURRENT_SETTINGS = {
+    'hvac': {'max_depth': 10, 'learning_rate': 0.05, 'subsample': 0.9, 'colsample_bytree': 0.9, 'min_child_weight': 1, 'reg_lambda': 1.0},
+    'lighting': {'max_depth': 8, 'learning_rate': 0.05, 'subsample': 0.9, 'colsample_bytree': 0.9, 'min_child_weight': 1, 'reg_lambda': 1.0},
+    'plug': {'max_depth': 12, 'learning_rate': 0.03, 'subsample': 0.9, 'colsample_bytree': 0.9, 'min_child_weight': 1, 'reg_lambda': 1.0}
+}
+
+TIMING_ROWS = 10000
+TIMING_REPEATS = 7
+
+# Worker-process state, set once by init_worker so folds are not re-sent with every task
+_folds = None
+
+def init_worker(folds):
+    global _folds
+    _folds = [(xgb.DMatrix(X_tr, label=y_tr), xgb.DMatrix(X_va, label=y_va), X_va[:TIMING_ROWS])
+              for X_tr, y_tr, X_va, y_va in folds]
+
+def make_folds(X, y, n_folds):
+    """Expanding-window splits; the scaler is fit on each training block only"""
+    folds = []
+    for train_idx, valid_idx in TimeSeriesSplit(n_splits=n_folds).split(X):
+        scaler = StandardScaler().fit(X[train_idx])
+        folds.append((scaler.transform(X[train_idx]), y[train_idx], scaler.transform(X[valid_idx]), y[valid_idx]))
+    return folds
+
+def sample_configs(n_trials, rng, model_name):
+    configs = [dict(CURRENT_SETTINGS[model_name])]
+    while len(configs) < n_trials:
+        configs.append({
+            'max_depth': int(rng.integers(3, 13)),
+            'learning_rate': float(np.exp(rng.uniform(np.log(0.02), np.log(0.2)))),
+            'subsample': float(rng.uniform(0.6, 1.0)),
+            'colsample_bytree': float(rng.uniform(0.6, 1.0)),
+            'min_child_weight': float(rng.integers(1, 11)),
+            'reg_lambda': float(np.exp(rng.uniform(np.log(0.1), np.log(10))))
+        })
+    return configs
+
+def run_stage(task):
+    """Train one configuration on every fold for `rounds` boosting rounds and return only its scores.
+    Boosters stay in the worker: pickling them back and forth costs more than retraining on small rungs."""
+    trial_id, config, rounds = task
+    params = dict(config, objective='reg:squarederror', tree_method='hist', eval_metric='rmse', nthread=1, seed=42)
+    rmses = []
+    for dtrain, dvalid, X_timing in _folds:
+        booster = xgb.train(params, dtrain, num_boost_round=rounds)
+        pred = booster.predict(dvalid)
+        rmses.append(float(np.sqrt(np.mean((pred - dvalid.get_label()) ** 2))))
+    # Inference cost on the last (largest) fold's model, per 1k rows, single thread; median of repeated runs
+    timings = []
+    for _ in range(TIMING_REPEATS):
+        start = time.perf_counter()
+        booster.inplace_predict(X_timing)
+        timings.append(time.perf_counter() - start)
+    latency = float(np.median(timings)) / len(X_timing) * 1000 * 1000
+    return trial_id, rounds, float(np.mean(rmses)), float(np.std(rmses)), latency
+
+def refit(model_name, X, y, config, rounds, model_dir, base_dir):
+    """Train the recommended configuration on the full dataset and save model + scaler under the backend's
+    MODEL_FILES names; artifacts not tuned here are copied from base_dir, so model_dir is a complete set"""
+    os.makedirs(model_dir, exist_ok=True)
+    for key, name in MODEL_FILES.items():
+        path = os.path.join(model_dir, name)
+        if key not in (f'model_{model_name}', f'scaler_{model_name}') and not os.path.exists(path):
+            copy = shutil.copytree if os.path.isdir(os.path.join(base_dir, name)) else shutil.copy2
+            copy(os.path.join(base_dir, name), path)
+
+    scaler = StandardScaler()
+    X_scaled = scaler.fit_transform(X)
+    model = XGBRegressor(n_estimators=rounds, random_state=42, n_jobs=-1, tree_method='hist', eval_metric='rmse', **config)
+    model.fit(X_scaled, y, verbose=False)
+    joblib.dump(model, os.path.join(model_dir, MODEL_FILES[f'model_{model_name}']))
+    joblib.dump(scaler, os.path.join(model_dir, MODEL_FILES[f'scaler_{model_name}']))
+
+def pareto_front(points):
+    """Points not beaten on both RMSE and latency, cheapest first"""
+    front, best_rmse = [], np.inf
+    for p in sorted(points, key=lambda p: (p['latency_ms_per_1k'], p['rmse'])):
+        if p['rmse'] < best_rmse:
+            front.append(p)
+            best_rmse = p['rmse']
+    return front
+
+def tune_model(model_name, df, args):
+    target, features = MODELS[model_name]
+    X = df[features].values.astype(float)
+    y = df[target].values.astype(float)
+    folds = make_folds(X, y, args.folds)
+    rng = np.random.default_rng(args.seed)
+    configs = sample_configs(args.trials, rng, model_name)
+    stages = sorted(int(r) for r in args.rounds.split(','))
+
+    results = []
+    survivors = list(range(len(configs)))
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=init_worker, initargs=(folds,)) as pool:
+        for stage_index, rounds in enumerate(stages):
+            start = time.perf_counter()
+            tasks = [(i, configs[i], rounds) for i in survivors]
+            stage_results = list(pool.map(run_stage, tasks))
+            for trial_id, r, rmse, rmse_std, latency in stage_results:
+                results.append({'trial': trial_id, 'rounds': r, 'rmse': rmse, 'rmse_std': rmse_std,
+                                'latency_ms_per_1k': latency, 'params': configs[trial_id]})
+            # Successive halving: only the best 1/eta continue to the next, larger budget
+            ranked = sorted(stage_results, key=lambda r: r[2])
+            keep = max(1, len(ranked) // args.eta) if stage_index < len(stages) - 1 else len(ranked)
+            survivors = [r[0] for r in ranked[:keep]]
+            print(f"  {model_name}: {len(tasks)} trials @ {rounds} rounds in {time.perf_counter() - start:.1f}s, "
+                  f"best RMSE {ranked[0][2]:.2f} Wh, {keep} continue")
+
+    front = pareto_front(results)
+    best_rmse = min(r['rmse'] for r in results)
+    within = [p for p in front if p['rmse'] <= best_rmse * (1 + args.tolerance)]
+    recommended = min(within, key=lambda p: p['latency_ms_per_1k'])
+    reference = [r for r in results if r['trial'] == 0]
+    refit(model_name, df[features], y, recommended['params'], recommended['rounds'], args.model_dir, args.base_models)
+    return {
+        'model': model_name,
+        'target': target,
+        'folds': args.folds,
+        'best_rmse': best_rmse,
+        'recommended': dict(recommended, n_estimators=recommended['rounds'], model_dir=args.model_dir),
+        'current_settings': max(reference, key=lambda r: r['rounds']) if reference else None,
+        'frontier': front,
+        'trials': results
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Tune the sub-models with time-series cross-validation")
+    parser.add_argument('--model', choices=list(MODELS) + ['all'], default='all')
+    parser.add_argument('--data', default=DATASET_PATH)
+    parser.add_argument('--trials', type=int, default=27, help="random configurations per model (incl. current settings)")
+    parser.add_argument('--folds', type=int, default=4, help="expanding-window folds")
+    parser.add_argument('--rounds', default='100,300,900,2000', help="boosting-round budgets of the halving stages")
+    parser.add_argument('--eta', type=int, default=3, help="keep the best 1/eta trials after each stage")
+    parser.add_argument('--tolerance', type=float, default=0.01, help="accepted relative RMSE loss for a cheaper model")
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default='tuning_report.json')
+    parser.add_argument('--model-dir', default='tuned_models', help="model set with the refit recommended models (for /api/models/shadow or /reload)")
+    parser.add_argument('--base-models', default=MODEL_DIR, help="model set the untuned artifacts are copied from")
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.data, parse_dates=['Timestamp'], index_col='Timestamp').sort_index()
+    names = list(MODELS) if args.model == 'all' else [args.model]
+
+    reports = []
+    for name in names:
+        print(f"Tuning {name} ({args.trials} trials, {args.folds} folds, {args.workers} workers)")
+        report = tune_model(name, df, args)
+        reports.append(report)
+
+        print(f"\n{name.upper()} accuracy vs inference cost frontier")
+        print(f"{'rounds':>7} {'depth':>6} {'lr':>7} {'RMSE (Wh)':>11} {'ms / 1k rows':>13}")
+        for p in report['frontier']:
+            print(f"{p['rounds']:>7} {p['params']['max_depth']:>6} {p['params']['learning_rate']:>7.3f} {p['rmse']:>11.2f} {p['latency_ms_per_1k']:>13.3f}")
+        rec = report['recommended']
+        print(f"Recommended: {rec['rounds']} rounds, {rec['params']} (RMSE {rec['rmse']:.2f} Wh, {rec['latency_ms_per_1k']:.3f} ms / 1k rows), refit into {rec['model_dir']}")
+        if report['current_settings']:
+            cur = report['current_settings']
+            print(f"Current settings: RMSE {cur['rmse']:.2f} Wh at {cur['rounds']} rounds, {cur['latency_ms_per_1k']:.3f} ms / 1k rows\n")
+
+    with open(args.output, 'w') as f:
+        json.dump(reports, f, indent=2)
+    print(f"Report written to {args.output}")
+
+if __name__ == '__main__':
+    main()
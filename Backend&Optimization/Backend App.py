@@ -1,54 +1,99 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, Response, g, has_request_context
 from flask_cors import CORS
 import pandas as pd
 import numpy as np
 import joblib
+import xgboost as xgb
 import tensorflow as tf
+from scipy.optimize import differential_evolution, linprog
 from tensorflow.keras.models import load_model  # type: ignore
 from datetime import datetime
+from collections import deque
 import os
+import io
+import gc
+import copy
+import json
+import gzip
+import hashlib
+import threading
+import queue
+from functools import wraps
+from itertools import product
+from collections import OrderedDict
+import time
+import random
+import socketserver
+import select
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from twin_scoring import (MODEL_FILES, file_digest, artifacts_digest, load_model_bundle,
+                          hvac_features, lighting_features, plug_features, FULL_CHAIN_COLUMNS, score_student,
+                          score_chunk, start_scoring_pool)
+from scenario_frame import ScenarioFrame
+
+# Optional faster / binary encoders; responses fall back to the stdlib when they are missing
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+try:
+    import brotli
+except ImportError:
+    brotli = None
 
 app = Flask(__name__)
 CORS(app)
 
+TIMESTAMP_FORMAT = '%m/%d/%Y %I:%M:%S %p'
+COMPRESSION_MIN_BYTES = 1024
+MIME_JSON = 'application/json'
+MIME_MSGPACK = 'application/msgpack'
+MIME_ARROW = 'application/vnd.apache.arrow.stream'
+
 BASE_PATH = r"C:\Users\Laptop World"
 DATASET_PATH = r"C:\Users\Laptop World\Desktop\ST\DataSet\Building_Energy_Twin_Sequential_3Years.csv"
 
-model_hvac = joblib.load(os.path.join(BASE_PATH, "model_hvac_xgb_3y.pkl"))
-scaler_hvac = joblib.load(os.path.join(BASE_PATH, "scaler_hvac_3y.pkl"))
+# 'production' serves every request; 'candidate' is only scored in shadow mode
+model_registry = {'production': load_model_bundle(os.environ.get('TWIN_MODEL_DIR', BASE_PATH)), 'candidate': None}
+shadow_evaluator = None
 
-model_lighting = joblib.load(os.path.join(BASE_PATH, "model_lighting_xgb_3y.pkl"))
-scaler_lighting = joblib.load(os.path.join(BASE_PATH, "scaler_lighting_3y.pkl"))
+# Distilled student (see "Distill Model.py"): optional cheaper path selected with mode='fast'
+STUDENT_PATH = os.path.join(BASE_PATH, "student_total_mlp_3y.pkl")
+student_bundle = joblib.load(STUDENT_PATH) if os.path.exists(STUDENT_PATH) else None
 
-model_plug = joblib.load(os.path.join(BASE_PATH, "model_plug_xgb_3y_improved.pkl"))
-scaler_plug = joblib.load(os.path.join(BASE_PATH, "scaler_plug_3y_improved.pkl"))
+# Multi-horizon forecaster (see "Forecast Model.py"): one model per end use on lagged/rolling load features
+FORECAST_PATH = os.path.join(BASE_PATH, "forecast_models_3y.pkl")
+forecast_bundle = joblib.load(FORECAST_PATH) if os.path.exists(FORECAST_PATH) else None
+FORECAST_TARGETS = ['Energy_HVAC_Wh', 'Energy_Lighting_Wh', 'Energy_Plug_Wh', 'Energy_Other_Wh']
+MAX_FORECAST_HORIZON = 168
 
-meta_model = tf.keras.models.load_model(os.path.join(BASE_PATH, "meta_model_nn_3y_low_noise.keras"))
-meta_scaler = joblib.load(os.path.join(BASE_PATH, "meta_scaler_3y_low_noise.pkl"))
+# Default prediction mode for this process ('full' or 'fast'); requests can override it with 'mode'
+PREDICTION_MODE = os.environ.get('TWIN_PREDICTION_MODE', 'full')
 
 df = pd.read_csv(DATASET_PATH, parse_dates=['Timestamp'], index_col='Timestamp')
 
-hvac_features = [
-    'HVAC_Load_Estimate', 'Temp_Occupancy_Interaction', 'Indoor_Temp_Deviation',
-    'Temp_Deviation', 'Total_Occupancy_Count', 'Indoor_Temp_C',
-    'OutsideWeather_Temp_C', 'Hour', 'Is_Daytime', 'OutsideWeather_Humidity_Pct',
-    'Indoor_Humidity_Pct', 'Pressure_mmHg', 'Indoor_Humidity_Deviation',
-    'Season', 'Humidity_Deviation', 'Is_Weekend'
-]
-
-lighting_features = [
-    'Hour', 'Is_Daytime', 'Total_Occupancy_Count', 'Day_of_Week', 'Is_Weekend',
-    'Season', 'OutsideWeather_Temp_C', 'Temp_Deviation', 'Indoor_Temp_C',
-    'Building_Area_m2', 'Daylight_Hours_Factor', 'Lighting_Occupancy_Ratio',
-    'Solar_Irradiance_Estimate'
-]
-
-plug_features = [
-    'Total_Occupancy_Count', 'Hour', 'Is_Daytime', 'Day_of_Week', 'Is_Weekend',
-    'Season', 'Building_Area_m2', 'Energy_Price_USD_kWh', 'OutsideWeather_Temp_C',
-    'Indoor_Temp_C', 'Plug_Peak_Hour', 'Device_Usage_Factor', 'Remote_Work_Factor',
-    'Price_Sensitivity', 'Temp_Deviation', 'Indoor_Temp_Deviation', 'Solar_Irradiance_Estimate'
-]
+MODEL_ARTIFACTS = [os.path.join(model_registry['production']['path'], name) for name in MODEL_FILES.values()] + [STUDENT_PATH, FORECAST_PATH]
+
+# Identical data + models => identical responses; these digests key ETags and the response cache.
+# DATASET_VERSION also counts ingested live readings, so new data invalidates cached responses.
+DATASET_DIGEST = file_digest(DATASET_PATH)[:16]
+DATASET_VERSION = DATASET_DIGEST
+MODEL_VERSION = artifacts_digest(MODEL_ARTIFACTS)
+
+def version_key():
+    return f"{DATASET_VERSION}-{MODEL_VERSION}"
 
 # Enhanced Simulation Scenarios
 SCENARIO_CONFIG = {
@@ -63,25 +108,258 @@ SCENARIO_CONFIG = {
     'peak_demand': {'Energy_Price_USD_kWh': 5.0, 'mod_type': 'multiply'}
 }
 
-def predict_total(df_input):
-    X_hvac = df_input[hvac_features]
-    X_hvac_scaled = scaler_hvac.transform(X_hvac)
-    pred_hvac = model_hvac.predict(X_hvac_scaled)
+def _encode_default(obj):
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, (pd.Timestamp, datetime)):
+        return obj.strftime(TIMESTAMP_FORMAT)
+    if isinstance(obj, (pd.Series, pd.Index)):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not serializable")
+
+def encode_json(payload):
+    if orjson is not None:
+        return orjson.dumps(payload, default=_encode_default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(payload, default=_encode_default, separators=(',', ':')).encode()
+
+def encode_arrow(payload):
+    """Arrow IPC stream of a columnar payload's 'columns'; the remaining keys travel as schema metadata"""
+    table = pa.table({name: np.asarray(values) for name, values in payload['columns'].items()})
+    meta = {k: v for k, v in payload.items() if k != 'columns'}
+    table = table.replace_schema_metadata({'payload': encode_json(meta)})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+def columnar(frame, columns):
+    """Column-oriented payload: one array per column instead of one dict per row"""
+    data = {'timestamp': frame.index.strftime(TIMESTAMP_FORMAT).tolist()}
+    for col in columns:
+        data[col] = frame[col].values
+    return data
+
+def api_response(payload, status=200):
+    """Encode payload per the Accept header (JSON, MessagePack, Arrow) and compress it per Accept-Encoding"""
+    offers = [MIME_JSON]
+    if msgpack is not None:
+        offers.append(MIME_MSGPACK)
+    if pa is not None and isinstance(payload.get('columns'), dict):
+        offers.append(MIME_ARROW)
+    mimetype = request.accept_mimetypes.best_match(offers, default=MIME_JSON) or MIME_JSON
+
+    if mimetype == MIME_MSGPACK:
+        body = msgpack.packb(payload, default=_encode_default, use_bin_type=True)
+    elif mimetype == MIME_ARROW:
+        body = encode_arrow(payload)
+    else:
+        body = encode_json(payload)
+
+    headers = {'Vary': 'Accept, Accept-Encoding'}
+    if len(body) >= COMPRESSION_MIN_BYTES:
+        accepted = request.headers.get('Accept-Encoding', '')
+        if brotli is not None and 'br' in accepted:
+            body = brotli.compress(body, quality=4)
+            headers['Content-Encoding'] = 'br'
+        elif 'gzip' in accepted:
+            body = gzip.compress(body, compresslevel=5)
+            headers['Content-Encoding'] = 'gzip'
+    return Response(body, status=status, mimetype=mimetype, headers=headers)
+
+RESPONSE_CACHE_SIZE = 512
+response_cache = OrderedDict()
+response_cache_lock = threading.Lock()
+
+def budget_bounded(body):
+    """Requests whose result depends on a time budget: the control search (method='search') stops when its
+    budget runs out and Monte Carlo bands (uncertainty) size their sample to the latency budget"""
+    return isinstance(body, dict) and (body.get('method') == 'search' or bool(body.get('uncertainty')))
+
+def cached_endpoint(view):
+    """ETag / If-None-Match handling plus a server-side LRU of encoded responses, keyed by version_key().
+    Budget-bounded requests are neither cached nor ETagged; each one is computed afresh."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        body = request.get_json(silent=True) if request.method == 'POST' else None
+        if budget_bounded(body):
+            response = view(*args, **kwargs)
+            response.headers['Cache-Control'] = 'no-store'
+            return response
+        request_key = json.dumps({
+            'version': version_key(),
+            'path': request.path,
+            'args': sorted(request.args.items(multi=True)),
+            'body': body,
+            'accept': request.headers.get('Accept', ''),
+            'encoding': request.headers.get('Accept-Encoding', '')
+        }, sort_keys=True, default=str)
+        etag = hashlib.sha256(request_key.encode()).hexdigest()[:32]
+        headers = {'ETag': f'"{etag}"', 'Cache-Control': 'no-cache', 'Vary': 'Accept, Accept-Encoding'}
+
+        # Revalidation is answered before any lookup or model work
+        if etag in request.if_none_match:
+            return Response(status=304, headers=headers)
+
+        with response_cache_lock:
+            cached = response_cache.get(etag)
+            if cached is not None:
+                response_cache.move_to_end(etag)
+        if cached is None:
+            response = view(*args, **kwargs)
+            if response.status_code != 200:
+                return response
+            cached = (response.get_data(), response.mimetype, dict(response.headers))
+            with response_cache_lock:
+                response_cache[etag] = cached
+                while len(response_cache) > RESPONSE_CACHE_SIZE:
+                    response_cache.popitem(last=False)
+
+        body, mimetype, stored_headers = cached
+        stored_headers = {k: v for k, v in stored_headers.items() if k.lower() in ('content-encoding',)}
+        return Response(body, status=200, mimetype=mimetype, headers=dict(stored_headers, **headers))
+    return wrapper
+
+# Content-addressed prediction cache: one LRU per sub-model and the meta model, keyed by
+# blake2b(exact input vector) under the bundle version, so a model swap never serves stale values
+PREDICTION_CACHE_SIZE = 200000
+PREDICTION_CACHE_TTL_S = 3600
+PREDICTION_CACHE_MAX_BATCH = 4096  # larger batches (search, Monte Carlo, whole dataset) are unique inputs; bypass
+
+class PredictionCache:
+    def __init__(self, max_entries=PREDICTION_CACHE_SIZE, ttl_s=PREDICTION_CACHE_TTL_S):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = self.misses = self.bypassed = self.evictions = self.expirations = 0
+
+    @staticmethod
+    def row_keys(X, version):
+        salt = version.encode()[:64]
+        return [hashlib.blake2b(row.tobytes(), digest_size=16, key=salt).digest() for row in X]
+
+    def lookup(self, X, version, score):
+        """Predictions for every row of X; only rows not cached (deduplicated) are passed to score"""
+        X = np.ascontiguousarray(X, dtype=np.float64)
+        if len(X) > PREDICTION_CACHE_MAX_BATCH:
+            with self.lock:
+                self.bypassed += len(X)
+            return np.asarray(score(X), dtype=np.float64).ravel()
 
-    X_lighting = df_input[lighting_features]
-    X_lighting_scaled = scaler_lighting.transform(X_lighting)
-    pred_lighting = model_lighting.predict(X_lighting_scaled)
+        keys = self.row_keys(X, version)
+        out = np.empty(len(X))
+        missing = OrderedDict()
+        now = time.monotonic()
+        with self.lock:
+            for i, key in enumerate(keys):
+                entry = self.entries.get(key)
+                if entry is not None and entry[1] < now:
+                    del self.entries[key]
+                    self.expirations += 1
+                    entry = None
+                if entry is None:
+                    missing.setdefault(key, []).append(i)
+                else:
+                    self.entries.move_to_end(key)
+                    out[i] = entry[0]
+            self.hits += len(keys) - len(missing)
+            self.misses += len(missing)
 
-    X_plug = df_input[plug_features]
-    X_plug_scaled = scaler_plug.transform(X_plug)
-    pred_plug = model_plug.predict(X_plug_scaled)
+        if missing:
+            first_rows = [rows[0] for rows in missing.values()]
+            scored = np.asarray(score(X[first_rows]), dtype=np.float64).ravel()
+            expires = time.monotonic() + self.ttl_s
+            with self.lock:
+                for (key, rows), value in zip(missing.items(), scored):
+                    out[rows] = value
+                    self.entries[key] = (float(value), expires)
+                    self.entries.move_to_end(key)
+                while len(self.entries) > self.max_entries:
+                    self.entries.popitem(last=False)
+                    self.evictions += 1
+        return out
 
-    meta_input = np.column_stack([pred_hvac, pred_lighting, pred_plug, df_input['Energy_Other_Wh'].values])
-    meta_input_scaled = meta_scaler.transform(meta_input)
-    pred_total = meta_model.predict(meta_input_scaled, verbose=0).flatten()
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self.entries),
+                'max_entries': self.max_entries,
+                'ttl_s': self.ttl_s,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else None,
+                'bypassed_rows': self.bypassed,
+                'evictions': self.evictions,
+                'expirations': self.expirations
+            }
+
+    def clear(self, reset_stats=True):
+        with self.lock:
+            self.entries.clear()
+            if reset_stats:
+                self.hits = self.misses = self.bypassed = self.evictions = self.expirations = 0
+
+prediction_caches = {name: PredictionCache() for name in ('hvac', 'lighting', 'plug', 'meta')}
+
+def active_bundle():
+    """The production bundle, pinned for the whole request so a hot swap never mixes model versions"""
+    if has_request_context():
+        if 'model_bundle' not in g:
+            g.model_bundle = model_registry['production']
+        return g.model_bundle
+    return model_registry['production']
+
+def cached_sub_model(name, bundle, df_input, features):
+    model, scaler = bundle[f'model_{name}'], bundle[f'scaler_{name}']
+    score = lambda X: model.predict(scaler.transform(pd.DataFrame(X, columns=features)))
+    return prediction_caches[name].lookup(df_input[features].values, bundle['version'], score)
+
+def predict_total(df_input, bundle=None):
+    # Read once: a concurrent DELETE or POST /api/models/shadow may replace the global at any moment
+    evaluator = shadow_evaluator if bundle is None else None
+    bundle = bundle or active_bundle()
+    start = time.perf_counter()
+
+    pred_hvac = cached_sub_model('hvac', bundle, df_input, hvac_features)
+    pred_lighting = cached_sub_model('lighting', bundle, df_input, lighting_features)
+    pred_plug = cached_sub_model('plug', bundle, df_input, plug_features)
+
+    pred_total = predict_meta(pred_hvac, pred_lighting, pred_plug, df_input['Energy_Other_Wh'].values, bundle)
     
+    if evaluator is not None:
+        try:
+            evaluator.maybe_submit(df_input, (pred_hvac, pred_lighting, pred_plug, pred_total), time.perf_counter() - start)
+        except Exception:
+            app.logger.exception("Shadow mirroring failed")
     return pred_hvac, pred_lighting, pred_plug, pred_total
 
+def predict_meta(pred_hvac, pred_lighting, pred_plug, energy_other, bundle=None):
+    """Aggregate sub-system loads into Total_Energy_Wh with the meta model"""
+    bundle = bundle or active_bundle()
+    meta_input = np.column_stack([pred_hvac, pred_lighting, pred_plug, energy_other])
+    score = lambda X: bundle['meta_model'].predict(bundle['meta_scaler'].transform(X), verbose=0).flatten()
+    return prediction_caches['meta'].lookup(meta_input, bundle['version'], score)
+
+def predict_fast(df_input):
+    """Single-model approximation of predict_total using the distilled student"""
+    if student_bundle is None:
+        raise ValueError("Fast mode unavailable: distilled model not found at " + STUDENT_PATH)
+    return score_student(student_bundle, df_input)
+
+def resolve_mode(req):
+    mode = (req or {}).get('mode') or PREDICTION_MODE
+    if mode not in ('full', 'fast'):
+        raise ValueError(f"Unknown mode '{mode}', expected 'full' or 'fast'")
+    return mode
+
+def predict_with_mode(df_input, mode='full'):
+    if mode == 'fast':
+        return predict_fast(df_input)
+    return predict_total(df_input)
+
 def get_closest_timestamp(target_time):
     target_dt = pd.to_datetime(target_time)
     time_diff = abs(df.index - target_dt)
@@ -89,50 +367,1754 @@ def get_closest_timestamp(target_time):
     return df.index[closest_idx]
 
 def recalculate_derived_features(df_scenario):
-    """Recalculate derived features after modifications"""
-    df_scenario = df_scenario.copy()
+    """Recalculate derived features after modifications (as an overlay: the input's columns are shared, not copied)"""
+    df_scenario = ScenarioFrame(df_scenario)
     df_scenario['Indoor_Temp_Deviation'] = np.abs(df_scenario['Indoor_Temp_C'] - 22)
     df_scenario['Temp_Deviation'] = np.abs(df_scenario['OutsideWeather_Temp_C'] - df_scenario['Indoor_Temp_C'])
     df_scenario['Temp_Occupancy_Interaction'] = df_scenario['Temp_Deviation'] * df_scenario['Total_Occupancy_Count']
     return df_scenario
 
+# Continuous control variables searched by /api/optimize with method='search': name -> (low, high)
+CONTROL_BOUNDS = {
+    'setpoint_offset_winter': (-3.0, 3.0),
+    'setpoint_offset_spring': (-3.0, 3.0),
+    'setpoint_offset_summer': (-3.0, 3.0),
+    'setpoint_offset_autumn': (-3.0, 3.0),
+    'occupancy_threshold': (0.0, 200.0),
+    'low_occupancy_hvac_factor': (0.3, 1.0),
+    'off_hours_plug_factor': (0.3, 1.0),
+    'price_threshold': (0.08, 0.20),
+    'high_price_factor': (0.5, 1.0)
+}
+CONTROL_NAMES = list(CONTROL_BOUNDS)
+COMFORT_BAND_C = (20.0, 26.0)
+SEARCH_TIME_BUDGET_S = 2.0
+SEARCH_BATCH_ROWS = 200000
+SEARCH_MAX_WINDOW_HOURS = 168
+SEARCH_MAX_POPSIZE = 12
+SEARCH_MIN_POPSIZE = 2
+SEARCH_PILOT_CANDIDATES = 8
+SEARCH_INIT_BUDGET_FRACTION = 0.5  # share of the budget the initial population may take
+
+def apply_control_batch(base, params):
+    """Stack one copy of base per candidate in params (S x len(CONTROL_NAMES)) and apply the controls"""
+    n_candidates, n_rows = len(params), len(base)
+    stacked = pd.DataFrame({col: np.tile(base[col].values, n_candidates) for col in base.columns})
+    p = {name: np.repeat(params[:, i], n_rows) for i, name in enumerate(CONTROL_NAMES)}
+
+    season = stacked['Season'].values
+    offset = np.select(
+        [season == 1, season == 2, season == 3],
+        [p['setpoint_offset_winter'], p['setpoint_offset_spring'], p['setpoint_offset_summer']],
+        p['setpoint_offset_autumn']
+    )
+    occupancy = stacked['Total_Occupancy_Count'].values
+    price = stacked['Energy_Price_USD_kWh'].values
+    off_hours = (stacked['Hour'].values < 8) | (stacked['Hour'].values > 17) | (stacked['Is_Weekend'].values == 1)
+    low_occupancy = occupancy < p['occupancy_threshold']
+    high_price = price > p['price_threshold']
+
+    indoor = stacked['Indoor_Temp_C'].values + offset
+    return stacked.assign(
+        Indoor_Temp_C=indoor,
+        HVAC_Load_Estimate=stacked['HVAC_Load_Estimate'].values
+            * np.where(low_occupancy, p['low_occupancy_hvac_factor'], 1.0)
+            * np.where(high_price, p['high_price_factor'], 1.0),
+        Device_Usage_Factor=stacked['Device_Usage_Factor'].values
+            * np.where(off_hours, p['off_hours_plug_factor'], 1.0)
+            * np.where(high_price, p['high_price_factor'], 1.0)
+    )
+
+def enforce_comfort(sc, base, comfort_band):
+    """Occupied hours stay inside the comfort band (or no further out than the baseline already was)"""
+    low, high = comfort_band
+    baseline_indoor = np.tile(base['Indoor_Temp_C'].values, len(sc) // len(base))
+    occupied = sc['Total_Occupancy_Count'].values > 0
+    lower = np.minimum(low, baseline_indoor)
+    upper = np.maximum(high, baseline_indoor)
+    indoor = np.where(occupied, np.clip(sc['Indoor_Temp_C'].values, lower, upper), sc['Indoor_Temp_C'].values)
+    return sc.assign(Indoor_Temp_C=np.clip(indoor, 16, 30))
+
+def evaluate_controls(base, params, mode, comfort_band):
+    """Score every candidate in one batched pass per chunk; returns (S,) window cost and the raw predictions"""
+    chunk = max(1, SEARCH_BATCH_ROWS // len(base))
+    costs, outputs = [], []
+    for start in range(0, len(params), chunk):
+        sc = apply_control_batch(base, params[start:start + chunk])
+        sc = recalculate_derived_features(enforce_comfort(sc, base, comfort_band))
+        preds = predict_with_mode(sc, mode)
+        shape = (-1, len(base))
+        costs.append((preds[3] / 1000 * sc['Energy_Price_USD_kWh'].values).reshape(shape).sum(axis=1))
+        outputs.append([pred.reshape(shape) for pred in preds])
+    return np.concatenate(costs), [np.concatenate([o[i] for o in outputs]) for i in range(4)]
+
+def search_control_parameters(base, mode, time_budget=SEARCH_TIME_BUDGET_S, comfort=None, patience=5):
+    """Differential evolution over CONTROL_BOUNDS minimizing window cost, stopped by time budget or stagnation.
+
+    DE scores its whole initial population before the first budget check, so the population size is
+    chosen from the per-candidate cost measured on a pilot batch (which also scores the no-control case).
+    """
+    comfort_band = tuple(comfort) if comfort else COMFORT_BAND_C
+    bounds = [CONTROL_BOUNDS[name] for name in CONTROL_NAMES]
+    start = time.perf_counter()
+
+    no_control = np.array([0, 0, 0, 0, 0, 1, 1, 1, 1], dtype=float)
+    low, high = np.array(bounds).T
+    pilot = np.vstack([no_control, np.random.default_rng(42).uniform(low, high, (SEARCH_PILOT_CANDIDATES - 1, len(bounds)))])
+    pilot_costs, _ = evaluate_controls(base, pilot, mode, comfort_band)
+    per_candidate_s = (time.perf_counter() - start) / len(pilot)
+    popsize = int(np.clip(time_budget * SEARCH_INIT_BUDGET_FRACTION / (per_candidate_s * len(bounds)),
+                          SEARCH_MIN_POPSIZE, SEARCH_MAX_POPSIZE))
+
+    state = {'evaluations': len(pilot), 'generations': 0, 'best': np.inf, 'population_best': np.inf,
+             'stale': 0, 'last_gen_s': 0.0, 'gen_start': time.perf_counter(), 'stop_reason': 'converged'}
+
+    def objective(x):
+        # vectorized=True hands over the whole population as (n_params, S)
+        costs, _ = evaluate_controls(base, np.atleast_2d(x.T), mode, comfort_band)
+        state['evaluations'] += len(costs)
+        # DE keeps every improving trial, so the best cost seen so far is the population's best fitness
+        state['population_best'] = min(state['population_best'], float(costs.min()))
+        return costs
+
+    def on_generation(xk, convergence):
+        now = time.perf_counter()
+        state['generations'] += 1
+        state['last_gen_s'] = now - state['gen_start']
+        state['gen_start'] = now
+        best = state['population_best']
+        if best < state['best'] * (1 - 1e-4):
+            state['best'], state['stale'] = best, 0
+        else:
+            state['stale'] += 1
+        if state['stale'] >= patience:
+            state['stop_reason'] = 'no_improvement'
+            return True
+        if now - start + state['last_gen_s'] > time_budget:
+            state['stop_reason'] = 'time_budget'
+            return True
+        return False
+
+    result = differential_evolution(
+        objective, bounds, popsize=popsize, maxiter=200, tol=1e-6, seed=42,
+        polish=False, vectorized=True, updating='deferred',
+        callback=on_generation
+    )
+
+    best_params = np.atleast_2d(result.x)
+    costs, (hvac, lighting, plug, total) = evaluate_controls(base, best_params, mode, comfort_band)
+    return {
+        'mean_total_wh': float(total.mean()),
+        'mean_hvac_wh': float(hvac.mean()),
+        'mean_lighting_wh': float(lighting.mean()),
+        'mean_plug_wh': float(plug.mean()),
+        'mean_cost_usd': float(costs[0] / len(base)),
+        'details': {
+            'parameters': {name: round(float(v), 4) for name, v in zip(CONTROL_NAMES, result.x)},
+            'window_hours': len(base),
+            'window_cost_usd': round(float(costs[0]), 4),
+            'no_control_cost_usd': round(float(pilot_costs[0]), 4),
+            'comfort_band_c': list(comfort_band),
+            'population_size': popsize * len(bounds),
+            'evaluations': state['evaluations'],
+            'generations': state['generations'],
+            'elapsed_s': round(time.perf_counter() - start, 3),
+            'stop_reason': state['stop_reason']
+        }
+    }
+
+# Monte Carlo uncertainty: input noise matches the synthetic generator (sigma 3 C, sigma 50 occupants)
+MC_TEMP_SIGMA_C = 3.0
+MC_OCCUPANCY_SIGMA = 50.0
+MC_MAX_SAMPLES = 5000
+MC_PILOT_SAMPLES = 256
+MC_CHUNK_ROWS = 8192
+MC_LATENCY_BUDGET_S = 1.0
+# Worker processes for large batches (0 = score in-process). Workers import only twin_scoring and load
+# their own copy of the model set; requests score in-process until every worker is ready.
+MC_POOL_WORKERS = int(os.environ.get('TWIN_MC_WORKERS', 0))
+mc_pool = None
+mc_pool_lock = threading.Lock()
+mc_pool_generation = 0
+
+def perturb_inputs(base, n_samples, rng):
+    """n_samples noisy copies of base (sample-major), with the dependent features recomputed"""
+    samples = pd.DataFrame({col: np.tile(base[col].values, n_samples) for col in base.columns})
+    samples['OutsideWeather_Temp_C'] = (samples['OutsideWeather_Temp_C'] + rng.normal(0, MC_TEMP_SIGMA_C, len(samples))).clip(5, 40)
+    samples['Total_Occupancy_Count'] = np.round(samples['Total_Occupancy_Count'] + rng.normal(0, MC_OCCUPANCY_SIGMA, len(samples))).clip(0, 400)
+    samples['HVAC_Load_Estimate'] = samples['Building_Area_m2'] * np.abs(samples['OutsideWeather_Temp_C'] - 22) * 0.01 + samples['Total_Occupancy_Count'] * 30
+    samples['Lighting_Occupancy_Ratio'] = samples['Total_Occupancy_Count'] / 401
+    samples['Device_Usage_Factor'] = samples['Total_Occupancy_Count'] / 400 * (1 + 0.2 * (samples['Season'] == 3))
+    return samples
+
+def start_mc_pool(model_dir):
+    """Retire the current Monte Carlo workers and start new ones on model_dir in the background"""
+    global mc_pool, mc_pool_generation
+    if MC_POOL_WORKERS <= 0:
+        return
+    with mc_pool_lock:
+        mc_pool_generation += 1
+        generation = mc_pool_generation
+        retired, mc_pool = mc_pool, None
+    if retired is not None:
+        retired.shutdown(wait=False)
+    threading.Thread(target=_warm_mc_pool, args=(model_dir, generation), daemon=True).start()
+
+def _warm_mc_pool(model_dir, generation):
+    global mc_pool
+    try:
+        pool = start_scoring_pool(MC_POOL_WORKERS, model_dir, STUDENT_PATH)
+    except Exception:
+        app.logger.exception("Monte Carlo workers failed to start")
+        return
+    # A swap that started newer workers meanwhile wins
+    with mc_pool_lock:
+        if generation == mc_pool_generation:
+            mc_pool, pool = pool, None
+    if pool is not None:
+        pool.shutdown(wait=False)
+
+def _score_chunk(frame, mode):
+    pred_hvac, pred_lighting, pred_plug, pred_total = predict_with_mode(frame, mode)
+    return pred_total
+
+def score_totals(frame, mode):
+    """Total_Energy_Wh for a large frame, scored in chunks and, once it is ready, across the worker pool"""
+    pool = mc_pool
+    if pool is not None and len(frame) > MC_CHUNK_ROWS:
+        # Workers get plain frames of just the model inputs
+        columns = student_bundle['features'] if mode == 'fast' and student_bundle is not None else FULL_CHAIN_COLUMNS
+        inputs = frame[columns]
+        chunks = [inputs.iloc[i:i + MC_CHUNK_ROWS] for i in range(0, len(inputs), MC_CHUNK_ROWS)]
+        try:
+            return np.concatenate(list(pool.map(score_chunk, chunks, [mode] * len(chunks))))
+        except BrokenProcessPool:
+            app.logger.exception("Monte Carlo workers failed, restarting")
+            start_mc_pool(model_registry['production']['path'])
+    chunks = [frame.iloc[i:i + MC_CHUNK_ROWS] for i in range(0, len(frame), MC_CHUNK_ROWS)]
+    return np.concatenate([_score_chunk(chunk, mode) for chunk in chunks])
+
+def percentile_band(values):
+    p5, p50, p95 = np.percentile(values, [5, 50, 95])
+    return {'p5': float(p5), 'p50': float(p50), 'p95': float(p95)}
+
+def monte_carlo_bands(base, mode, transforms=None, n_samples=None, budget_s=MC_LATENCY_BUDGET_S, seed=0):
+    """P5/P50/P95 of hourly energy and cost for each transform applied to perturbed copies of base.
+
+    The sample count is the requested one capped by what fits in budget_s, estimated from a pilot batch.
+    """
+    transforms = transforms or {'scenario': lambda d: d}
+    rng = np.random.default_rng(seed)
+    start = time.perf_counter()
+    n_rows = len(base)
+
+    def run(samples):
+        out = {}
+        for name, transform in transforms.items():
+            sc = recalculate_derived_features(transform(samples))
+            total = score_totals(sc, mode).reshape(-1, n_rows)
+            cost = total / 1000 * sc['Energy_Price_USD_kWh'].values.reshape(-1, n_rows)
+            out[name] = (total.mean(axis=1), cost.mean(axis=1))
+        return out
+
+    requested = int(MC_MAX_SAMPLES if n_samples is None else n_samples)
+    if requested <= 0:
+        raise ValueError("samples must be a positive integer")
+    pilot_n = min(MC_PILOT_SAMPLES, requested)
+    results = [run(perturb_inputs(base, pilot_n, rng))]
+    per_sample_s = (time.perf_counter() - start) / pilot_n
+    remaining_budget = budget_s - (time.perf_counter() - start)
+    extra = int(min(requested - pilot_n, max(remaining_budget, 0) / per_sample_s))
+    if extra > 0:
+        results.append(run(perturb_inputs(base, extra, rng)))
+
+    bands = {}
+    for name in transforms:
+        energy = np.concatenate([r[name][0] for r in results])
+        cost = np.concatenate([r[name][1] for r in results])
+        bands[name] = {'samples': len(energy), 'energy_wh': percentile_band(energy), 'cost': percentile_band(cost)}
+    return bands, round(time.perf_counter() - start, 3)
+
+# Day-ahead load shifting: share of each hour's load that may move, and in which direction
+SHIFT_DEFAULTS = {
+    'Energy_HVAC_Wh': {'deferrable': 0.2, 'direction': 'advance'},   # pre-cooling / pre-heating
+    'Energy_Plug_Wh': {'deferrable': 0.3, 'direction': 'defer'}      # deferrable plug loads
+}
+SHIFT_MAX_INCREASE = 0.5
+SHIFT_RAMP_FRACTION = 0.25
+
+def shift_schedule(load, price, deferrable, max_increase, ramp, direction):
+    """Cost-minimizing hourly shift x (sum zero) of one sub-system load, solved as a small LP.
+
+    Bounds: -deferrable*load <= x <= max_increase*load. Ramp: the shifted profile changes by at most
+    max(ramp, baseline change) between hours. 'advance' only moves energy earlier (cumulative x >= 0),
+    'defer' only later (cumulative x <= 0).
+    """
+    n = len(load)
+    bounds = list(zip(-deferrable * load, max_increase * load))
+    diff = np.eye(n)[1:] - np.eye(n)[:-1]
+    ramp_limit = np.maximum(ramp, np.abs(np.diff(load)))
+    cumulative = np.tril(np.ones((n, n)))
+    sign = -1.0 if direction == 'advance' else 1.0
+    A_ub = np.vstack([diff, -diff, sign * cumulative])
+    b_ub = np.concatenate([ramp_limit - np.diff(load), ramp_limit + np.diff(load), np.zeros(n)])
+    result = linprog(price, A_ub=A_ub, b_ub=b_ub, A_eq=np.ones((1, n)), b_eq=[0.0], bounds=bounds, method='highs')
+    if not result.success:
+        return np.zeros(n)
+    return result.x
+
+# Lumped RC thermal model: one air/mass node per building, integrated hourly with the exact
+# exponential step so a 1 h step stays stable for any time constant. Scenarios are rows of every array.
+THERMAL_UA_W_PER_M2K = 1.5            # envelope + ventilation conductance per floor area
+THERMAL_CAPACITY_J_PER_M2K = 2.0e5    # effective heat capacity per floor area (medium-weight construction)
+THERMAL_GAIN_PER_OCCUPANT_W = 100.0
+THERMAL_SOLAR_APERTURE = 0.01         # effective solar aperture as a fraction of floor area
+HVAC_CAPACITY_W_PER_M2 = 50.0
+THERMAL_DEFAULT_CONTROL = {
+    'heat_setpoint': 20.0,     # occupied-hours heating setpoint (C)
+    'cool_setpoint': 24.0,     # occupied-hours cooling setpoint (C)
+    'setback_c': 0.0,          # unoccupied hours widen the band by this much on each side
+    'precool_hours': 0,        # hours before occupancy with a lowered cooling setpoint
+    'precool_offset_c': 0.0,
+    'outdoor_offset_c': 0.0    # weather perturbation, e.g. +5 for a heatwave
+}
+THERMAL_MAX_VARIANTS = 1000
+THERMAL_MAX_VARIANT_HOURS = 500000     # variants x hours per request, e.g. 54 variants over a year
+THERMAL_MAX_TRAJECTORIES = 10
+THERMAL_MAX_TRAJECTORY_HOURS = 744
+
+def occupied_hours(frame):
+    return ((frame.index.dayofweek < 5) & (frame.index.hour >= 7) & (frame.index.hour <= 18))
+
+def control_setpoints(controls, occupied):
+    """(heating, cooling) setpoint matrices of shape (variants, hours)"""
+    n_hours = len(occupied)
+    heat = controls['heat_setpoint'][:, None] - controls['setback_c'][:, None] * ~occupied
+    cool = controls['cool_setpoint'][:, None] + controls['setback_c'][:, None] * ~occupied
+
+    # Hours until the next occupied hour, for the pre-cooling window
+    occupied_idx = np.flatnonzero(occupied)
+    positions = np.arange(n_hours)
+    if len(occupied_idx):
+        following = np.searchsorted(occupied_idx, positions)
+        until = np.where(following < len(occupied_idx), occupied_idx[np.minimum(following, len(occupied_idx) - 1)] - positions, n_hours)
+    else:
+        until = np.full(n_hours, n_hours)
+    precool = ~occupied & (until <= controls['precool_hours'][:, None])
+    cool = np.where(precool, controls['cool_setpoint'][:, None] - controls['precool_offset_c'][:, None], cool)
+    heat = np.minimum(heat, cool - 0.5)
+    return heat, cool
+
+def simulate_thermal(frame, controls, initial_temp):
+    """Indoor temperature (hour means) and HVAC heat input (W, + heating / - cooling) per variant and hour"""
+    area = frame['Building_Area_m2'].values.astype(float)
+    ua = area * THERMAL_UA_W_PER_M2K
+    decay = np.exp(-3600.0 * ua / (area * THERMAL_CAPACITY_J_PER_M2K))
+    mean_factor = (1 - decay) / -np.log(decay)
+    capacity = area * HVAC_CAPACITY_W_PER_M2
+    gains = (frame['Total_Occupancy_Count'].values * THERMAL_GAIN_PER_OCCUPANT_W
+             + frame['Solar_Irradiance_Estimate'].values * area * THERMAL_SOLAR_APERTURE)
+    outdoor = frame['OutsideWeather_Temp_C'].values[None, :] + controls['outdoor_offset_c'][:, None]
+    heat_sp, cool_sp = control_setpoints(controls, occupied_hours(frame))
+
+    n_variants, n_hours = heat_sp.shape
+    temps = np.empty((n_variants, n_hours))
+    q_hvac = np.empty((n_variants, n_hours))
+    t = np.full(n_variants, float(initial_temp))
+    for h in range(n_hours):
+        free_eq = outdoor[:, h] + gains[h] / ua[h]
+        free_end = free_eq + (t - free_eq) * decay[h]
+        # Heat input that makes the hour end on the nearest setpoint (zero inside the band), within capacity
+        target = np.clip(free_end, heat_sp[:, h], cool_sp[:, h])
+        q = np.clip(ua[h] * ((target - t * decay[h]) / (1 - decay[h]) - free_eq), -capacity[h], capacity[h])
+        eq = free_eq + q / ua[h]
+        temps[:, h] = eq + (t - eq) * mean_factor[h]
+        q_hvac[:, h] = q
+        t = eq + (t - eq) * decay[h]
+    return temps, q_hvac
+
+def score_hvac_trajectories(frame, temps, mode, outdoor_offset=None):
+    """HVAC sub-model (or student) load for every (variant, hour) with the simulated indoor temperature
+    and each variant's outdoor temperature (the recorded weather plus outdoor_offset[variant])"""
+    if mode == 'fast' and student_bundle is None:
+        raise ValueError("Fast mode unavailable: distilled model not found at " + STUDENT_PATH)
+    features = student_bundle['features'] if mode == 'fast' else hvac_features
+    base = recalculate_derived_features(frame)[features]
+    n_variants, n_hours = temps.shape
+    offset = np.zeros(n_variants) if outdoor_offset is None else np.asarray(outdoor_offset, dtype=float)
+    recorded = frame['OutsideWeather_Temp_C'].values
+    outdoor = recorded[None, :] + offset[:, None]
+    occupancy = frame['Total_Occupancy_Count'].values
+    # Recorded estimate shifted by the generator's outdoor term, so a zero offset keeps it unchanged
+    load_estimate = frame['HVAC_Load_Estimate'].values + frame['Building_Area_m2'].values * (np.abs(outdoor - 22) - np.abs(recorded - 22)) * 0.01
+    chunk = max(1, SEARCH_BATCH_ROWS // n_hours)
+    out = np.empty((n_variants, n_hours))
+    bundle = active_bundle()
+    for i in range(0, n_variants, chunk):
+        block = temps[i:i + chunk]
+        X = pd.DataFrame(np.tile(base.values, (len(block), 1)), columns=features)
+        indoor = block.ravel()
+        outside = outdoor[i:i + chunk].ravel()
+        tiled_occupancy = np.tile(occupancy, len(block))
+        # Every indoor- and outdoor-dependent column, with the dataset generator's definitions
+        derived = {
+            'Indoor_Temp_C': indoor,
+            'Indoor_Temp_Deviation': np.abs(indoor - 22),
+            'OutsideWeather_Temp_C': outside,
+            'Temp_Deviation': np.abs(outside - indoor),
+            'HVAC_Load_Estimate': load_estimate[i:i + chunk].ravel()
+        }
+        derived['Temp_Occupancy_Interaction'] = derived['Temp_Deviation'] * tiled_occupancy
+        for column, values in derived.items():
+            if column in X.columns:
+                X[column] = values
+        if mode == 'fast':
+            pred = predict_fast(X)[0]
+        else:
+            pred = bundle['model_hvac'].predict(bundle['scaler_hvac'].transform(X))
+        out[i:i + chunk] = np.asarray(pred).reshape(len(block), n_hours)
+    return out
+
+def expand_thermal_variants(req, n_hours):
+    """Explicit 'variants' list and/or a 'grid' of values per control, merged over the defaults.
+    The variant count is checked before the grid is expanded, and variants x n_hours is capped."""
+    variants = [dict(THERMAL_DEFAULT_CONTROL, **v) for v in req.get('variants', [])]
+    grid = req.get('grid')
+    n_variants = max(len(variants) + (int(np.prod([len(values) for values in grid.values()])) if grid else 0), 1)
+    if n_variants > THERMAL_MAX_VARIANTS:
+        raise ValueError(f"At most {THERMAL_MAX_VARIANTS} variants per request ({n_variants} requested)")
+    if n_variants * n_hours > THERMAL_MAX_VARIANT_HOURS:
+        raise ValueError(f"variants x hours is limited to {THERMAL_MAX_VARIANT_HOURS} "
+                         f"({n_variants} x {n_hours} requested); use fewer variants or a shorter window")
+    if grid:
+        keys = list(grid)
+        variants += [dict(THERMAL_DEFAULT_CONTROL, **dict(zip(keys, values))) for values in product(*(grid[k] for k in keys))]
+    if not variants:
+        variants = [dict(THERMAL_DEFAULT_CONTROL)]
+    unknown = set().union(*variants) - set(THERMAL_DEFAULT_CONTROL)
+    if unknown:
+        raise ValueError(f"Unknown control(s): {', '.join(sorted(unknown))}")
+    controls = {key: np.array([float(v[key]) for v in variants]) for key in THERMAL_DEFAULT_CONTROL}
+    return variants, controls
+
+class RollingWindow:
+    """Fixed-size window of recent hourly values with O(1) push, lag, mean and std"""
+    def __init__(self, size):
+        self.size = size
+        self.values = deque(maxlen=size)
+        self.total = 0.0
+        self.total_sq = 0.0
+
+    def push(self, value):
+        value = float(value)
+        if len(self.values) == self.size:
+            oldest = self.values[0]
+            self.total -= oldest
+            self.total_sq -= oldest * oldest
+        self.values.append(value)
+        self.total += value
+        self.total_sq += value * value
+
+    def lag(self, k):
+        return self.values[-k]
+
+    def mean(self):
+        return self.total / len(self.values)
+
+    def std(self):
+        mean = self.mean()
+        return float(np.sqrt(max(self.total_sq / len(self.values) - mean * mean, 0.0)))
+
+    def copy(self):
+        clone = RollingWindow(self.size)
+        clone.values = deque(self.values, maxlen=self.size)
+        clone.total, clone.total_sq = self.total, self.total_sq
+        return clone
+
+class LoadHistory:
+    """Lag and rolling features of one end use, advanced one hour at a time"""
+    def __init__(self):
+        self.week = RollingWindow(168)
+        self.day = RollingWindow(24)
+
+    def push(self, value):
+        self.week.push(value)
+        self.day.push(value)
+
+    def is_ready(self):
+        return len(self.week.values) == self.week.size
+
+    def features(self):
+        return {
+            'Lag_1': self.week.lag(1),
+            'Lag_24': self.week.lag(24),
+            'Lag_168': self.week.lag(168),
+            'Roll_Mean_24': self.day.mean(),
+            'Roll_Std_24': self.day.std(),
+            'Roll_Mean_168': self.week.mean()
+        }
+
+    def copy(self):
+        clone = LoadHistory()
+        clone.week, clone.day = self.week.copy(), self.day.copy()
+        return clone
+
+def seed_load_histories(end_ts):
+    """Build the per-end-use history from the 168 hours ending at end_ts (bounded, not the full record)"""
+    window = df.loc[:end_ts, FORECAST_TARGETS].tail(168)
+    histories = {target: LoadHistory() for target in FORECAST_TARGETS}
+    for target in FORECAST_TARGETS:
+        for value in window[target].values:
+            histories[target].push(value)
+    return histories
+
+# Live state at the newest known hour; observe_hour() advances it as new readings arrive.
+# forecast_lock guards every read and write: the live worker advances it while requests copy it.
+forecast_state = {'timestamp': df.index[-1], 'histories': seed_load_histories(df.index[-1])}
+forecast_lock = threading.Lock()
+
+def observe_hour(ts, readings):
+    """Advance the live forecast state by one hour of actual end-use readings; hours not newer than the state are ignored"""
+    with forecast_lock:
+        if ts <= forecast_state['timestamp']:
+            return False
+        for target in FORECAST_TARGETS:
+            forecast_state['histories'][target].push(readings[target])
+        forecast_state['timestamp'] = ts
+        return True
+
+def reset_forecast_state(ts):
+    """Re-seed the live state from the record up to ts"""
+    histories = seed_load_histories(ts)
+    with forecast_lock:
+        forecast_state.update(timestamp=ts, histories=histories)
+
+def add_calendar_features(frame):
+    frame['Hour'] = frame.index.hour
+    frame['Day_of_Week'] = frame.index.dayofweek
+    frame['Is_Weekend'] = (frame['Day_of_Week'] >= 5).astype(int)
+    frame['Is_Daytime'] = ((frame['Hour'] >= 7) & (frame['Hour'] <= 18)).astype(int)
+    frame['Month'] = frame.index.month
+    frame['Season'] = ((frame.index.month % 12 + 3) // 3).astype(int)
+    return frame
+
+def future_exogenous(anchor_ts, horizon):
+    """Feature rows for the hours after anchor_ts; hours past the record reuse the same hour 52 weeks earlier"""
+    future_index = pd.date_range(anchor_ts + pd.Timedelta(hours=1), periods=horizon, freq='h')
+    future = df.reindex(future_index)
+    missing = future.isna().all(axis=1)
+    lookback = 1
+    while missing.any() and lookback <= 10:
+        fallback = df.reindex(future_index[missing] - pd.Timedelta(weeks=52 * lookback))
+        future.loc[missing, :] = fallback.values
+        missing = future.isna().all(axis=1)
+        lookback += 1
+    future = future.ffill().bfill()
+    return add_calendar_features(future)
+
+def forecast_load(anchor_ts, horizon):
+    """Recursive hourly forecast of every end use for the horizon after anchor_ts (None: the live state's hour)"""
+    if forecast_bundle is None:
+        raise ValueError("Forecasting unavailable: forecast models not found at " + FORECAST_PATH)
+    horizon = int(min(max(horizon, 1), MAX_FORECAST_HORIZON))
+
+    with forecast_lock:
+        if anchor_ts is None:
+            anchor_ts = forecast_state['timestamp']
+        live = anchor_ts == forecast_state['timestamp']
+        if live:
+            histories = {t: h.copy() for t, h in forecast_state['histories'].items()}
+    if not live:
+        histories = seed_load_histories(anchor_ts)
+    if not all(h.is_ready() for h in histories.values()):
+        raise ValueError("At least 168 hours of history are required before the forecast start")
+
+    future = future_exogenous(anchor_ts, horizon)
+    exogenous = future[forecast_bundle['exogenous_features']]
+    predictions = {target: np.zeros(horizon) for target in FORECAST_TARGETS}
+
+    for step in range(horizon):
+        row = exogenous.iloc[step].to_dict()
+        for target in FORECAST_TARGETS:
+            row_features = dict(row, **histories[target].features())
+            X = pd.DataFrame([row_features])[forecast_bundle['features']]
+            value = float(forecast_bundle['models'][target].predict(X)[0])
+            predictions[target][step] = value
+            histories[target].push(value)
+
+    for target in FORECAST_TARGETS:
+        future[target] = predictions[target]
+    future['Total_Energy_Wh'] = predict_meta(
+        predictions['Energy_HVAC_Wh'], predictions['Energy_Lighting_Wh'],
+        predictions['Energy_Plug_Wh'], predictions['Energy_Other_Wh'])
+    return future
+
+# Rollup cube: count / sum / sum of squares per hour x weekday x month x end use x source
+CUBE_END_USES = {
+    'hvac': ('Energy_HVAC_Wh', 'Pred_HVAC_Wh'),
+    'lighting': ('Energy_Lighting_Wh', 'Pred_Lighting_Wh'),
+    'plug': ('Energy_Plug_Wh', 'Pred_Plug_Wh'),
+    'other': ('Energy_Other_Wh', 'Energy_Other_Wh'),
+    'total': ('Total_Energy_Wh', 'Pred_Total_Wh')
+}
+CUBE_SOURCES = ['actual', 'predicted']
+CUBE_AXES = {'hour': 24, 'weekday': 7, 'month': 12}
+# Group keys derived from a cube axis: key -> (axis, label of each axis position)
+CUBE_DERIVED_KEYS = {
+    'season': ('month', np.array([(m % 12 + 3) // 3 for m in range(1, 13)])),
+    'weekend': ('weekday', np.array([0, 0, 0, 0, 0, 1, 1]))
+}
+
+def compute_dataset_predictions(frame, bundle=None):
+    """Full-chain predictions for every recorded hour, aligned to the frame's index"""
+    pred_hvac, pred_lighting, pred_plug, pred_total = predict_total(frame, bundle)
+    return pd.DataFrame({
+        'Pred_HVAC_Wh': pred_hvac,
+        'Pred_Lighting_Wh': pred_lighting,
+        'Pred_Plug_Wh': pred_plug,
+        'Pred_Total_Wh': pred_total
+    }, index=frame.index)
+
+class RollupCube:
+    """Pre-aggregated energy moments; roll-ups and slices cost O(cells) instead of a groupby over all rows"""
+    def __init__(self):
+        cells = (24, 7, 12)
+        self.count = np.zeros(cells)
+        self.sum = np.zeros(cells + (len(CUBE_END_USES), len(CUBE_SOURCES)))
+        self.sum_sq = np.zeros_like(self.sum)
+
+    def add(self, frame, predictions):
+        """Accumulate rows in place; only for a cube no reader can see yet (use extended() for the published one)"""
+        flat = (frame.index.hour.values * 7 + frame.index.dayofweek.values) * 12 + frame.index.month.values - 1
+        n_cells = self.count.size
+        self.count += np.bincount(flat, minlength=n_cells).reshape(self.count.shape)
+        for e, (actual_col, predicted_col) in enumerate(CUBE_END_USES.values()):
+            for s, values in enumerate([frame[actual_col].values, predictions.get(predicted_col, frame.get(predicted_col)).values]):
+                values = values.astype(float)
+                self.sum[..., e, s] += np.bincount(flat, weights=values, minlength=n_cells).reshape(self.count.shape)
+                self.sum_sq[..., e, s] += np.bincount(flat, weights=values * values, minlength=n_cells).reshape(self.count.shape)
+
+    def extended(self, frame, predictions):
+        """A new cube with the rows added; the published cube is never modified, so a query reads
+        count, sum and sum_sq from one consistent state while the live worker swaps in the next"""
+        cube = copy.copy(self)
+        cube.count, cube.sum, cube.sum_sq = self.count.copy(), self.sum.copy(), self.sum_sq.copy()
+        cube.add(frame, predictions)
+        return cube
+
+    def query(self, group_by=(), filters=None, end_uses=None, sources=None):
+        """Aggregate over every axis not in group_by after slicing with filters ({key: [values]})"""
+        filters = filters or {}
+        end_uses = end_uses or list(CUBE_END_USES)
+        sources = sources or CUBE_SOURCES
+        end_use_idx = [list(CUBE_END_USES).index(e) for e in end_uses]
+        source_idx = [CUBE_SOURCES.index(src) for src in sources]
+
+        grouping = {}
+        for key in group_by:
+            axis = CUBE_DERIVED_KEYS[key][0] if key in CUBE_DERIVED_KEYS else key
+            if axis not in CUBE_AXES:
+                raise ValueError(f"Unknown group key '{key}'")
+            if axis in grouping:
+                raise ValueError(f"'{key}' and '{grouping[axis]}' both group the {axis} axis")
+            grouping[axis] = key
+
+        # One matrix per axis maps (filtered) axis positions onto output groups
+        matrices, labels = [], []
+        for axis, size in CUBE_AXES.items():
+            positions = np.arange(size)
+            axis_values = positions + 1 if axis == 'month' else positions
+            keep = np.ones(size, dtype=bool)
+            for key, allowed in filters.items():
+                if key == axis:
+                    keep &= np.isin(axis_values, allowed)
+                elif key in CUBE_DERIVED_KEYS and CUBE_DERIVED_KEYS[key][0] == axis:
+                    keep &= np.isin(CUBE_DERIVED_KEYS[key][1], allowed)
+            key = grouping.get(axis)
+            if key is None:
+                group_of = np.zeros(size, dtype=int)
+                group_labels = [None]
+            else:
+                label_values = CUBE_DERIVED_KEYS[key][1] if key in CUBE_DERIVED_KEYS else axis_values
+                group_labels, group_of = np.unique(label_values, return_inverse=True)
+            matrix = np.zeros((size, len(group_labels)))
+            matrix[positions[keep], group_of[keep]] = 1.0
+            matrices.append(matrix)
+            labels.append((key, group_labels))
+
+        count = np.einsum('hwm,hi,wj,mk->ijk', self.count, *matrices)
+        sums = np.einsum('hwmes,hi,wj,mk->ijkes', self.sum[..., end_use_idx, :][..., source_idx], *matrices)
+        sums_sq = np.einsum('hwmes,hi,wj,mk->ijkes', self.sum_sq[..., end_use_idx, :][..., source_idx], *matrices)
+
+        rows = []
+        for index in np.ndindex(count.shape):
+            n = count[index]
+            if n == 0:
+                continue
+            group = {key: int(group_labels[i]) for (key, group_labels), i in zip(labels, index) if key is not None}
+            for e, end_use in enumerate(end_uses):
+                for s, source in enumerate(sources):
+                    mean = sums[index + (e, s)] / n
+                    var = max(sums_sq[index + (e, s)] / n - mean * mean, 0.0)
+                    rows.append(dict(group, end_use=end_use, source=source, count=int(n),
+                                     sum=float(sums[index + (e, s)]), mean=float(mean), std=float(np.sqrt(var))))
+        return rows
+
+dataset_predictions = compute_dataset_predictions(df)
+
+def rebuild_rollup_cube():
+    """Recompute the cube; call whenever the dataset or the model predictions change"""
+    global rollup_cube
+    rollup_cube = build_rollup_cube(dataset_predictions)
+
+def build_rollup_cube(predictions):
+    cube = RollupCube()
+    cube.add(df, predictions)
+    return cube
+
+rebuild_rollup_cube()
+
+class WindowStats:
+    """Prefix sums and sparse argmax tables over the hourly record: energy, cost, mean and peak of any
+    [start, end] window in O(1) (two binary searches for the positions, then constant work per series).
+
+    Buffers grow by doubling and rows are only ever written past the current length, so extended()
+    costs O(new rows) amortized and earlier instances keep reading their own prefix unchanged.
+    Extend from one thread at a time.
+    """
+    def __init__(self, frame, predictions):
+        self.n = self.capacity = 0
+        self.times = np.empty(0, dtype='datetime64[ns]')
+        self.price = np.empty(0)
+        keys = [(end_use, source) for end_use in CUBE_END_USES for source in CUBE_SOURCES]
+        self.values = {key: np.empty(0) for key in keys}
+        self.ranked = {key: np.empty(0) for key in keys}  # values with missing hours as -inf, for the peak tables
+        self.energy = {key: np.zeros(1) for key in keys}
+        self.cost = {key: np.zeros(1) for key in keys}
+        self.count = {key: np.zeros(1, dtype=np.int64) for key in keys}
+        self.peaks = {key: [np.empty(0, dtype=np.int64)] for key in keys}
+        self._append(frame, predictions)
+
+    @staticmethod
+    def _series(frame, predictions):
+        for end_use, (actual_col, predicted_col) in CUBE_END_USES.items():
+            for source, column in zip(CUBE_SOURCES, [frame[actual_col], predictions.get(predicted_col, frame.get(predicted_col))]):
+                yield (end_use, source), np.asarray(column, dtype=float)
+
+    def _grow(self, needed):
+        """Reallocate every buffer to at least `needed` rows (doubling), copying the filled part"""
+        capacity = max(needed, 2 * self.capacity, 1024)
+        def grown(buffer, length, size):
+            out = np.empty(size, dtype=buffer.dtype)
+            out[:length] = buffer[:length]
+            return out
+        self.times = grown(self.times, self.n, capacity)
+        self.price = grown(self.price, self.n, capacity)
+        for key in self.values:
+            self.values[key] = grown(self.values[key], self.n, capacity)
+            self.ranked[key] = grown(self.ranked[key], self.n, capacity)
+            self.energy[key] = grown(self.energy[key], self.n + 1, capacity + 1)
+            self.cost[key] = grown(self.cost[key], self.n + 1, capacity + 1)
+            self.count[key] = grown(self.count[key], self.n + 1, capacity + 1)
+            self.peaks[key] = [grown(level, self.n, capacity) for level in self.peaks[key]]
+        self.capacity = capacity
+
+    def _append(self, frame, predictions):
+        n, total = self.n, self.n + len(frame)
+        if total > self.capacity:
+            self._grow(total)
+        self.times[n:total] = frame.index.values
+        price = frame['Energy_Price_USD_kWh'].values.astype(float)
+        self.price[n:total] = price
+        for key, values in self._series(frame, predictions):
+            valid = np.isfinite(values)
+            filled = np.where(valid, values, 0.0)
+            self.values[key][n:total] = values
+            self.ranked[key][n:total] = np.where(valid, values, -np.inf)
+            self.energy[key][n + 1:total + 1] = self.energy[key][n] + np.cumsum(filled)
+            self.cost[key][n + 1:total + 1] = self.cost[key][n] + np.cumsum(filled * np.nan_to_num(price) / 1000)
+            self.count[key][n + 1:total + 1] = self.count[key][n] + np.cumsum(valid)
+            self._extend_peaks(key, n, total)
+        self.n = total
+
+    def _extend_peaks(self, key, n, total):
+        """Level k holds the argmax of values[i:i + 2**k]; only the entries that become valid are computed"""
+        levels, ranked = self.peaks[key], self.ranked[key]
+        levels[0][n:total] = np.arange(n, total)
+        k, span = 1, 1
+        while 2 * span <= total:
+            if k == len(levels):
+                levels.append(np.empty(self.capacity, dtype=np.int64))
+            lo, hi = max(0, n - 2 * span + 1), total - 2 * span + 1
+            left, right = levels[k - 1][lo:hi], levels[k - 1][lo + span:hi + span]
+            levels[k][lo:hi] = np.where(ranked[left] >= ranked[right], left, right)
+            k, span = k + 1, span * 2
+
+    def extended(self, frame, predictions):
+        """Instance with the rows after the last indexed hour appended (earlier hours are ignored)"""
+        if self.n:
+            newer = frame.index > self.timestamp(self.n - 1)
+            frame, predictions = frame[newer], predictions[newer]
+        if not len(frame):
+            return self
+        clone = copy.copy(self)
+        for name in ('values', 'ranked', 'energy', 'cost', 'count'):
+            setattr(clone, name, dict(getattr(self, name)))
+        clone.peaks = {key: list(levels) for key, levels in self.peaks.items()}
+        clone._append(frame, predictions)
+        return clone
+
+    def timestamp(self, position):
+        return pd.Timestamp(self.times[position])
+
+    def positions(self, start=None, end=None):
+        """Half-open [lo, hi) row range of the hours with start <= timestamp <= end"""
+        times = self.times[:self.n]
+        lo = 0 if start is None else int(times.searchsorted(pd.Timestamp(start).to_datetime64(), side='left'))
+        hi = self.n if end is None else int(times.searchsorted(pd.Timestamp(end).to_datetime64(), side='right'))
+        return lo, max(lo, hi)
+
+    def peak(self, key, lo, hi):
+        """Position of the largest value in [lo, hi): the larger of two overlapping power-of-two blocks"""
+        k = (hi - lo).bit_length() - 1
+        table = self.peaks[key][k]
+        left, right = table[lo], table[hi - (1 << k)]
+        ranked = self.ranked[key]
+        return right if ranked[right] > ranked[left] else left
+
+    def query(self, start=None, end=None, end_uses=None, sources=None):
+        end_uses = end_uses or list(CUBE_END_USES)
+        sources = sources or CUBE_SOURCES
+        lo, hi = self.positions(start, end)
+        rows = []
+        for end_use in end_uses:
+            for source in sources:
+                key = (end_use, source)
+                if key not in self.values:
+                    raise ValueError(f"Unknown end use or source '{end_use}/{source}'")
+                n = int(self.count[key][hi] - self.count[key][lo])
+                energy = float(self.energy[key][hi] - self.energy[key][lo])
+                row = {'end_use': end_use, 'source': source, 'hours': n,
+                       'energy_kwh': energy / 1000,
+                       'cost_usd': float(self.cost[key][hi] - self.cost[key][lo]),
+                       'mean_wh': energy / n if n else None,
+                       'peak_wh': None, 'peak_time': None}
+                if n:
+                    p = self.peak(key, lo, hi)
+                    row.update(peak_wh=float(self.values[key][p]), peak_time=self.timestamp(p).strftime(TIMESTAMP_FORMAT))
+                rows.append(row)
+        return lo, hi, rows
+
+window_stats = WindowStats(df, dataset_predictions)
+
+# Rows already applied to the rollup cube and window statistics, so a model swap can rebuild both from
+# exactly what the worker has processed (newest LIVE_MEMORY_ROWS rows); guarded by live_apply_lock,
+# which also serializes every update of rollup_cube, window_stats and the production model set
+live_apply_lock = threading.Lock()
+live_processed = deque()
+live_processed_state = {'rows': 0, 'batches': 0}
+
+# Per-feature attributions: XGBoost TreeSHAP (pred_contribs) per sub-model, mapped through the meta model's local gradient
+EXPLAIN_BATCH_ROWS = 4096
+EXPLAIN_MAX_HOURLY = 168
+explain_cache = {'ready': False, 'contribs': {}, 'meta_gradient': None, 'error': None}
+
+def sub_models(bundle=None):
+    bundle = bundle or active_bundle()
+    return {
+        'hvac': (bundle['model_hvac'], bundle['scaler_hvac'], hvac_features),
+        'lighting': (bundle['model_lighting'], bundle['scaler_lighting'], lighting_features),
+        'plug': (bundle['model_plug'], bundle['scaler_plug'], plug_features)
+    }
+
+def tree_contributions(model, X_scaled):
+    """TreeSHAP contributions in batches; the last column is the bias term"""
+    booster = model.get_booster()
+    parts = [booster.predict(xgb.DMatrix(X_scaled[i:i + EXPLAIN_BATCH_ROWS]), pred_contribs=True)
+             for i in range(0, len(X_scaled), EXPLAIN_BATCH_ROWS)]
+    return np.vstack(parts)
+
+def meta_gradients(pred_hvac, pred_lighting, pred_plug, energy_other, step=100.0, bundle=None):
+    """d Total / d (HVAC, Lighting, Plug) by central differences, all perturbations in one meta-model call"""
+    base = np.column_stack([pred_hvac, pred_lighting, pred_plug, energy_other])
+    n = len(base)
+    stacked = np.tile(base, (6, 1))
+    for k in range(3):
+        stacked[2 * k * n:(2 * k + 1) * n, k] += step
+        stacked[(2 * k + 1) * n:(2 * k + 2) * n, k] -= step
+    out = predict_meta(stacked[:, 0], stacked[:, 1], stacked[:, 2], stacked[:, 3], bundle).reshape(6, n)
+    return np.column_stack([(out[2 * k] - out[2 * k + 1]) / (2 * step) for k in range(3)])
+
+def load_explain_cache(cache_path, names):
+    """(contribs, meta_gradient) from a cache file, or None if it is missing or unreadable (then recomputed and replaced)"""
+    if not os.path.exists(cache_path):
+        return None
+    try:
+        with np.load(cache_path) as stored:
+            return {name: stored[name] for name in names}, stored['meta_gradient']
+    except Exception:
+        app.logger.exception("Ignoring unreadable explanation cache %s", cache_path)
+        return None
+
+def precompute_explanations():
+    """Contributions for every recorded hour, cached on disk per dataset/model version"""
+    # Pinned together (swaps publish under live_apply_lock), so a swap mid-computation cannot mix model versions
+    with live_apply_lock:
+        version, bundle, predictions = MODEL_VERSION, model_registry['production'], dataset_predictions
+    try:
+        cache_path = os.path.join(BASE_PATH, f"explain_cache_{DATASET_DIGEST}-{version}.npz")
+        stored = load_explain_cache(cache_path, sub_models(bundle))
+        if stored is not None:
+            contribs, gradient = stored
+        else:
+            contribs = {name: tree_contributions(model, scaler.transform(df[features]))
+                        for name, (model, scaler, features) in sub_models(bundle).items()}
+            gradient = meta_gradients(predictions['Pred_HVAC_Wh'].values, predictions['Pred_Lighting_Wh'].values,
+                                      predictions['Pred_Plug_Wh'].values, df['Energy_Other_Wh'].values, bundle=bundle)
+            # Written to a per-process temp file and renamed into place (as LiveStore does), so an
+            # interrupted or concurrent write never leaves a truncated cache behind
+            tmp = f"{cache_path}.{os.getpid()}.tmp"
+            with open(tmp, 'wb') as f:
+                np.savez_compressed(f, meta_gradient=gradient, **contribs)
+            os.replace(tmp, cache_path)
+        # A swap during the computation makes these stale; the swap has started a newer computation
+        if version == MODEL_VERSION:
+            explain_cache.update(contribs=contribs, meta_gradient=gradient, ready=True, error=None)
+    except Exception as e:
+        if version == MODEL_VERSION:
+            explain_cache['error'] = str(e)
+
+def explain_range(start_pos, end_pos, top):
+    """Mean contributions over rows [start_pos, end_pos) per sub-model and, via the meta gradient, for the total"""
+    gradient = explain_cache['meta_gradient'][start_pos:end_pos]
+    result, total = {}, {}
+    for m, (name, (_, _, features)) in enumerate(sub_models().items()):
+        contribs = explain_cache['contribs'][name][start_pos:end_pos]
+        mean = contribs[:, :-1].mean(axis=0)
+        order = np.argsort(-np.abs(mean))[:top]
+        result[name] = {
+            'bias': float(contribs[:, -1].mean()),
+            'prediction': float(contribs.sum(axis=1).mean()),
+            'contributions': [{'feature': features[i], 'value': float(mean[i])} for i in order]
+        }
+        mapped = (contribs[:, :-1] * gradient[:, [m]]).mean(axis=0)
+        for feature, value in zip(features, mapped):
+            total[feature] = total.get(feature, 0.0) + float(value)
+        if end_pos - start_pos <= EXPLAIN_MAX_HOURLY:
+            result[name]['hourly'] = {features[i]: contribs[:, i] for i in order}
+    ranked = sorted(total.items(), key=lambda kv: -abs(kv[1]))[:top]
+    result['total'] = {
+        'method': 'sub-model TreeSHAP x local meta-model gradient',
+        'contributions': [{'feature': f, 'value': v} for f, v in ranked]
+    }
+    return result
+
+# Streaming anomaly detection on (actual, predicted) residuals; O(1) memory per series
+ANOMALY_SERIES = {
+    'hvac': ('Energy_HVAC_Wh', 'Pred_HVAC_Wh'),
+    'lighting': ('Energy_Lighting_Wh', 'Pred_Lighting_Wh'),
+    'plug': ('Energy_Plug_Wh', 'Pred_Plug_Wh'),
+    'total': ('Total_Energy_Wh', 'Pred_Total_Wh')
+}
+ANOMALY_EVENT_LIMIT = 1000
+
+class OnlineStats:
+    """Welford running mean / variance"""
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def update(self, x):
+        self.n += 1
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (x - self.mean)
+
+    def update_batch(self, values):
+        """Merge a whole array at once (Chan et al. parallel update)"""
+        values = np.asarray(values, dtype=float)
+        if len(values) == 0:
+            return
+        n, mean = len(values), float(values.mean())
+        m2 = float(((values - mean) ** 2).sum())
+        total = self.n + n
+        delta = mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += m2 + delta * delta * self.n * n / total
+        self.n = total
+
+    def std(self):
+        return float(np.sqrt(self.m2 / (self.n - 1))) if self.n > 1 else 0.0
+
+class ResidualDetector:
+    """Hour-of-week residual baselines with spike (z-score), EWMA drift and two-sided CUSUM checks"""
+    def __init__(self, alpha=0.1, z_limit=4.0, ewma_limit=3.0, cusum_k=0.5, cusum_h=8.0, min_slot_samples=8):
+        self.alpha, self.z_limit, self.ewma_limit = alpha, z_limit, ewma_limit
+        self.cusum_k, self.cusum_h, self.min_slot_samples = cusum_k, cusum_h, min_slot_samples
+        self.overall = OnlineStats()
+        self.slots = [OnlineStats() for _ in range(168)]
+        self.ewma = 0.0
+        self.cusum_pos = 0.0
+        self.cusum_neg = 0.0
+        self.ewma_sigma = np.sqrt(alpha / (2 - alpha))
+
+    def update(self, ts, actual, predicted):
+        """Score one hour, then fold it into the baselines; returns the list of triggered checks"""
+        residual = float(actual) - float(predicted)
+        slot = self.slots[ts.dayofweek * 24 + ts.hour]
+        baseline = slot if slot.n >= self.min_slot_samples else self.overall
+        triggered, z = [], 0.0
+        if baseline.n > 1 and baseline.std() > 0:
+            z = (residual - baseline.mean) / baseline.std()
+            self.ewma = self.alpha * z + (1 - self.alpha) * self.ewma
+            self.cusum_pos = max(0.0, self.cusum_pos + z - self.cusum_k)
+            self.cusum_neg = max(0.0, self.cusum_neg - z - self.cusum_k)
+            if abs(z) > self.z_limit:
+                triggered.append('spike')
+            if abs(self.ewma) > self.ewma_limit * self.ewma_sigma:
+                triggered.append('drift')
+            if self.cusum_pos > self.cusum_h or self.cusum_neg > self.cusum_h:
+                triggered.append('cusum')
+                self.cusum_pos = self.cusum_neg = 0.0
+        slot.update(residual)
+        self.overall.update(residual)
+        return triggered, residual, z
+
+class AnomalyMonitor:
+    def __init__(self):
+        self.detectors = {name: ResidualDetector() for name in ANOMALY_SERIES}
+        self.events = deque(maxlen=ANOMALY_EVENT_LIMIT)
+        self.observed = 0
+        self.lock = threading.Lock()
+
+    def observe(self, ts, actual, predicted, publish=True):
+        """actual / predicted: {series name: Wh}; returns the events raised for this hour"""
+        raised = []
+        with self.lock:
+            self.observed += 1
+            for name, detector in self.detectors.items():
+                if name not in actual or name not in predicted:
+                    continue
+                triggered, residual, z = detector.update(ts, actual[name], predicted[name])
+                if triggered:
+                    event = {
+                        'timestamp': ts.strftime(TIMESTAMP_FORMAT),
+                        'series': name,
+                        'checks': triggered,
+                        'actual_wh': float(actual[name]),
+                        'predicted_wh': float(predicted[name]),
+                        'residual_wh': residual,
+                        'z_score': round(z, 3)
+                    }
+                    self.events.append(event)
+                    raised.append(event)
+        if publish:
+            for event in raised:
+                publish_event('anomaly', event)
+        return raised
+
+# Server-sent events: every subscriber gets its own bounded queue
+stream_subscribers = []
+stream_lock = threading.Lock()
+
+def publish_event(kind, data):
+    with stream_lock:
+        subscribers = list(stream_subscribers)
+    for q in subscribers:
+        try:
+            q.put_nowait((kind, data))
+        except queue.Full:
+            pass
+
+anomaly_monitor = AnomalyMonitor()
+
+def warm_up_anomaly_monitor():
+    """Stream the recorded hours through the detectors so baselines exist before live data arrives"""
+    for ts, actual_row, predicted_row in zip(df.index, df[[a for a, _ in ANOMALY_SERIES.values()]].values,
+                                             dataset_predictions[[p for _, p in ANOMALY_SERIES.values()]].values):
+        anomaly_monitor.observe(ts, dict(zip(ANOMALY_SERIES, actual_row)), dict(zip(ANOMALY_SERIES, predicted_row)), publish=False)
+
+# Shadow evaluation: mirror a sample of production predict_total calls to a candidate bundle off the request path
+SHADOW_SAMPLE_RATE = 0.1
+SHADOW_MAX_PENDING = 32
+SHADOW_MAX_ROWS = 10000
+SHADOW_OUTPUTS = ['hvac', 'lighting', 'plug', 'total']
+
+class ShadowEvaluator:
+    def __init__(self, candidate, sample_rate=SHADOW_SAMPLE_RATE, workers=2):
+        self.candidate = candidate
+        self.sample_rate = sample_rate
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='shadow')
+        self.lock = threading.Lock()
+        self.pending = 0
+        self.submitted = self.completed = self.dropped = self.errors = 0
+        self.last_error = None
+        self.rows = 0
+        self.diff = {name: OnlineStats() for name in SHADOW_OUTPUTS}
+        self.abs_diff = {name: OnlineStats() for name in SHADOW_OUTPUTS}
+        self.latency_production = OnlineStats()
+        self.latency_candidate = OnlineStats()
+        self.started = datetime.now()
+
+    def maybe_submit(self, df_input, production_outputs, production_latency):
+        """Never blocks: unsampled calls return at once and a full queue drops the sample"""
+        if random.random() >= self.sample_rate:
+            return
+        with self.lock:
+            if self.pending >= SHADOW_MAX_PENDING:
+                self.dropped += 1
+                return
+            self.pending += 1
+            self.submitted += 1
+        try:
+            rows = slice(0, SHADOW_MAX_ROWS)
+            frame = df_input.iloc[rows].copy()
+            outputs = [np.asarray(o)[rows] for o in production_outputs]
+            self.executor.submit(self._evaluate, frame, outputs, production_latency * len(frame) / len(df_input))
+        except RuntimeError:
+            # Closed by a concurrent DELETE or replacement between the caller's read and this submit
+            with self.lock:
+                self.pending -= 1
+                self.submitted -= 1
+                self.dropped += 1
+        except Exception:
+            with self.lock:
+                self.pending -= 1
+            raise
+
+    def _evaluate(self, frame, production_outputs, production_latency):
+        try:
+            start = time.perf_counter()
+            candidate_outputs = predict_total(frame, bundle=self.candidate)
+            latency = time.perf_counter() - start
+            with self.lock:
+                for name, prod, cand in zip(SHADOW_OUTPUTS, production_outputs, candidate_outputs):
+                    delta = np.asarray(cand, dtype=float) - np.asarray(prod, dtype=float)
+                    self.diff[name].update_batch(delta)
+                    self.abs_diff[name].update_batch(np.abs(delta))
+                self.latency_production.update(production_latency)
+                self.latency_candidate.update(latency)
+                self.rows += len(frame)
+                self.completed += 1
+        except Exception as e:
+            app.logger.warning("Shadow scoring of %s failed: %s", self.candidate['path'], e)
+            with self.lock:
+                self.errors += 1
+                self.last_error = str(e)
+        finally:
+            with self.lock:
+                self.pending -= 1
+
+    def report(self):
+        with self.lock:
+            return {
+                'candidate_path': self.candidate['path'],
+                'candidate_version': self.candidate['version'],
+                'sample_rate': self.sample_rate,
+                'since': self.started.strftime(TIMESTAMP_FORMAT),
+                'submitted': self.submitted,
+                'completed': self.completed,
+                'dropped': self.dropped,
+                'errors': self.errors,
+                'last_error': self.last_error,
+                'rows_compared': self.rows,
+                'deltas_wh': {
+                    name: {'mean': self.diff[name].mean, 'std': self.diff[name].std(), 'mae': self.abs_diff[name].mean}
+                    for name in SHADOW_OUTPUTS
+                },
+                'latency_ms': {
+                    'production_mean': self.latency_production.mean * 1000,
+                    'candidate_mean': self.latency_candidate.mean * 1000,
+                    'delta_mean': (self.latency_candidate.mean - self.latency_production.mean) * 1000
+                }
+            }
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+# Live ingestion: validated hourly sensor readings appended to day-partitioned columnar segments.
+# Segments are written once and never rewritten; recent rows also stay in memory for queries.
+LIVE_STORE_PATH = os.environ.get('TWIN_LIVE_STORE', os.path.join(BASE_PATH, "live_store"))
+INGEST_FLUSH_ROWS = 10000
+INGEST_FLUSH_S = 2.0
+LIVE_MEMORY_ROWS = 200000
+LIVE_CHUNK_ROWS = 10000  # in-order batches are merged into the newest in-memory chunk up to this size
+INGEST_LINE_BATCH = 5000
+INGEST_TAIL_PATH = os.environ.get('TWIN_INGEST_TAIL')  # JSON-lines file to follow
+INGEST_SOCKET = os.environ.get('TWIN_INGEST_SOCKET')  # host:port accepting newline-delimited JSON
+BUILDING_AREA_M2 = 8000
+MAX_OCCUPANCY = 400
+
+# Raw readings a sensor batch must carry, with the accepted range of each
+SENSOR_RANGES = {
+    'OutsideWeather_Temp_C': (-40.0, 60.0),
+    'OutsideWeather_Humidity_Pct': (0.0, 100.0),
+    'Pressure_mmHg': (600.0, 850.0),
+    'Total_Occupancy_Count': (0.0, 10 * MAX_OCCUPANCY),
+    'Indoor_Temp_C': (0.0, 50.0),
+    'Indoor_Humidity_Pct': (0.0, 100.0),
+    'Energy_Price_USD_kWh': (0.0, 10.0),
+    'Energy_HVAC_Wh': (0.0, 1e8),
+    'Energy_Lighting_Wh': (0.0, 1e8),
+    'Energy_Plug_Wh': (0.0, 1e8),
+    'Energy_Other_Wh': (0.0, 1e8)
+}
+# Optional readings: validated when present, otherwise filled (NaN = not measured)
+OPTIONAL_SENSOR_RANGES = {
+    'Wind_Speed_m_s': ((0.0, 100.0), np.nan),
+    'Building_Area_m2': ((1.0, 1e7), BUILDING_AREA_M2),
+    'Total_Energy_Wh': ((0.0, 4e8), None)
+}
+
+def parse_timestamps(values):
+    ts = pd.to_datetime(values, format=TIMESTAMP_FORMAT, errors='coerce')
+    retry = ts.isna() & pd.notna(values)
+    if retry.any():
+        ts[retry] = pd.to_datetime(values[retry], errors='coerce')
+    return ts
+
+def validate_readings(frame):
+    """Vectorized checks over a batch; returns (valid rows indexed by timestamp, rejected count, reasons)"""
+    missing = [c for c in SENSOR_RANGES if c not in frame.columns]
+    time_col = 'timestamp' if 'timestamp' in frame.columns else 'Timestamp'
+    if time_col not in frame.columns:
+        missing.insert(0, 'timestamp')
+    if missing:
+        raise ValueError(f"Missing sensor fields: {', '.join(missing)}")
+
+    ts = parse_timestamps(pd.Series(frame[time_col].values))
+    checks = {'timestamp': ts.notna().values}
+    values = {}
+    for column, (low, high) in SENSOR_RANGES.items():
+        values[column] = pd.to_numeric(frame[column], errors='coerce').values.astype(float)
+        checks[column] = (values[column] >= low) & (values[column] <= high)
+    for column, ((low, high), default) in OPTIONAL_SENSOR_RANGES.items():
+        if column in frame.columns:
+            values[column] = pd.to_numeric(frame[column], errors='coerce').values.astype(float)
+            checks[column] = np.isnan(values[column]) | ((values[column] >= low) & (values[column] <= high))
+
+    ok = np.logical_and.reduce(list(checks.values()))
+    reasons = {column: int((~passed).sum()) for column, passed in checks.items() if not passed.all()}
+    valid = pd.DataFrame({column: v[ok] for column, v in values.items()}, index=pd.DatetimeIndex(ts[ok], name='Timestamp'))
+    return valid, int((~ok).sum()), reasons
+
+def derive_sensor_features(frame):
+    """Calendar and derived columns with the dataset generator's definitions, in the historical column order"""
+    for column, (_, default) in OPTIONAL_SENSOR_RANGES.items():
+        if default is not None:
+            frame[column] = frame[column].fillna(default) if column in frame.columns else default
+    total = frame[['Energy_HVAC_Wh', 'Energy_Lighting_Wh', 'Energy_Plug_Wh', 'Energy_Other_Wh']].sum(axis=1)
+    frame['Total_Energy_Wh'] = frame['Total_Energy_Wh'].fillna(total) if 'Total_Energy_Wh' in frame.columns else total
+    frame['Total_Occupancy_Count'] = np.round(frame['Total_Occupancy_Count']).astype(int)
+
+    add_calendar_features(frame)
+    frame['Temp_Deviation'] = np.abs(frame['OutsideWeather_Temp_C'] - 22)
+    frame['HVAC_Load_Estimate'] = frame['Building_Area_m2'] * frame['Temp_Deviation'] * 0.01 + frame['Total_Occupancy_Count'] * 30
+    frame['Temp_Occupancy_Interaction'] = frame['Temp_Deviation'] * frame['Total_Occupancy_Count']
+    frame['Indoor_Temp_Deviation'] = np.abs(frame['Indoor_Temp_C'] - 22)
+    frame['Indoor_Humidity_Deviation'] = np.abs(frame['Indoor_Humidity_Pct'] - 50)
+    frame['Humidity_Deviation'] = np.abs(frame['OutsideWeather_Humidity_Pct'] - 50)
+    frame['Daylight_Hours_Factor'] = frame['Is_Daytime'] * (0.4 - frame['OutsideWeather_Temp_C'].clip(10, 30) / 100)
+    frame['Lighting_Occupancy_Ratio'] = frame['Total_Occupancy_Count'] / (MAX_OCCUPANCY + 1)
+    frame['Solar_Irradiance_Estimate'] = np.maximum(0, np.sin(np.pi * (frame['Hour'] - 6) / 12)) * (1 - frame['Is_Weekend']) * 800
+    frame['Plug_Peak_Hour'] = ((frame['Hour'] >= 9) & (frame['Hour'] <= 17)).astype(int)
+    frame['Device_Usage_Factor'] = frame['Total_Occupancy_Count'] / MAX_OCCUPANCY * (1 + 0.2 * (frame['Season'] == 3))
+    frame['Remote_Work_Factor'] = np.where(frame['Is_Weekend'] == 1, 0.3, 1.0)
+    frame['Price_Sensitivity'] = np.where(frame['Energy_Price_USD_kWh'] > 0.15, 0.9, 1.0)
+    return frame.reindex(columns=df.columns)
+
+class LiveStore:
+    """Append-only store: <path>/<YYYY-MM-DD>/<first>_<last>_<seq>.parquet, one new segment per day per flush"""
+    SEGMENT_TIME_FORMAT = '%Y%m%dT%H%M%S'
+
+    def __init__(self, path):
+        self.path = path
+        self.extension = '.parquet' if pq is not None else '.pkl'
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.pending, self.pending_rows = [], 0
+        self.memory, self.memory_rows = deque(), 0
+        self._tail = None
+        self.segments = []
+        self.sequence = 0
+        self.rows_ingested = self.rows_rejected = 0
+        self.wake = threading.Event()
+        os.makedirs(path, exist_ok=True)
+        self._open_existing()
+
+    def start(self):
+        """Start the background flush thread (only in the serving process, see start_services)"""
+        threading.Thread(target=self._flush_loop, daemon=True).start()
+
+    def _open_existing(self):
+        for day in sorted(os.listdir(self.path)):
+            day_dir = os.path.join(self.path, day)
+            if not os.path.isdir(day_dir):
+                continue
+            for name in sorted(os.listdir(day_dir)):
+                stem, ext = os.path.splitext(name)
+                if ext != self.extension:
+                    continue
+                first, last, seq = stem.split('_')
+                self.segments.append({'path': os.path.join(day_dir, name), 'seq': int(seq),
+                                      'start': pd.Timestamp(datetime.strptime(first, self.SEGMENT_TIME_FORMAT)),
+                                      'end': pd.Timestamp(datetime.strptime(last, self.SEGMENT_TIME_FORMAT))})
+        self.segments.sort(key=lambda seg: seg['seq'])
+        self.sequence = max([seg['seq'] for seg in self.segments], default=-1) + 1
+        # Reload the newest segments into memory so restarts serve recent data without disk reads
+        frames = []
+        for seg in reversed(self.segments):
+            if sum(len(f) for f in frames) >= LIVE_MEMORY_ROWS:
+                break
+            frames.insert(0, self._read(seg['path']))
+        if frames:
+            self.memory.append(self.time_ordered(pd.concat(frames)))
+            self.memory_rows = len(self.memory[0])
+
+    @staticmethod
+    def time_ordered(frame):
+        """Sorted by time; a later reading for the same hour replaces the earlier one"""
+        frame = frame.sort_index(kind='stable')
+        return frame[~frame.index.duplicated(keep='last')]
+
+    def _read(self, path):
+        return pq.read_table(path).to_pandas() if self.extension == '.parquet' else pd.read_pickle(path)
+
+    def _write(self, frame, path):
+        tmp = path + '.tmp'
+        if self.extension == '.parquet':
+            pq.write_table(pa.Table.from_pandas(frame), tmp, compression='zstd')
+        else:
+            frame.to_pickle(tmp)
+        os.replace(tmp, path)
+
+    def append(self, frame):
+        """Memory holds time-ordered, non-overlapping chunks: an in-order batch costs O(batch + LIVE_CHUNK_ROWS);
+        only a batch reaching back before the newest in-memory hour triggers a full merge"""
+        batch = self.time_ordered(frame)
+        with self.lock:
+            self.pending.append(frame)
+            self.pending_rows += len(frame)
+            if not self.memory or batch.index[0] > self.memory[-1].index[-1]:
+                if self.memory and len(self.memory[-1]) + len(batch) <= LIVE_CHUNK_ROWS:
+                    self.memory[-1] = pd.concat([self.memory[-1], batch])
+                else:
+                    self.memory.append(batch)
+                self.memory_rows += len(batch)
+            else:
+                self.memory = deque([self.time_ordered(pd.concat(list(self.memory) + [batch])).iloc[-LIVE_MEMORY_ROWS:]])
+                self.memory_rows = len(self.memory[0])
+            while len(self.memory) > 1 and self.memory_rows - len(self.memory[0]) >= LIVE_MEMORY_ROWS:
+                self.memory_rows -= len(self.memory.popleft())
+            self._tail = None
+            self.rows_ingested += len(frame)
+            if self.pending_rows >= INGEST_FLUSH_ROWS:
+                self.wake.set()
+
+    def _flush_loop(self):
+        while True:
+            self.wake.wait(INGEST_FLUSH_S)
+            self.wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                app.logger.exception("Live store flush failed; pending rows are kept for the next flush")
+
+    def flush(self):
+        """Write pending rows as new segments; rows leave `pending` only once their segment is in place,
+        so a failed write is retried on the next flush instead of losing them"""
+        with self.flush_lock:
+            with self.lock:
+                pending = list(self.pending)
+            if not pending:
+                return
+            batch = pd.concat(pending).sort_index(kind='stable')
+            days = batch.index.normalize()
+            written = []
+            try:
+                for day, part in batch.groupby(days):
+                    day_dir = os.path.join(self.path, day.strftime('%Y-%m-%d'))
+                    os.makedirs(day_dir, exist_ok=True)
+                    first, last = part.index[0], part.index[-1]
+                    name = f"{first.strftime(self.SEGMENT_TIME_FORMAT)}_{last.strftime(self.SEGMENT_TIME_FORMAT)}_{self.sequence:08d}{self.extension}"
+                    path = os.path.join(day_dir, name)
+                    self._write(part, path)
+                    with self.lock:
+                        self.segments.append({'path': path, 'seq': self.sequence, 'start': first, 'end': last})
+                    self.sequence += 1
+                    written.append(day)
+            finally:
+                # Batches appended meanwhile stay queued behind whatever could not be written
+                unwritten = batch[~days.isin(written)]
+                with self.lock:
+                    del self.pending[:len(pending)]
+                    if len(unwritten):
+                        self.pending.insert(0, unwritten)
+                    self.pending_rows = sum(len(frame) for frame in self.pending)
+
+    def tail(self):
+        """All in-memory rows as one frame (chunks are already ordered, so this is a concat, cached until the next append)"""
+        with self.lock:
+            if self._tail is None:
+                self._tail = pd.concat(list(self.memory)) if self.memory else df.iloc[:0]
+            return self._tail
+
+    def latest(self):
+        """(timestamp, row) of the newest in-memory reading, or None"""
+        with self.lock:
+            if not self.memory:
+                return None
+            return self.memory[-1].index[-1], self.memory[-1].iloc[-1]
+
+    def nearest(self, target):
+        """(timestamp, row) of the in-memory reading closest to target, or None"""
+        with self.lock:
+            chunks = list(self.memory)
+        best = None
+        for chunk in chunks:
+            # Candidates are the rows on either side of target; chunks after the first one reaching target are further away
+            pos = int(chunk.index.searchsorted(target))
+            for i in (pos - 1, pos):
+                if 0 <= i < len(chunk) and (best is None or abs(chunk.index[i] - target) < abs(best[0] - target)):
+                    best = (chunk.index[i], chunk.iloc[i])
+            if chunk.index[-1] >= target:
+                break
+        return best
+
+    def last_timestamp(self):
+        with self.lock:
+            return self.memory[-1].index[-1] if self.memory else None
+
+    def memory_slice(self, start, end):
+        """In-memory rows with start <= timestamp <= end, touching only the overlapping chunks"""
+        with self.lock:
+            chunks = [c for c in self.memory if c.index[-1] >= start and c.index[0] <= end]
+        return pd.concat([c.loc[start:end] for c in chunks]) if chunks else df.iloc[:0]
+
+    def query(self, start, end):
+        """Rows with start <= timestamp <= end; falls back to segments for hours no longer held in memory"""
+        with self.lock:
+            memory_start = self.memory[0].index[0] if self.memory else None
+        parts = []
+        if memory_start is None or start < memory_start:
+            with self.lock:
+                segments = [seg for seg in self.segments if seg['end'] >= start and seg['start'] <= end]
+            for seg in segments:
+                frame = self._read(seg['path'])
+                parts.append(frame.loc[start:end] if memory_start is None else frame.loc[start:min(end, memory_start - pd.Timedelta(seconds=1))])
+        parts.append(self.memory_slice(start, end))
+        result = pd.concat(parts).sort_index(kind='stable')
+        return result[~result.index.duplicated(keep='last')]
+
+    def first_timestamp(self):
+        with self.lock:
+            starts = [seg['start'] for seg in self.segments]
+            if self.memory:
+                starts.append(self.memory[0].index[0])
+        return min(starts) if starts else None
+
+    def stats(self):
+        last = self.last_timestamp()
+        with self.lock:
+            return {
+                'format': self.extension.lstrip('.'),
+                'segments': len(self.segments),
+                'rows_ingested': self.rows_ingested,
+                'rows_rejected': self.rows_rejected,
+                'rows_in_memory': self.memory_rows,
+                'memory_chunks': len(self.memory),
+                'pending_rows': self.pending_rows,
+                'first': self.segments[0]['start'].strftime(TIMESTAMP_FORMAT) if self.segments else None,
+                'last': last.strftime(TIMESTAMP_FORMAT) if last is not None else None
+            }
+
+live_store = LiveStore(LIVE_STORE_PATH)
+live_queue = queue.Queue()
+
+def refresh_dataset_version():
+    global DATASET_VERSION
+    DATASET_VERSION = f"{DATASET_DIGEST}-{live_store.rows_ingested}" if live_store.rows_ingested else DATASET_DIGEST
+
+def ingest_frame(frame):
+    """Validate, derive and append one batch; model scoring and monitors run off the request path"""
+    valid, rejected, reasons = validate_readings(frame)
+    with live_store.lock:
+        live_store.rows_rejected += rejected
+    if len(valid):
+        rows = derive_sensor_features(valid)
+        live_store.append(rows)
+        refresh_dataset_version()
+        live_queue.put(rows)
+    return {'accepted': len(valid), 'rejected': rejected, 'reasons': reasons}
+
+def ingest_lines(lines):
+    records, malformed = [], 0
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            records.append(json.loads(line))
+        except ValueError:
+            malformed += 1
+    result = ingest_frame(pd.DataFrame.from_records(records)) if records else {'accepted': 0, 'rejected': 0, 'reasons': {}}
+    if malformed:
+        with live_store.lock:
+            live_store.rows_rejected += malformed
+        result['rejected'] += malformed
+        result['reasons']['malformed'] = malformed
+    return result
+
+def unrecorded(rows, predictions):
+    """Rows (and their predictions) for hours the historical record does not already hold; the cube counts those once at startup"""
+    fresh = ~rows.index.isin(df.index)
+    return rows[fresh], predictions[fresh]
+
+def process_live_rows():
+    """Score new rows once per drained batch, then update the rollup cube, window statistics, forecast state and anomaly detectors"""
+    global rollup_cube, window_stats
+    while True:
+        batch = [live_queue.get()]
+        while not live_queue.empty() and len(batch) < 1000:
+            batch.append(live_queue.get_nowait())
+        try:
+            rows = pd.concat(batch).sort_index(kind='stable')
+            # Scored and applied under the lock: a model swap never interleaves with a half-applied batch
+            with live_apply_lock:
+                predictions = compute_dataset_predictions(rows)
+                rollup_cube = rollup_cube.extended(*unrecorded(rows, predictions))
+                window_stats = window_stats.extended(rows, predictions)
+                live_processed.append(rows)
+                live_processed_state['rows'] += len(rows)
+                live_processed_state['batches'] += 1
+                while len(live_processed) > 1 and live_processed_state['rows'] - len(live_processed[0]) >= LIVE_MEMORY_ROWS:
+                    live_processed_state['rows'] -= len(live_processed.popleft())
+            actual = rows[[a for a, _ in ANOMALY_SERIES.values()]].values
+            predicted = predictions[[p for _, p in ANOMALY_SERIES.values()]].values
+            for ts, actual_row, predicted_row, readings in zip(rows.index, actual, predicted, rows[FORECAST_TARGETS].to_dict('records')):
+                observe_hour(ts, readings)
+                anomaly_monitor.observe(ts, dict(zip(ANOMALY_SERIES, actual_row)), dict(zip(ANOMALY_SERIES, predicted_row)))
+        except Exception:
+            app.logger.exception("Live processing failed")
+
+def follow_file(path):
+    """tail -f for a JSON-lines file: only lines appended after startup are ingested"""
+    while not os.path.exists(path):
+        time.sleep(1.0)
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        lines = []
+        while True:
+            line = f.readline()
+            if line.endswith(b'\n'):
+                lines.append(line.decode('utf-8', errors='replace'))
+                if len(lines) < INGEST_LINE_BATCH:
+                    continue
+            elif line:
+                f.seek(f.tell() - len(line))
+            if lines:
+                ingest_lines(lines)
+                lines = []
+            else:
+                time.sleep(0.2)
+
+class SensorLineHandler(socketserver.BaseRequestHandler):
+    """One connection per sensor gateway; newline-delimited JSON readings, ingested in batches
+    (a batch closes at INGEST_LINE_BATCH lines or when the connection goes quiet)"""
+    def handle(self):
+        buffer, lines = b'', []
+        while True:
+            ready, _, _ = select.select([self.request], [], [], 0.2)
+            if ready:
+                chunk = self.request.recv(1 << 16)
+                if not chunk:
+                    break
+                *complete, buffer = (buffer + chunk).split(b'\n')
+                lines.extend(line.decode('utf-8', errors='replace') for line in complete)
+            if lines and (not ready or len(lines) >= INGEST_LINE_BATCH):
+                ingest_lines(lines)
+                lines = []
+        lines.append(buffer.decode('utf-8', errors='replace'))
+        ingest_lines(lines)
+
+ingest_server = None
+
+def sensor_row(timestamp_str=None):
+    """(timestamp, row) closest to the requested time across the historical record and live readings"""
+    if timestamp_str is None:
+        latest = live_store.latest()
+        if latest is not None and latest[0] > df.index[-1]:
+            return latest[0], latest[1].copy()
+        return df.index[-1], df.iloc[-1].copy()
+    closest_ts = get_closest_timestamp(timestamp_str)
+    target_dt = pd.to_datetime(timestamp_str)
+    live = live_store.nearest(target_dt)
+    if live is not None and abs(live[0] - target_dt) < abs(closest_ts - target_dt):
+        return live[0], live[1].copy()
+    return closest_ts, df.loc[closest_ts].copy()
+
+# Hot swap: load + warm a new model set in the background, then replace the production reference.
+# Requests pin the bundle they started with (active_bundle), so in-flight work finishes on the old set.
+MODEL_WATCH = os.environ.get('TWIN_MODEL_WATCH', '0') == '1'
+MODEL_WATCH_INTERVAL_S = 10.0
+swap_lock = threading.Lock()
+swap_state = {'state': 'idle', 'path': BASE_PATH, 'version': model_registry['production']['version'],
+              'previous_version': None, 'error': None, 'started': None, 'finished': None, 'elapsed_s': None}
+
+def hot_swap(model_dir):
+    """Load, validate and warm model_dir off the request path, then swap it in; returns False if a swap is running"""
+    global dataset_predictions, rollup_cube, window_stats, MODEL_VERSION
+    if not swap_lock.acquire(blocking=False):
+        return False
+    started = time.perf_counter()
+    try:
+        swap_state.update(state='loading', path=model_dir, error=None, started=datetime.now().strftime(TIMESTAMP_FORMAT), finished=None)
+        candidate = load_model_bundle(model_dir)
+
+        # Scoring the whole record is both the warm-up (graph tracing, booster init) and the new cube input
+        swap_state['state'] = 'warming'
+        predictions = compute_dataset_predictions(df, candidate)
+        if not np.isfinite(predictions.values).all():
+            raise ValueError("New models produced non-finite predictions")
+        cube = build_rollup_cube(predictions)
+        stats = WindowStats(df, predictions)
+
+        def add_live(frames):
+            nonlocal stats
+            if frames:
+                rows = pd.concat(frames).sort_index(kind='stable')
+                rows_predictions = compute_dataset_predictions(rows, candidate)
+                cube.add(*unrecorded(rows, rows_predictions))
+                stats = stats.extended(rows, rows_predictions)
+
+        # Live rows the worker has applied so far are re-scored without blocking it; batches it applies
+        # meanwhile are replayed under the lock, so none are lost between the snapshot and the swap
+        with live_apply_lock:
+            snapshot, snapshot_batches = list(live_processed), live_processed_state['batches']
+        add_live(snapshot)
+        version = artifacts_digest([os.path.join(model_dir, name) for name in MODEL_FILES.values()] + [STUDENT_PATH, FORECAST_PATH])
+
+        with live_apply_lock:
+            newer = live_processed_state['batches'] - snapshot_batches
+            add_live(list(live_processed)[max(len(live_processed) - newer, 0):] if newer else [])
+            previous = model_registry['production']
+            model_registry['production'] = candidate
+            dataset_predictions, rollup_cube, window_stats, MODEL_VERSION = predictions, cube, stats, version
+            # Contributions of the old boosters must not be served for the new models
+            explain_cache.update(ready=False, contribs={}, meta_gradient=None, error=None)
+        swap_state.update(state='idle', version=candidate['version'], previous_version=previous['version'])
+
+        # Monte Carlo workers loaded their own copy of the models: retire them, new ones load model_dir
+        start_mc_pool(model_dir)
+
+        # Old entries can never be hit again (keys include the version); free them with the old models
+        for cache in prediction_caches.values():
+            cache.clear(reset_stats=False)
+        with response_cache_lock:
+            response_cache.clear()
+        del previous
+        gc.collect()
+        threading.Thread(target=precompute_explanations, daemon=True).start()
+        return True
+    except Exception as e:
+        swap_state.update(state='failed', error=str(e))
+        return True
+    finally:
+        swap_state.update(finished=datetime.now().strftime(TIMESTAMP_FORMAT), elapsed_s=round(time.perf_counter() - started, 3))
+        swap_lock.release()
+
+def artifact_signature(model_dir):
+    signature = []
+    for name in MODEL_FILES.values():
+        try:
+            stat = os.stat(os.path.join(model_dir, name))
+            signature.append((stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            signature.append(None)
+    return signature
+
+def watch_model_files():
+    """Swap when the production artifacts change and then stay unchanged for one interval (writes finished)"""
+    seen = artifact_signature(model_registry['production']['path'])
+    while True:
+        time.sleep(MODEL_WATCH_INTERVAL_S)
+        model_dir = model_registry['production']['path']
+        current = artifact_signature(model_dir)
+        if current == seen or None in current:
+            continue
+        time.sleep(MODEL_WATCH_INTERVAL_S)
+        if artifact_signature(model_dir) == current:
+            hot_swap(model_dir)
+            seen = current
+
+services_started = False
+
+def start_services():
+    """Background threads and listeners of the serving process. Importing this module starts none of them,
+    so the debug reloader's watcher process (and any other importer) never binds the ingest socket or
+    tails and flushes the live store a second time."""
+    global services_started, ingest_server
+    if services_started:
+        return
+    services_started = True
+    live_store.start()
+    threading.Thread(target=process_live_rows, daemon=True).start()
+    threading.Thread(target=precompute_explanations, daemon=True).start()
+    threading.Thread(target=warm_up_anomaly_monitor, daemon=True).start()
+    if INGEST_TAIL_PATH:
+        threading.Thread(target=follow_file, args=(INGEST_TAIL_PATH,), daemon=True).start()
+    if INGEST_SOCKET:
+        host, port = INGEST_SOCKET.rsplit(':', 1)
+        ingest_server = socketserver.ThreadingTCPServer((host, int(port)), SensorLineHandler)
+        ingest_server.daemon_threads = True
+        threading.Thread(target=ingest_server.serve_forever, daemon=True).start()
+    if MODEL_WATCH:
+        threading.Thread(target=watch_model_files, daemon=True).start()
+    start_mc_pool(model_registry['production']['path'])
+
+@app.after_request
+def add_version_headers(response):
+    bundle = g.get('model_bundle') or model_registry['production']
+    response.headers['X-Model-Version'] = bundle['version']
+    response.headers['X-Dataset-Version'] = DATASET_VERSION
+    return response
+
 @app.route('/api/sensor/current', methods=['GET'])
 def get_current_sensor_data():
     try:
-        timestamp_str = request.args.get('timestamp', datetime.now().strftime('%m/%d/%Y %I:%M:%S %p'))
-        closest_ts = get_closest_timestamp(timestamp_str)
-        sensor_data = df.loc[closest_ts].to_dict()
-        sensor_data['timestamp'] = closest_ts.strftime('%m/%d/%Y %I:%M:%S %p')
+        timestamp_str = request.args.get('timestamp', datetime.now().strftime(TIMESTAMP_FORMAT))
+        closest_ts, row = sensor_row(timestamp_str)
+        sensor_data = row.dropna().to_dict()
+        sensor_data['timestamp'] = closest_ts.strftime(TIMESTAMP_FORMAT)
         
-        return jsonify({
+        return api_response({
             'success': True,
             'data': sensor_data,
             'requested_time': timestamp_str,
             'actual_time': sensor_data['timestamp']
         })
     except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+        return api_response({'success': False, 'error': str(e)}, 500)
 
 @app.route('/api/predict', methods=['POST'])
+@cached_endpoint
 def predict_energy():
     """Predict energy consumption using all 4 models"""
     try:
         data = request.json
         timestamp_str = data.get('timestamp', None)
+        mode = resolve_mode(data)
         
-        # Get data point based on timestamp or latest
-        if timestamp_str:
-            closest_ts = get_closest_timestamp(timestamp_str)
-            current_data = df.loc[closest_ts:closest_ts].iloc[0].copy()
-        else:
-            current_data = df.iloc[-1].copy()
+        # Get data point based on timestamp or latest (historical record or live readings)
+        _, current_data = sensor_row(timestamp_str)
         
         # Prepare input
         input_df = pd.DataFrame([current_data])
         input_df = recalculate_derived_features(input_df)
         
-        # Get predictions from all 4 models
-        pred_hvac, pred_lighting, pred_plug, pred_total = predict_total(input_df)
+        # Get predictions from all 4 models (or the distilled student in fast mode)
+        pred_hvac, pred_lighting, pred_plug, pred_total = predict_with_mode(input_df, mode)
         
         predictions = {
             'Energy_HVAC_Wh': float(pred_hvac[0]),
@@ -142,17 +2124,19 @@ def predict_energy():
             'Total_Energy_Wh': float(pred_total[0])
         }
         
-        return jsonify({'success': True, 'predictions': predictions})
+        return api_response({'success': True, 'predictions': predictions, 'mode': mode})
     
     except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+        return api_response({'success': False, 'error': str(e)}, 500)
 
 @app.route('/api/simulate', methods=['POST'])
+@cached_endpoint
 def simulate_scenario():
     try:
         req = request.json
         scenario_key = req.get('scenario', 'baseline')
         timestamp_str = req.get('timestamp', None)
+        mode = resolve_mode(req)
         
         # Get data point based on timestamp or latest
         if timestamp_str:
@@ -191,7 +2175,7 @@ def simulate_scenario():
         input_df = recalculate_derived_features(input_df)
         
         # Get Predictions
-        pred_hvac, pred_lighting, pred_plug, pred_total = predict_total(input_df)
+        pred_hvac, pred_lighting, pred_plug, pred_total = predict_with_mode(input_df, mode)
         
         # Calculate Costs
         total_energy_wh = float(pred_total[0])
@@ -199,6 +2183,7 @@ def simulate_scenario():
         
         response = {
             'scenario': scenario_key,
+            'mode': mode,
             'inputs': {
                 'temp': float(simulated_data['OutsideWeather_Temp_C']),
                 'occupancy': float(simulated_data['Total_Occupancy_Count']),
@@ -213,17 +2198,28 @@ def simulate_scenario():
             }
         }
         
-        return jsonify({'success': True, 'data': response})
+        if req.get('uncertainty'):
+            bands, elapsed = monte_carlo_bands(
+                input_df, mode, n_samples=req.get('samples'),
+                budget_s=float(req.get('latencyBudget', MC_LATENCY_BUDGET_S))
+            )
+            response['uncertainty'] = dict(bands['scenario'], elapsed_s=elapsed)
+        
+        return api_response({'success': True, 'data': response})
 
+    except ValueError as e:
+        return api_response({'success': False, 'error': str(e)}, 400)
     except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+        return api_response({'success': False, 'error': str(e)}, 500)
 
 @app.route('/api/optimize', methods=['POST'])
+@cached_endpoint
 def optimize_scenarios():
     try:
         data = request.json
         simulation_scenario = data.get('simulationScenario')
         timestamp = data.get('timestamp')
+        mode = resolve_mode(data)
         
         # Get baseline data - either from timestamp or use current
         if timestamp:
@@ -231,13 +2227,26 @@ def optimize_scenarios():
                 target_dt = pd.to_datetime(timestamp)
                 time_diff = abs(df.index - target_dt)
                 closest_idx = time_diff.argmin()
-                baseline_row = df.iloc[[closest_idx]].copy()
             except:
-                baseline_row = df.iloc[[0]].copy()
+                closest_idx = 0
         else:
-            baseline_row = df.iloc[[0]].copy()
+            closest_idx = 0
+        
+        # A single hour by default; the search optimizer needs a window to trade hours against each other
+        method = data.get('method', 'presets')
+        window_hours = int(data.get('windowHours', 24 if method == 'search' else 1))
+        if method == 'search' and window_hours > SEARCH_MAX_WINDOW_HOURS:
+            raise ValueError(f"windowHours is limited to {SEARCH_MAX_WINDOW_HOURS} for method 'search'")
+        baseline_row = df.iloc[closest_idx:closest_idx + max(window_hours, 1)]
         
-        baseline_df = baseline_row.copy()
+        # Optionally evaluate over a forecast window instead of a single recorded hour
+        forecast_horizon = data.get('forecastHorizon')
+        if forecast_horizon:
+            anchor_ts = baseline_row.index[0] if timestamp else None
+            baseline_row = forecast_load(anchor_ts, int(forecast_horizon))[df.columns]
+        
+        # Scenario frames below are overlays on these rows; only the columns a scenario changes are stored
+        baseline_df = ScenarioFrame(baseline_row)
         
         # Apply simulation scenario if selected
         if simulation_scenario and simulation_scenario in SCENARIO_CONFIG:
@@ -256,25 +2265,64 @@ def optimize_scenarios():
         
         # Get baseline predictions
         baseline_df = recalculate_derived_features(baseline_df)
-        pred_hvac_baseline, pred_lighting_baseline, pred_plug_baseline, pred_total_baseline = predict_total(baseline_df)
+        pred_hvac_baseline, pred_lighting_baseline, pred_plug_baseline, pred_total_baseline = predict_with_mode(baseline_df, mode)
         
         hours_per_year = 8760
         hours_per_month = hours_per_year / 12
         
-        baseline_monthly_kwh = float(pred_total_baseline[0]) * hours_per_month / 1000
-        baseline_monthly_cost = (float(pred_total_baseline[0]) / 1000 * float(baseline_df['Energy_Price_USD_kWh'].iloc[0])) * hours_per_month
+        # Hourly means over the evaluated rows (one recorded hour, or every hour of the forecast window)
+        baseline_monthly_kwh = float(np.mean(pred_total_baseline)) * hours_per_month / 1000
+        baseline_monthly_cost = float(np.mean(pred_total_baseline / 1000 * baseline_df['Energy_Price_USD_kWh'].values)) * hours_per_month
+        baseline_window_cost = float(np.sum(pred_total_baseline / 1000 * baseline_df['Energy_Price_USD_kWh'].values))
         
         results = []
         comparison_data = {
             'baseline': {
-                'hvac': float(pred_hvac_baseline[0]),
-                'lighting': float(pred_lighting_baseline[0]),
-                'plug': float(pred_plug_baseline[0]),
-                'total': float(pred_total_baseline[0])
+                'hvac': float(np.mean(pred_hvac_baseline)),
+                'lighting': float(np.mean(pred_lighting_baseline)),
+                'plug': float(np.mean(pred_plug_baseline)),
+                'total': float(np.mean(pred_total_baseline))
             },
             'modelComparison': []
         }
         
+        if method == 'search':
+            search = search_control_parameters(
+                baseline_df, mode,
+                time_budget=float(data.get('timeBudget', SEARCH_TIME_BUDGET_S)),
+                comfort=data.get('comfort')
+            )
+            monthly_kwh = search['mean_total_wh'] * hours_per_month / 1000
+            monthly_cost = search['mean_cost_usd'] * hours_per_month
+            savings_kwh = baseline_monthly_kwh - monthly_kwh
+            results.append({
+                'scenario': 'Baseline',
+                'monthly_kwh': int(round(baseline_monthly_kwh)),
+                'savings_kwh': 0,
+                'savings_pct': 0.0,
+                'monthly_cost_usd': int(round(baseline_monthly_cost)),
+                'cost_savings_usd': 0,
+                'description': 'No optimizations applied - current operational baseline.',
+                'icon': '📊'
+            })
+            results.insert(0, {
+                'scenario': 'Optimized Control (Search)',
+                'monthly_kwh': int(round(monthly_kwh)),
+                'savings_kwh': int(round(savings_kwh)),
+                'savings_pct': round((savings_kwh / baseline_monthly_kwh * 100) if baseline_monthly_kwh > 0 else 0, 2),
+                'monthly_cost_usd': int(round(monthly_cost)),
+                'cost_savings_usd': int(round(baseline_monthly_cost - monthly_cost)),
+                'description': 'Setpoint offsets, occupancy and price thresholds found by differential evolution within comfort limits.',
+                'icon': '🎯'
+            })
+            comparison_data['modelComparison'] = [
+                {'model': 'HVAC', 'before': comparison_data['baseline']['hvac'], 'after': search['mean_hvac_wh']},
+                {'model': 'Lighting', 'before': comparison_data['baseline']['lighting'], 'after': search['mean_lighting_wh']},
+                {'model': 'Plug', 'before': comparison_data['baseline']['plug'], 'after': search['mean_plug_wh']},
+                {'model': 'Total', 'before': comparison_data['baseline']['total'], 'after': search['mean_total_wh']}
+            ]
+            return api_response({'success': True, 'scenarios': results, 'comparison': comparison_data, 'mode': mode, 'search': search['details']})
+        
         # Comprehensive Optimization Scenarios
         scenarios_logic = [
             {
@@ -482,20 +2530,19 @@ def optimize_scenarios():
         ]
 
         for logic in scenarios_logic:
-            sc = baseline_df.copy()
-            sc = logic['apply'](sc)
+            sc = logic['apply'](ScenarioFrame(baseline_df))
             sc = recalculate_derived_features(sc)
             
             # Predict with all models
-            pred_hvac, pred_lighting, pred_plug, pred_total = predict_total(sc)
+            pred_hvac, pred_lighting, pred_plug, pred_total = predict_with_mode(sc, mode)
             
-            monthly_kwh = float(pred_total[0]) * hours_per_month / 1000
-            monthly_cost = (float(pred_total[0]) / 1000 * float(sc['Energy_Price_USD_kWh'].iloc[0])) * hours_per_month
+            monthly_kwh = float(np.mean(pred_total)) * hours_per_month / 1000
+            monthly_cost = float(np.mean(pred_total / 1000 * sc['Energy_Price_USD_kWh'].values)) * hours_per_month
             
             savings_kwh = baseline_monthly_kwh - monthly_kwh
             savings_pct = (savings_kwh / baseline_monthly_kwh * 100) if baseline_monthly_kwh > 0 else 0
             
-            results.append({
+            result = {
                 'scenario': logic['name'],
                 'monthly_kwh': int(round(monthly_kwh)),
                 'savings_kwh': int(round(savings_kwh)),
@@ -504,32 +2551,65 @@ def optimize_scenarios():
                 'cost_savings_usd': int(round(baseline_monthly_cost - monthly_cost)),
                 'description': logic['desc'],
                 'icon': logic.get('icon', '📊')
-            })
+            }
+            if forecast_horizon:
+                window_cost = float(np.sum(pred_total / 1000 * sc['Energy_Price_USD_kWh'].values))
+                result['window_kwh'] = round(float(np.sum(pred_total)) / 1000, 2)
+                result['window_savings_kwh'] = round(float(np.sum(pred_total_baseline) - np.sum(pred_total)) / 1000, 2)
+                result['window_cost_savings_usd'] = round(baseline_window_cost - window_cost, 2)
+            results.append(result)
             
             # Store model comparison for the first optimized scenario (skip baseline)
             if len(comparison_data['modelComparison']) == 0 and logic['name'] != 'Baseline':
                 comparison_data['modelComparison'] = [
-                    {'model': 'HVAC', 'before': comparison_data['baseline']['hvac'], 'after': float(pred_hvac[0])},
-                    {'model': 'Lighting', 'before': comparison_data['baseline']['lighting'], 'after': float(pred_lighting[0])},
-                    {'model': 'Plug', 'before': comparison_data['baseline']['plug'], 'after': float(pred_plug[0])},
-                    {'model': 'Total', 'before': comparison_data['baseline']['total'], 'after': float(pred_total[0])}
+                    {'model': 'HVAC', 'before': comparison_data['baseline']['hvac'], 'after': float(np.mean(pred_hvac))},
+                    {'model': 'Lighting', 'before': comparison_data['baseline']['lighting'], 'after': float(np.mean(pred_lighting))},
+                    {'model': 'Plug', 'before': comparison_data['baseline']['plug'], 'after': float(np.mean(pred_plug))},
+                    {'model': 'Total', 'before': comparison_data['baseline']['total'], 'after': float(np.mean(pred_total))}
                 ]
         
+        # Monte Carlo bands for every scenario, sharing one set of perturbed baseline samples
+        if data.get('uncertainty'):
+            transforms = {logic['name']: logic['apply'] for logic in scenarios_logic}
+            bands, elapsed = monte_carlo_bands(
+                baseline_df, mode, transforms=transforms, n_samples=data.get('samples'),
+                budget_s=float(data.get('latencyBudget', MC_LATENCY_BUDGET_S))
+            )
+            for result in results:
+                band = bands[result['scenario']]
+                result['uncertainty'] = {
+                    'samples': band['samples'],
+                    'monthly_kwh': {k: round(v * hours_per_month / 1000, 1) for k, v in band['energy_wh'].items()},
+                    'monthly_cost_usd': {k: round(v * hours_per_month, 1) for k, v in band['cost'].items()}
+                }
+            comparison_data['uncertainty_elapsed_s'] = elapsed
+        
         # Sort by savings percentage
         results = sorted(results, key=lambda x: x['savings_pct'], reverse=True)
         
-        return jsonify({'success': True, 'scenarios': results, 'comparison': comparison_data})
+        response = {'success': True, 'scenarios': results, 'comparison': comparison_data, 'mode': mode}
+        if forecast_horizon:
+            response['forecast_window'] = {
+                'start': baseline_df.index[0].strftime(TIMESTAMP_FORMAT),
+                'end': baseline_df.index[-1].strftime(TIMESTAMP_FORMAT),
+                'hours': len(baseline_df)
+            }
+        return api_response(response)
 
+    except ValueError as e:
+        return api_response({'success': False, 'error': str(e)}, 400)
     except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+        return api_response({'success': False, 'error': str(e)}, 500)
 
 @app.route('/api/comparison', methods=['POST'])
+@cached_endpoint
 def compare_scenarios():
     """Compare multiple scenarios with baseline predictions"""
     try:
         req = request.json
         scenario_keys = req.get('scenarios', ['baseline'])
         timestamp_str = req.get('timestamp', None)
+        mode = resolve_mode(req)
         
         # Get baseline data
         if timestamp_str:
@@ -540,7 +2620,7 @@ def compare_scenarios():
         
         baseline_df = pd.DataFrame([baseline_data])
         baseline_df = recalculate_derived_features(baseline_df)
-        _, _, _, baseline_pred = predict_total(baseline_df)
+        _, _, _, baseline_pred = predict_with_mode(baseline_df, mode)
         baseline_total = float(baseline_pred[0])
         baseline_cost = (baseline_total / 1000) * baseline_data['Energy_Price_USD_kWh']
         
@@ -570,7 +2650,7 @@ def compare_scenarios():
             
             input_df = pd.DataFrame([sim_data])
             input_df = recalculate_derived_features(input_df)
-            pred_hvac, pred_lighting, pred_plug, pred_total = predict_total(input_df)
+            pred_hvac, pred_lighting, pred_plug, pred_total = predict_with_mode(input_df, mode)
             
             total_energy = float(pred_total[0])
             total_cost = (total_energy / 1000) * sim_data['Energy_Price_USD_kWh']
@@ -589,49 +2669,421 @@ def compare_scenarios():
                 }
             })
         
-        return jsonify({'success': True, 'baseline': {'energy_wh': baseline_total, 'cost': baseline_cost}, 'comparisons': comparisons})
+        return api_response({'success': True, 'baseline': {'energy_wh': baseline_total, 'cost': baseline_cost}, 'comparisons': comparisons, 'mode': mode})
     
     except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+        return api_response({'success': False, 'error': str(e)}, 500)
 
 @app.route('/api/historical', methods=['GET'])
+@cached_endpoint
 def get_historical_data():
     try:
         hours = int(request.args.get('hours', 24))
         end_time = request.args.get('end_time', None)
         
+        live_last = live_store.last_timestamp()
         if end_time:
             end_dt = pd.to_datetime(end_time)
         else:
-            end_dt = df.index[-1]
+            end_dt = max(df.index[-1], live_last) if live_last is not None else df.index[-1]
         
         start_dt = end_dt - pd.Timedelta(hours=hours)
-        historical = df.loc[start_dt:end_dt].copy()
-        
-        data = []
-        for ts, row in historical.iterrows():
-            data.append({
-                'timestamp': ts.strftime('%m/%d/%Y %I:%M:%S %p'),
-                'Indoor_Temp_C': float(row['Indoor_Temp_C']),
-                'Indoor_Humidity_Pct': float(row['Indoor_Humidity_Pct']),
-                'Total_Occupancy_Count': int(row['Total_Occupancy_Count']),
-                'OutsideWeather_Temp_C': float(row['OutsideWeather_Temp_C']),
-                'Energy_Price_USD_kWh': float(row['Energy_Price_USD_kWh'])
-            })
+        historical = df.loc[start_dt:end_dt]
+        if end_dt > df.index[-1]:
+            historical = pd.concat([historical, live_store.query(max(start_dt, df.index[-1] + pd.Timedelta(seconds=1)), end_dt)])
+        
+        columns = ['Indoor_Temp_C', 'Indoor_Humidity_Pct', 'Total_Occupancy_Count', 'OutsideWeather_Temp_C', 'Energy_Price_USD_kWh']
+        historical = historical[columns].astype({'Total_Occupancy_Count': int})
+        
+        # Columnar shape on request (or when Arrow is negotiated); row dicts stay the default for the dashboard
+        if request.args.get('shape') == 'columnar' or MIME_ARROW in request.headers.get('Accept', ''):
+            return api_response({'success': True, 'columns': columnar(historical, columns), 'count': len(historical)})
+        
+        historical.insert(0, 'timestamp', historical.index.strftime(TIMESTAMP_FORMAT))
+        data = historical.to_dict('records')
         
-        return jsonify({'success': True, 'data': data, 'count': len(data)})
+        return api_response({'success': True, 'data': data, 'count': len(data)})
+    except Exception as e:
+        return api_response({'success': False, 'error': str(e)}, 500)
+
+@app.route('/api/forecast', methods=['GET'])
+def get_forecast():
+    """Forecast hourly load per sub-system for the next 24-168 hours"""
+    try:
+        horizon = int(request.args.get('hours', 24))
+        timestamp_str = request.args.get('timestamp', None)
+        anchor_ts = get_closest_timestamp(timestamp_str) if timestamp_str else None
+
+        future = forecast_load(anchor_ts, horizon)
+        anchor_ts = future.index[0] - pd.Timedelta(hours=1)
+        cost = future['Total_Energy_Wh'] / 1000 * future['Energy_Price_USD_kWh']
+
+        data = future[['Energy_HVAC_Wh', 'Energy_Lighting_Wh', 'Energy_Plug_Wh', 'Energy_Other_Wh',
+                       'Total_Energy_Wh', 'Energy_Price_USD_kWh']].set_axis(
+            ['hvac', 'lighting', 'plug', 'other', 'total', 'price'], axis=1)
+        data.insert(0, 'timestamp', future.index.strftime(TIMESTAMP_FORMAT))
+        data = data.to_dict('records')
+
+        return api_response({
+            'success': True,
+            'anchor_time': anchor_ts.strftime(TIMESTAMP_FORMAT),
+            'horizon_hours': len(data),
+            'data': data,
+            'summary': {
+                'total_kwh': float(future['Total_Energy_Wh'].sum() / 1000),
+                'total_cost': float(cost.sum()),
+                'peak_wh': float(future['Total_Energy_Wh'].max())
+            }
+        })
+    except Exception as e:
+        return api_response({'success': False, 'error': str(e)}, 500)
+
+@app.route('/api/analytics', methods=['GET'])
+def get_analytics():
+    """Grouped energy statistics from the rollup cube, e.g. ?group_by=hour,season&end_use=hvac&weekend=0"""
+    try:
+        def int_list(name):
+            return [int(v) for v in request.args.get(name).split(',')]
+
+        group_by = [k for k in request.args.get('group_by', 'hour').split(',') if k]
+        filters = {key: int_list(key) for key in list(CUBE_AXES) + list(CUBE_DERIVED_KEYS) if request.args.get(key)}
+        end_uses = request.args.get('end_use').split(',') if request.args.get('end_use') else None
+        sources = request.args.get('source').split(',') if request.args.get('source') else None
+
+        rows = rollup_cube.query(group_by, filters, end_uses, sources)
+        return api_response({'success': True, 'group_by': group_by, 'data': rows, 'count': len(rows)})
+    except Exception as e:
+        return api_response({'success': False, 'error': str(e)}, 500)
+
+@app.route('/api/stats', methods=['GET'])
+def get_window_stats():
+    """Energy, cost, mean and peak over any window in O(1), e.g. ?start=2023-07-01&end=2023-07-31 23:00&end_use=hvac,total"""
+    try:
+        start = pd.to_datetime(request.args.get('start')) if request.args.get('start') else None
+        end = pd.to_datetime(request.args.get('end')) if request.args.get('end') else None
+        end_uses = request.args.get('end_use').split(',') if request.args.get('end_use') else None
+        sources = request.args.get('source').split(',') if request.args.get('source') else None
+
+        stats = window_stats
+        lo, hi, rows = stats.query(start, end, end_uses, sources)
+        return api_response({
+            'success': True,
+            'start': stats.timestamp(lo).strftime(TIMESTAMP_FORMAT) if hi > lo else None,
+            'end': stats.timestamp(hi - 1).strftime(TIMESTAMP_FORMAT) if hi > lo else None,
+            'hours': hi - lo,
+            'data': rows
+        })
+    except Exception as e:
+        return api_response({'success': False, 'error': str(e)}, 500)
+
+@app.route('/api/schedule', methods=['POST'])
+def schedule_load_shift():
+    """Shift deferrable plug load and HVAC pre-conditioning energy to the cheapest hours of a day-ahead window"""
+    try:
+        req = request.json or {}
+        hours = int(req.get('hours', 24))
+        if hours <= 0:
+            raise ValueError("hours must be positive")
+        if not req.get('useForecast') and hours > len(df):
+            raise ValueError(f"hours exceeds the {len(df)} recorded hours")
+        timestamp_str = req.get('timestamp', None)
+        start = time.perf_counter()
+
+        if req.get('useForecast'):
+            anchor_ts = get_closest_timestamp(timestamp_str) if timestamp_str else None
+            window = forecast_load(anchor_ts, hours)
+            loads = {col: window[col].values.astype(float) for col in ['Energy_HVAC_Wh', 'Energy_Lighting_Wh', 'Energy_Plug_Wh']}
+        else:
+            start_ts = get_closest_timestamp(timestamp_str) if timestamp_str else df.index[-hours]
+            window = recalculate_derived_features(df.loc[start_ts:].iloc[:hours])
+            pred_hvac, pred_lighting, pred_plug, _ = predict_total(window)
+            loads = {'Energy_HVAC_Wh': pred_hvac, 'Energy_Lighting_Wh': pred_lighting, 'Energy_Plug_Wh': pred_plug}
+
+        price = window['Energy_Price_USD_kWh'].values.astype(float)
+        other = window['Energy_Other_Wh'].values.astype(float)
+        settings = {col: dict(cfg) for col, cfg in SHIFT_DEFAULTS.items()}
+        for col, key in [('Energy_HVAC_Wh', 'hvac'), ('Energy_Plug_Wh', 'plug')]:
+            if key in req.get('deferrable', {}):
+                settings[col]['deferrable'] = float(req['deferrable'][key])
+        max_increase = float(req.get('maxIncrease', SHIFT_MAX_INCREASE))
+        ramp_fraction = float(req.get('rampLimit', SHIFT_RAMP_FRACTION))
+
+        shifted = dict(loads)
+        for col, cfg in settings.items():
+            load = loads[col]
+            shifted[col] = load + shift_schedule(load, price, cfg['deferrable'], max_increase,
+                                                 ramp_fraction * load.mean(), cfg['direction'])
+
+        # Re-score both profiles through the meta model so the savings include its non-linear aggregation
+        total_before = predict_meta(loads['Energy_HVAC_Wh'], loads['Energy_Lighting_Wh'], loads['Energy_Plug_Wh'], other)
+        total_after = predict_meta(shifted['Energy_HVAC_Wh'], shifted['Energy_Lighting_Wh'], shifted['Energy_Plug_Wh'], other)
+        cost_before = float(np.sum(total_before / 1000 * price))
+        cost_after = float(np.sum(total_after / 1000 * price))
+
+        schedule = pd.DataFrame({
+            'timestamp': window.index.strftime(TIMESTAMP_FORMAT),
+            'price': price,
+            'hvac_before': loads['Energy_HVAC_Wh'],
+            'hvac_after': shifted['Energy_HVAC_Wh'],
+            'plug_before': loads['Energy_Plug_Wh'],
+            'plug_after': shifted['Energy_Plug_Wh'],
+            'total_before': total_before,
+            'total_after': total_after
+        }).to_dict('records')
+
+        shifted_wh = sum(float(np.abs(shifted[col] - loads[col]).sum()) / 2 for col in settings)
+        return api_response({
+            'success': True,
+            'schedule': schedule,
+            'savings': {
+                'cost_before': cost_before,
+                'cost_after': cost_after,
+                'savings_usd': cost_before - cost_after,
+                'savings_pct': ((cost_before - cost_after) / cost_before * 100) if cost_before > 0 else 0,
+                'shifted_kwh': shifted_wh / 1000
+            },
+            'elapsed_s': round(time.perf_counter() - start, 4)
+        })
+    except ValueError as e:
+        return api_response({'success': False, 'error': str(e)}, 400)
+    except Exception as e:
+        return api_response({'success': False, 'error': str(e)}, 500)
+
+@app.route('/api/thermal', methods=['POST'])
+def simulate_thermal_controls():
+    """Simulate indoor temperature for many control variants (setpoints, setback, pre-cooling) and score HVAC load"""
+    try:
+        req = request.json or {}
+        mode = resolve_mode(req)
+        hours = int(req.get('hours', 24 * 7))
+        if hours <= 0:
+            raise ValueError("hours must be positive")
+        timestamp_str = req.get('timestamp', None)
+        start_ts = get_closest_timestamp(timestamp_str) if timestamp_str else df.index[max(len(df) - hours, 0)]
+        frame = df.loc[start_ts:].iloc[:hours]
+        variants, controls = expand_thermal_variants(req, len(frame))
+
+        start = time.perf_counter()
+        temps, q_hvac = simulate_thermal(frame, controls, req.get('initialTemp', frame['Indoor_Temp_C'].iloc[0]))
+        simulated = time.perf_counter()
+        hvac_wh = score_hvac_trajectories(frame, temps, mode, controls['outdoor_offset_c'])
+        scored = time.perf_counter()
+
+        price = frame['Energy_Price_USD_kWh'].values
+        occupied = occupied_hours(frame)
+        low, high = req.get('comfort', COMFORT_BAND_C)
+        discomfort = ((temps < low) | (temps > high)) & occupied
+        results = []
+        for i, control in enumerate(variants):
+            results.append({
+                'control': control,
+                'hvac_model_kwh': float(hvac_wh[i].sum() / 1000),
+                'hvac_cost': float(np.sum(hvac_wh[i] / 1000 * price)),
+                'thermal_heating_kwh': float(np.clip(q_hvac[i], 0, None).sum() / 1000),
+                'thermal_cooling_kwh': float(-np.clip(q_hvac[i], None, 0).sum() / 1000),
+                'comfort_violation_hours': int(discomfort[i].sum()),
+                'indoor_temp': {'min': float(temps[i].min()), 'mean': float(temps[i].mean()), 'max': float(temps[i].max())}
+            })
+        comfortable = [i for i, r in enumerate(results) if r['comfort_violation_hours'] == 0] or list(range(len(results)))
+        best = min(comfortable, key=lambda i: results[i]['hvac_cost'])
+
+        response = {
+            'success': True,
+            'mode': mode,
+            'start': frame.index[0].strftime(TIMESTAMP_FORMAT),
+            'hours': len(frame),
+            'variants': results,
+            'best_variant': best,
+            'elapsed_s': {'simulation': round(simulated - start, 4), 'scoring': round(scored - simulated, 4)}
+        }
+        if req.get('trajectories') and len(frame) <= THERMAL_MAX_TRAJECTORY_HOURS:
+            response['trajectories'] = {
+                'timestamps': frame.index.strftime(TIMESTAMP_FORMAT).tolist(),
+                'indoor_temp': temps[:THERMAL_MAX_TRAJECTORIES],
+                'hvac_wh': hvac_wh[:THERMAL_MAX_TRAJECTORIES],
+                'thermal_w': q_hvac[:THERMAL_MAX_TRAJECTORIES]
+            }
+        return api_response(response)
+    except ValueError as e:
+        return api_response({'success': False, 'error': str(e)}, 400)
+    except Exception as e:
+        return api_response({'success': False, 'error': str(e)}, 500)
+
+@app.route('/api/explain', methods=['GET'])
+def explain_prediction():
+    """Per-feature contributions for one hour (?timestamp=) or a range (?start=&end=)"""
+    try:
+        if not explain_cache['ready']:
+            message = explain_cache['error'] or 'Explanations are still being precomputed'
+            return api_response({'success': False, 'error': message}, 503)
+
+        top = int(request.args.get('top', 10))
+        if request.args.get('start') or request.args.get('end'):
+            start_pos = df.index.searchsorted(pd.to_datetime(request.args.get('start', df.index[0])), side='left')
+            end_pos = df.index.searchsorted(pd.to_datetime(request.args.get('end', df.index[-1])), side='right')
+        else:
+            timestamp_str = request.args.get('timestamp', None)
+            closest_ts = get_closest_timestamp(timestamp_str) if timestamp_str else df.index[-1]
+            start_pos = df.index.get_loc(closest_ts)
+            end_pos = start_pos + 1
+        if end_pos <= start_pos:
+            raise ValueError("Empty time range")
+
+        return api_response({
+            'success': True,
+            'start': df.index[start_pos].strftime(TIMESTAMP_FORMAT),
+            'end': df.index[end_pos - 1].strftime(TIMESTAMP_FORMAT),
+            'hours': int(end_pos - start_pos),
+            'models': explain_range(start_pos, end_pos, top)
+        })
+    except Exception as e:
+        return api_response({'success': False, 'error': str(e)}, 500)
+
+@app.route('/api/anomalies', methods=['GET'])
+def get_anomalies():
+    """Most recent flagged hours, optionally filtered by ?series=hvac"""
+    try:
+        limit = int(request.args.get('limit', 100))
+        series = request.args.get('series', None)
+        events = [e for e in list(anomaly_monitor.events) if series is None or e['series'] == series]
+        return api_response({
+            'success': True,
+            'data': events[-limit:][::-1],
+            'count': len(events),
+            'observed_hours': anomaly_monitor.observed
+        })
+    except Exception as e:
+        return api_response({'success': False, 'error': str(e)}, 500)
+
+@app.route('/api/anomalies/observe', methods=['POST'])
+def observe_anomalies():
+    """Feed (actual, predicted) pairs: {"readings": [{"timestamp": ..., "actual": {...}, "predicted": {...}}]}"""
+    try:
+        readings = (request.json or {}).get('readings', [])
+        raised = []
+        for reading in readings:
+            raised.extend(anomaly_monitor.observe(pd.to_datetime(reading['timestamp']), reading['actual'], reading['predicted']))
+        return api_response({'success': True, 'observed': len(readings), 'events': raised})
+    except Exception as e:
+        return api_response({'success': False, 'error': str(e)}, 500)
+
+@app.route('/api/stream', methods=['GET'])
+def event_stream():
+    """Server-sent events push stream (anomaly events and other live notifications)"""
+    subscriber = queue.Queue(maxsize=1000)
+    with stream_lock:
+        stream_subscribers.append(subscriber)
+
+    def generate():
+        try:
+            while True:
+                try:
+                    kind, data = subscriber.get(timeout=15)
+                    yield f"event: {kind}\ndata: {encode_json(data).decode()}\n\n"
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+        finally:
+            with stream_lock:
+                stream_subscribers.remove(subscriber)
+
+    return Response(generate(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+
+@app.route('/api/models/shadow', methods=['GET', 'POST', 'DELETE'])
+def shadow_models():
+    """POST {"path": dir, "sample_rate": 0.1} starts shadowing a candidate, GET reports deltas, DELETE stops"""
+    global shadow_evaluator
+    try:
+        if request.method == 'POST':
+            req = request.json or {}
+            candidate = load_model_bundle(req['path'])
+            previous = shadow_evaluator
+            model_registry['candidate'] = candidate
+            shadow_evaluator = ShadowEvaluator(candidate, float(req.get('sample_rate', SHADOW_SAMPLE_RATE)))
+            if previous is not None:
+                previous.close()
+        elif request.method == 'DELETE':
+            previous, shadow_evaluator = shadow_evaluator, None
+            model_registry['candidate'] = None
+            if previous is not None:
+                previous.close()
+            return api_response({'success': True, 'shadow': None})
+
+        evaluator = shadow_evaluator
+        if evaluator is None:
+            return api_response({'success': True, 'shadow': None})
+        return api_response({'success': True, 'production_version': model_registry['production']['version'],
+                             'shadow': evaluator.report()})
+    except Exception as e:
+        return api_response({'success': False, 'error': str(e)}, 500)
+
+@app.route('/api/models/reload', methods=['GET', 'POST'])
+def reload_models():
+    """POST {"path": dir} loads and warms a model set in the background, then swaps it in; GET reports progress"""
+    try:
+        if request.method == 'POST':
+            model_dir = (request.json or {}).get('path', model_registry['production']['path'])
+            if not all(os.path.exists(os.path.join(model_dir, name)) for name in MODEL_FILES.values()):
+                raise ValueError(f"Incomplete model set in {model_dir}")
+            if swap_lock.locked():
+                return api_response({'success': False, 'error': 'A model swap is already running', 'swap': dict(swap_state)}, 409)
+            threading.Thread(target=hot_swap, args=(model_dir,), daemon=True).start()
+            return api_response({'success': True, 'accepted': True, 'path': model_dir}, 202)
+        return api_response({'success': True, 'production_version': model_registry['production']['version'], 'swap': dict(swap_state)})
+    except Exception as e:
+        return api_response({'success': False, 'error': str(e)}, 500)
+
+@app.route('/api/ingest', methods=['POST'])
+def ingest_readings():
+    """Sensor batch: JSON list / {"readings": [...]} or a text/csv body with one reading per row"""
+    try:
+        if request.mimetype == 'text/csv':
+            frame = pd.read_csv(io.BytesIO(request.get_data()))
+        else:
+            body = request.get_json(force=True)
+            frame = pd.DataFrame.from_records(body.get('readings', []) if isinstance(body, dict) else body)
+        if frame.empty:
+            raise ValueError("No readings in request")
+        result = ingest_frame(frame)
+        return api_response(dict({'success': True, 'version': version_key()}, **result))
+    except Exception as e:
+        return api_response({'success': False, 'error': str(e)}, 500)
+
+@app.route('/api/ingest/status', methods=['GET'])
+def ingest_status():
+    return api_response({'success': True, 'store': live_store.stats(), 'queued_batches': live_queue.qsize()})
+
+@app.route('/api/cache/stats', methods=['GET', 'DELETE'])
+def prediction_cache_stats():
+    try:
+        if request.method == 'DELETE':
+            for cache in prediction_caches.values():
+                cache.clear()
+        return api_response({'success': True, 'model_version': model_registry['production']['version'],
+                             'caches': {name: cache.stats() for name, cache in prediction_caches.items()}})
     except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+        return api_response({'success': False, 'error': str(e)}, 500)
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
-    return jsonify({
+    return api_response({
         'success': True,
         'message': 'Building Energy Digital Twin API is running',
         'models_loaded': True,
+        'fast_mode_available': student_bundle is not None,
+        'fast_mode_metrics': student_bundle['metrics'] if student_bundle is not None else None,
+        'default_mode': PREDICTION_MODE,
+        'version': version_key(),
+        'model_version': model_registry['production']['version'],
+        'model_swap': swap_state['state'],
+        'response_cache_entries': len(response_cache),
+        'explanations_ready': explain_cache['ready'],
         'dataset_records': len(df)
     })
 
 if __name__ == '__main__':
     print("Building Energy Digital Twin Backend API Started...")
+    # The debug reloader runs this file twice: a watcher process, then the serving child it marks with
+    # WERKZEUG_RUN_MAIN. Only the serving child starts the background services.
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_services()
     app.run(debug=True, host='0.0.0.0', port=5000)
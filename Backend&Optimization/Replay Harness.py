@@ -0,0 +1,232 @@
+"""Accelerated-time replay of the dataset against the backend, with the dashboard's request mix.
+
+Runs entirely in-process through Flask's test client:
+
+    python "Replay Harness.py" --speedup 3600 --clients 16 --duration 120
+"""
+import argparse
+import importlib.util
+import json
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+BACKEND_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Backend App.py")
+TIMESTAMP_FORMAT = '%m/%d/%Y %I:%M:%S %p'
+
+SIMULATION_SCENARIOS = ['baseline', 'heatwave', 'cold_snap', 'high_occupancy', 'remote_work',
+                        'energy_crisis', 'green_mode', 'solar_peak', 'peak_demand']
+
+# Relative frequency of dashboard actions: the sensor poll dominates, optimization is occasional
+REQUEST_MIX = {'sensor': 0.45, 'predict': 0.25, 'simulate': 0.2, 'optimize': 0.1}
+
+def load_backend():
+    spec = importlib.util.spec_from_file_location("backend_app", BACKEND_PATH)
+    backend = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(backend)
+    return backend
+
+def current_rss_mb():
+    """Resident set size now (psutil or Linux /proc), falling back to the peak reported by getrusage"""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss / 2**20
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except (OSError, ValueError, AttributeError):
+        if resource is not None:
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        return float('nan')
+
+class VirtualClock:
+    """Walks the dataset index at `speedup` simulated seconds per wall second"""
+    def __init__(self, index, start, speedup):
+        self.index = index
+        self.position = int(index.searchsorted(start))
+        self.seconds_per_hour = 3600.0 / speedup
+        self.lock = threading.Lock()
+
+    def now(self):
+        with self.lock:
+            return self.index[min(self.position, len(self.index) - 1)]
+
+    def advance(self):
+        with self.lock:
+            self.position += 1
+            return self.position < len(self.index)
+
+class Recorder:
+    def __init__(self):
+        self.samples = []
+        self.lock = threading.Lock()
+
+    def add(self, endpoint, latency, ok):
+        with self.lock:
+            self.samples.append((time.perf_counter(), endpoint, latency, ok))
+
+    def window(self, since):
+        with self.lock:
+            return [s for s in self.samples if s[0] >= since]
+
+def rewind_live_state(backend, start_ts):
+    """Point the backend's live state at the replay start so replayed hours arrive in order and are observed once.
+
+    At startup the forecast state sits at the last recorded hour and the anomaly detectors have already
+    seen every recorded hour; replaying those hours would rewind the one and double-count the other.
+    """
+    deadline = time.perf_counter() + 600
+    while backend.anomaly_monitor.observed < len(backend.df) and time.perf_counter() < deadline:  # startup warm-up still running
+        time.sleep(0.1)
+    monitor = backend.AnomalyMonitor()
+    actual = backend.df.loc[:start_ts, [a for a, _ in backend.ANOMALY_SERIES.values()]]
+    predicted = backend.dataset_predictions.loc[:start_ts, [p for _, p in backend.ANOMALY_SERIES.values()]]
+    for ts, actual_row, predicted_row in zip(actual.index, actual.values, predicted.values):
+        monitor.observe(ts, dict(zip(backend.ANOMALY_SERIES, actual_row)), dict(zip(backend.ANOMALY_SERIES, predicted_row)), publish=False)
+    backend.anomaly_monitor = monitor
+    backend.reset_forecast_state(start_ts)
+
+def feed_hours(backend, client, clock, stop, ingest=False):
+    """Deliver each simulated hour to the backend as if it had just been measured"""
+    columns = ['Energy_HVAC_Wh', 'Energy_Lighting_Wh', 'Energy_Plug_Wh', 'Energy_Other_Wh', 'Total_Energy_Wh']
+    while not stop.is_set():
+        time.sleep(clock.seconds_per_hour)
+        if not clock.advance():
+            stop.set()
+            break
+        ts = clock.now()
+        if ingest:
+            # Raw readings only: the ingestion path derives features, scores and updates the monitors itself
+            reading = backend.df.loc[ts, list(backend.SENSOR_RANGES)].astype(float).to_dict()
+            client.post('/api/ingest', json={'readings': [dict(reading, timestamp=ts.strftime(TIMESTAMP_FORMAT))]})
+            continue
+        actual = backend.df.loc[ts, columns]
+        predicted = backend.dataset_predictions.loc[ts]
+        backend.observe_hour(ts, actual)
+        client.post('/api/anomalies/observe', json={'readings': [{
+            'timestamp': ts.strftime(TIMESTAMP_FORMAT),
+            'actual': {name: float(actual[a]) for name, (a, _) in backend.ANOMALY_SERIES.items()},
+            'predicted': {name: float(predicted[p]) for name, (_, p) in backend.ANOMALY_SERIES.items()}
+        }]})
+
+def run_client(client, clock, recorder, stop, seed):
+    rng = random.Random(seed)
+    actions, weights = list(REQUEST_MIX), list(REQUEST_MIX.values())
+    sensor = {}
+    while not stop.is_set():
+        action = rng.choices(actions, weights)[0]
+        timestamp = clock.now().strftime(TIMESTAMP_FORMAT)
+        start = time.perf_counter()
+        if action == 'sensor':
+            response = client.get('/api/sensor/current', query_string={'timestamp': timestamp})
+            if response.status_code == 200:
+                sensor = response.get_json()['data']
+        elif action == 'predict':
+            response = client.post('/api/predict', json=dict(sensor, timestamp=timestamp))
+        elif action == 'simulate':
+            response = client.post('/api/simulate', json={'scenario': rng.choice(SIMULATION_SCENARIOS), 'timestamp': timestamp})
+        else:
+            response = client.post('/api/optimize', json=dict(sensor, timestamp=timestamp, simulationScenario=rng.choice(SIMULATION_SCENARIOS)))
+        recorder.add(action, time.perf_counter() - start, response.status_code < 400)
+
+def summarize(samples, elapsed):
+    if not samples:
+        return {'requests': 0}
+    latencies = np.array([s[2] for s in samples]) * 1000
+    errors = sum(1 for s in samples if not s[3])
+    summary = {
+        'requests': len(samples),
+        'throughput_rps': round(len(samples) / elapsed, 2),
+        'error_rate_pct': round(errors / len(samples) * 100, 3),
+        'p50_ms': round(float(np.percentile(latencies, 50)), 2),
+        'p95_ms': round(float(np.percentile(latencies, 95)), 2),
+        'p99_ms': round(float(np.percentile(latencies, 99)), 2),
+        'max_ms': round(float(latencies.max()), 2),
+        'endpoints': {}
+    }
+    for endpoint in REQUEST_MIX:
+        lat = np.array([s[2] for s in samples if s[1] == endpoint]) * 1000
+        if len(lat):
+            summary['endpoints'][endpoint] = {
+                'requests': len(lat),
+                'p50_ms': round(float(np.percentile(lat, 50)), 2),
+                'p99_ms': round(float(np.percentile(lat, 99)), 2)
+            }
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay the dataset through the backend at accelerated time")
+    parser.add_argument('--speedup', type=float, default=3600, help="simulated seconds per wall-clock second")
+    parser.add_argument('--clients', type=int, default=16, help="concurrent simulated dashboard clients")
+    parser.add_argument('--duration', type=float, default=60, help="wall-clock seconds to run")
+    parser.add_argument('--start', default=None, help="first simulated timestamp (default: start of the dataset + 1 week)")
+    parser.add_argument('--interval', type=float, default=5, help="seconds between progress reports")
+    parser.add_argument('--output', default=None, help="write the timeline and summary as JSON")
+    parser.add_argument('--ingest', action='store_true', help="feed hours through POST /api/ingest instead of updating state directly")
+    args = parser.parse_args()
+
+    # Replayed hours are historical: keep them out of the production live store (reloaded on every start)
+    live_store_dir = tempfile.mkdtemp(prefix='replay_live_store_')
+    os.environ['TWIN_LIVE_STORE'] = live_store_dir
+
+    print("Loading backend...")
+    backend = load_backend()
+    backend.start_services()
+    start_ts = pd.to_datetime(args.start) if args.start else backend.df.index[0] + pd.Timedelta(weeks=1)
+    clock = VirtualClock(backend.df.index, start_ts, args.speedup)
+    print("Rewinding live state to the replay start...")
+    rewind_live_state(backend, clock.now())
+    recorder = Recorder()
+    stop = threading.Event()
+
+    threads = [threading.Thread(target=feed_hours, args=(backend, backend.app.test_client(), clock, stop, args.ingest), daemon=True)]
+    threads += [threading.Thread(target=run_client, args=(backend.app.test_client(), clock, recorder, stop, seed), daemon=True)
+                for seed in range(args.clients)]
+
+    began = time.perf_counter()
+    for t in threads:
+        t.start()
+
+    timeline = []
+    last = began
+    while not stop.is_set() and time.perf_counter() - began < args.duration:
+        time.sleep(args.interval)
+        now = time.perf_counter()
+        row = summarize(recorder.window(last), now - last)
+        row.update(elapsed_s=round(now - began, 1), simulated_time=clock.now().strftime(TIMESTAMP_FORMAT), rss_mb=round(current_rss_mb(), 1))
+        timeline.append(row)
+        last = now
+        print(f"[{row['elapsed_s']:>6}s | {row['simulated_time']}] "
+              f"{row.get('throughput_rps', 0):>8} req/s  p50 {row.get('p50_ms', 0):>8} ms  p99 {row.get('p99_ms', 0):>8} ms  "
+              f"errors {row.get('error_rate_pct', 0)}%  rss {row['rss_mb']} MB")
+
+    stop.set()
+    for t in threads:
+        t.join(timeout=30)
+
+    summary = summarize(recorder.samples, time.perf_counter() - began)
+    summary['peak_rss_mb'] = round(max([row['rss_mb'] for row in timeline] or [current_rss_mb()]), 1)
+    print("\nReplay summary")
+    print(json.dumps(summary, indent=2))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'summary': summary, 'timeline': timeline}, f, indent=2)
+    shutil.rmtree(live_store_dir, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
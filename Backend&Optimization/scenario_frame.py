@@ -0,0 +1,78 @@
+"""Copy-on-write scenario overlays, shared by the backend and the standalone optimizer script.
+
+Importing this module loads nothing; it depends only on NumPy and pandas.
+"""
+import numpy as np
+import pandas as pd
+
+class ScenarioFrame:
+    """Copy-on-write overlay of a baseline frame for scenario variants.
+
+    Columns are read straight from the baseline's arrays; assignments store only the overridden
+    columns. Reading one column (frame[col]) or a feature list (frame[cols]) builds just those columns,
+    so a scenario that changes three features never copies the other forty.
+    """
+    def __init__(self, base, overrides=None):
+        if isinstance(base, ScenarioFrame):
+            overrides = {**base.overrides, **(overrides or {})}
+            base = base.base
+        self.base = base
+        self.index = base.index
+        self.overrides = {}
+        for name, value in (overrides or {}).items():
+            self[name] = value
+
+    @property
+    def columns(self):
+        added = [name for name in self.overrides if name not in self.base.columns]
+        return self.base.columns.append(pd.Index(added)) if added else self.base.columns
+
+    def column(self, name):
+        """Backing array of one column (the override, or the baseline's own array)"""
+        if name in self.overrides:
+            return self.overrides[name]
+        return self.base[name].values
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, name):
+        return name in self.overrides or name in self.base.columns
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return pd.Series(self.column(key), index=self.index, name=key)
+        return pd.DataFrame({name: self.column(name) for name in key}, index=self.index)
+
+    def __setitem__(self, name, value):
+        # Always a new array, never written in place, so overlays and the baseline can share arrays safely
+        value = value.values if isinstance(value, (pd.Series, pd.Index)) else np.asarray(value)
+        self.overrides[name] = np.broadcast_to(value, (len(self.index),)) if value.ndim == 0 else value
+
+    def assign(self, **columns):
+        """New overlay with the given columns replaced (values or callables of this frame, as in DataFrame.assign)"""
+        return ScenarioFrame(self, {name: value(self) if callable(value) else value for name, value in columns.items()})
+
+    def copy(self):
+        return ScenarioFrame(self)
+
+    @property
+    def iloc(self):
+        return _ScenarioRows(self)
+
+    def to_frame(self):
+        """Materialize every column as a regular DataFrame"""
+        return self[list(self.columns)]
+
+    @property
+    def values(self):
+        return self.to_frame().values
+
+class _ScenarioRows:
+    """frame.iloc[rows] for a ScenarioFrame: the baseline and each override are sliced, not copied, for slices"""
+    def __init__(self, frame):
+        self.frame = frame
+
+    def __getitem__(self, rows):
+        frame = self.frame
+        return ScenarioFrame(frame.base.iloc[rows], {name: value[rows] for name, value in frame.overrides.items()})
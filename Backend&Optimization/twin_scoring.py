@@ -0,0 +1,134 @@
+"""Model-set layout, loading and uncached scoring, shared by the backend and its Monte Carlo workers.
+
+Importing this module loads nothing and starts nothing; the dataset, caches and background services
+live in "Backend App.py". A worker process imports only this module and loads one model bundle.
+"""
+import hashlib
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import joblib
+import numpy as np
+import tensorflow as tf
+
+# Artifacts of one hierarchical model set, relative to its directory
+MODEL_FILES = {
+    'model_hvac': "model_hvac_xgb_3y.pkl",
+    'scaler_hvac': "scaler_hvac_3y.pkl",
+    'model_lighting': "model_lighting_xgb_3y.pkl",
+    'scaler_lighting': "scaler_lighting_3y.pkl",
+    'model_plug': "model_plug_xgb_3y_improved.pkl",
+    'scaler_plug': "scaler_plug_3y_improved.pkl",
+    'meta_model': "meta_model_nn_3y_low_noise.keras",
+    'meta_scaler': "meta_scaler_3y_low_noise.pkl"
+}
+
+hvac_features = [
+    'HVAC_Load_Estimate', 'Temp_Occupancy_Interaction', 'Indoor_Temp_Deviation',
+    'Temp_Deviation', 'Total_Occupancy_Count', 'Indoor_Temp_C',
+    'OutsideWeather_Temp_C', 'Hour', 'Is_Daytime', 'OutsideWeather_Humidity_Pct',
+    'Indoor_Humidity_Pct', 'Pressure_mmHg', 'Indoor_Humidity_Deviation',
+    'Season', 'Humidity_Deviation', 'Is_Weekend'
+]
+
+lighting_features = [
+    'Hour', 'Is_Daytime', 'Total_Occupancy_Count', 'Day_of_Week', 'Is_Weekend',
+    'Season', 'OutsideWeather_Temp_C', 'Temp_Deviation', 'Indoor_Temp_C',
+    'Building_Area_m2', 'Daylight_Hours_Factor', 'Lighting_Occupancy_Ratio',
+    'Solar_Irradiance_Estimate'
+]
+
+plug_features = [
+    'Total_Occupancy_Count', 'Hour', 'Is_Daytime', 'Day_of_Week', 'Is_Weekend',
+    'Season', 'Building_Area_m2', 'Energy_Price_USD_kWh', 'OutsideWeather_Temp_C',
+    'Indoor_Temp_C', 'Plug_Peak_Hour', 'Device_Usage_Factor', 'Remote_Work_Factor',
+    'Price_Sensitivity', 'Temp_Deviation', 'Indoor_Temp_Deviation', 'Solar_Irradiance_Estimate'
+]
+
+# Columns the full chain reads (sub-model features plus the pass-through Other load)
+FULL_CHAIN_COLUMNS = list(dict.fromkeys(hvac_features + lighting_features + plug_features + ['Energy_Other_Wh']))
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def artifacts_digest(paths):
+    digest = hashlib.sha256()
+    for path in paths:
+        if os.path.exists(path):
+            digest.update(file_digest(path).encode())
+    return digest.hexdigest()[:16]
+
+def load_model_bundle(model_dir):
+    """Load the three sub-models, their scalers and the meta model from model_dir"""
+    bundle = {}
+    for key, name in MODEL_FILES.items():
+        path = os.path.join(model_dir, name)
+        bundle[key] = tf.keras.models.load_model(path) if name.endswith('.keras') else joblib.load(path)
+    bundle['path'] = model_dir
+    bundle['version'] = artifacts_digest([os.path.join(model_dir, name) for name in MODEL_FILES.values()])
+    return bundle
+
+def score_bundle(bundle, frame):
+    """Full-chain (HVAC, Lighting, Plug, Total) predictions without any cache"""
+    preds = [bundle[f'model_{name}'].predict(bundle[f'scaler_{name}'].transform(frame[features]))
+             for name, features in (('hvac', hvac_features), ('lighting', lighting_features), ('plug', plug_features))]
+    meta_input = np.column_stack(preds + [frame['Energy_Other_Wh'].values])
+    total = bundle['meta_model'].predict(bundle['meta_scaler'].transform(meta_input), verbose=0).flatten()
+    return preds[0], preds[1], preds[2], total
+
+def score_student(student, frame):
+    """(HVAC, Lighting, Plug, Total) from the distilled student in one model call"""
+    X = frame[student['features']].values
+    pred = student['target_scaler'].inverse_transform(student['model'].predict(X).reshape(len(X), -1))
+    return pred[:, 0], pred[:, 1], pred[:, 2], pred[:, 3]
+
+# Worker-process state, set once by init_worker
+_worker = {'bundle': None, 'student': None, 'student_path': None}
+
+def init_worker(model_dir, student_path):
+    _worker['bundle'] = load_model_bundle(model_dir)
+    _worker['student'] = joblib.load(student_path) if os.path.exists(student_path) else None
+    _worker['student_path'] = student_path
+
+def worker_ready():
+    return os.getpid()
+
+def score_chunk(frame, mode):
+    """Total_Energy_Wh of one chunk in a worker"""
+    if mode == 'fast':
+        if _worker['student'] is None:
+            raise ValueError("Fast mode unavailable: distilled model not found at " + _worker['student_path'])
+        return score_student(_worker['student'], frame)[3]
+    return score_bundle(_worker['bundle'], frame)[3]
+
+def start_scoring_pool(workers, model_dir, student_path):
+    """Spawn `workers` processes that import only this module, and return once each has loaded its models.
+
+    A spawned child re-runs the parent's __main__ file before its first task. The backend's main file
+    loads the dataset and all models, so its path is hidden while the workers are launched; they are
+    all launched here, so the pool never spawns another one later.
+    """
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                               initializer=init_worker, initargs=(model_dir, student_path))
+    main = sys.modules['__main__']
+    main_path = getattr(main, '__file__', None)
+    try:
+        if main_path is not None:
+            del main.__file__
+        ready = [pool.submit(worker_ready) for _ in range(workers)]
+    finally:
+        if main_path is not None:
+            main.__file__ = main_path
+    try:
+        for future in ready:
+            future.result()
+    except Exception:
+        pool.shutdown(wait=False, cancel_futures=True)
+        raise
+    return pool